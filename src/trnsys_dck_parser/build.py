@@ -44,6 +44,6 @@ cos = UnaryFunction("COS")
 absolute = UnaryFunction("ABS")
 
 
-def parse_expression(expression: str) -> _pexpp.ParseResult:
+def parse_expression(expression: _pcom.Input) -> _pexpp.ParseResult:
     parser = _pexpp.Parser(expression)
     return parser.parse()
@@ -0,0 +1,167 @@
+import argparse as _ap
+import concurrent.futures as _cf
+import contextlib as _ctx
+import glob as _glob
+import json as _json
+import os as _os
+import pathlib as _pl
+import sys as _sys
+import time as _time
+import typing as _tp
+
+import trnsys_dck_parser.parse.cache as _pcache
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.deck as _pdeck
+import trnsys_dck_parser.parse.profile as _pprof
+
+_DEFAULT_PATTERN = "*.dck"
+
+# Large enough to amortize the inter-process communication, small enough to keep all workers busy
+# towards the end of a batch
+_MAX_CHUNK_SIZE = 64
+
+
+def main(argv: _tp.Sequence[str] | None = None) -> int:
+    arguments = _create_argument_parser().parse_args(argv)
+
+    paths = sorted(set(_iter_deck_paths(arguments.paths, arguments.pattern)))
+    n_workers = arguments.workers or _os.cpu_count() or 1
+    chunk_size = arguments.chunk_size or max(1, min(_MAX_CHUNK_SIZE, len(paths) // (4 * n_workers)))
+
+    with _open_output(arguments.output) as output:
+        n_failed_files = 0
+        file_results = _parse_files(paths, arguments.cache_dir, arguments.profile, n_workers, chunk_size)
+        for file_result in file_results:
+            n_failed_files += not file_result["success"]
+            output.write(_json.dumps(file_result) + "\n")
+
+    return 1 if n_failed_files else 0
+
+
+def _create_argument_parser() -> _ap.ArgumentParser:
+    parser = _ap.ArgumentParser(
+        prog="trnsys-dck-parse", description="Parse TRNSYS deck files and write one JSON result per file."
+    )
+    parser.add_argument("paths", nargs="+", help="deck files, directories or glob patterns")
+    parser.add_argument(
+        "--pattern",
+        default=_DEFAULT_PATTERN,
+        help=f"file name pattern for searching directories recursively (default: {_DEFAULT_PATTERN})",
+    )
+    parser.add_argument("-j", "--workers", type=_positive_integer, help="number of processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=_positive_integer, help="number of files sent to a process at once")
+    parser.add_argument("--cache-dir", type=_pl.Path, help="directory for caching parse results across runs")
+    parser.add_argument("-o", "--output", type=_pl.Path, help="JSON Lines output file (default: standard output)")
+    parser.add_argument(
+        "--profile", action="store_true", help="add token, exception and timing counts of the parsers to the results"
+    )
+    return parser
+
+
+def _positive_integer(string: str) -> int:
+    value = int(string)
+    if value < 1:
+        raise _ap.ArgumentTypeError(f"must be positive: {string}")
+    return value
+
+
+def _iter_deck_paths(paths: _tp.Iterable[str], pattern: str) -> _tp.Iterator[str]:
+    for path in paths:
+        if _os.path.isdir(path):
+            yield from (str(p) for p in _pl.Path(path).rglob(pattern) if p.is_file())
+        elif _os.path.isfile(path):
+            yield path
+        else:
+            yield from (p for p in _glob.glob(path, recursive=True) if _os.path.isfile(p))
+
+
+def _open_output(output: _pl.Path | None) -> _tp.ContextManager[_tp.TextIO]:
+    if output is None:
+        return _ctx.nullcontext(_sys.stdout)
+    return open(output, "w", encoding="utf-8")
+
+
+def _parse_files(
+    paths: _tp.Sequence[str], cache_dir: _pl.Path | None, is_profiled: bool, n_workers: int, chunk_size: int
+) -> _tp.Iterator[dict[str, _tp.Any]]:
+    if n_workers == 1:
+        yield from (_parse_file(p, cache_dir, is_profiled) for p in paths)
+        return
+
+    with _cf.ProcessPoolExecutor(n_workers) as executor:
+        yield from executor.map(
+            _parse_file, paths, [cache_dir] * len(paths), [is_profiled] * len(paths), chunksize=chunk_size
+        )
+
+
+def _parse_file(path: str, cache_dir: _pl.Path | None, is_profiled: bool = False) -> dict[str, _tp.Any]:
+    start_time = _time.perf_counter()
+
+    profile_context: _tp.ContextManager[_pprof.ParseProfile | None] = (
+        _pprof.profile() if is_profiled else _ctx.nullcontext(None)
+    )
+    try:
+        with profile_context as profile:
+            summary = summarize_blocks(_parse_deck(path, cache_dir))
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        # Fails this file only, not the whole batch
+        message = str(error) if isinstance(error, OSError) else f"{type(error).__name__}: {error}"
+        summary = summarize_blocks([])
+        summary["success"] = False
+        summary["errors"].append({"offset": None, "keyword": None, "message": message})
+
+    file_result: dict[str, _tp.Any] = {"path": path, **summary, "seconds": _time.perf_counter() - start_time}
+    if profile is not None:
+        file_result["profile"] = profile.to_dict()
+
+    return file_result
+
+
+def summarize_blocks(parsed_blocks: _tp.Iterable[_pdeck.ParsedBlock]) -> dict[str, _tp.Any]:
+    errors: list[dict[str, _tp.Any]] = []
+    n_blocks_by_keyword: dict[str, int] = {}
+    for parsed_block in parsed_blocks:
+        if parsed_block.keyword:
+            n_blocks_by_keyword[parsed_block.keyword] = n_blocks_by_keyword.get(parsed_block.keyword, 0) + 1
+
+        result = parsed_block.result
+        if isinstance(result, _pcom.ParseError):
+            errors.append(
+                {
+                    "offset": parsed_block.start_index + result.error_start,
+                    "keyword": parsed_block.keyword,
+                    "message": result.error_message,
+                }
+            )
+
+    return {
+        "success": not errors,
+        "n_blocks": sum(n_blocks_by_keyword.values()),
+        "n_blocks_by_keyword": n_blocks_by_keyword,
+        "errors": errors,
+    }
+
+
+def _parse_deck(path: str, cache_dir: _pl.Path | None) -> _tp.Iterable[_pdeck.ParsedBlock]:
+    if cache_dir is None:
+        # Streamed: each block is summarized and dropped before the next one is parsed
+        return _pdeck.parse_deck_file(path)
+
+    with open(path, encoding="utf-8", errors="replace") as file:
+        input_string = file.read()
+
+    return _get_cache(cache_dir).parse_deck(input_string)
+
+
+_CACHES: dict[_pl.Path, _pcache.ParseCache] = {}
+
+
+def _get_cache(cache_dir: _pl.Path) -> _pcache.ParseCache:
+    # One per worker process and directory
+    if (cache := _CACHES.get(cache_dir)) is None:
+        cache = _CACHES[cache_dir] = _pcache.ParseCache(cache_dir)
+    return cache
+
+
+if __name__ == "__main__":
+    _sys.exit(main())
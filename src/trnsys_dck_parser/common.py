@@ -1,3 +1,8 @@
 import re as _re
 
 IDENTIFIER_PATTERN = _re.compile(r"[a-zA-Z]+[a-zA-Z0-9\-_]*")
+
+
+def get_canonical_name(name: str) -> str:
+    # TRNSYS variable and function names are case-insensitive
+    return name.upper()
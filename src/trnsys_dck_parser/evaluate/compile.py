@@ -0,0 +1,283 @@
+import dataclasses as _dc
+import functools as _ft
+import math as _math
+import typing as _tp
+
+import trnsys_dck_parser.common as _com
+import trnsys_dck_parser.evaluate.functions as _efuncs
+import trnsys_dck_parser.evaluate.graph as _egraph
+import trnsys_dck_parser.evaluate.interpret as _einterp
+import trnsys_dck_parser.model.compact as _mcomp
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.expression as _mexpr
+import trnsys_dck_parser.model.traverse as _mtrav
+
+# Python operator and precedence of the binary expressions that map onto Python operators. Powers
+# are compiled to calls of the power function, see `trnsys_dck_parser.evaluate.functions.power`.
+_BINARY_OPERATORS: _tp.Mapping[type[_mexpr.Expression], tuple[str, int]] = {
+    _mexpr.Addition: ("+", 1),
+    _mexpr.Subtraction: ("-", 1),
+    _mexpr.Multiplication: ("*", 2),
+    _mexpr.Division: ("/", 2),
+}
+_NEGATION_PRECEDENCE = 3
+_ATOM_PRECEDENCE = 4
+
+# Python's compiler recurses once per level of nesting and allows 200 nested parentheses: deeper
+# subexpressions are assigned to temporaries first
+_MAX_NESTING_DEPTH = 100
+
+_DEFAULT_CACHE_SIZE = 1024
+
+
+@_dc.dataclass(frozen=True)
+class CompiledExpression:
+    # Takes the values of `variable_names` followed by those of `unit_outputs` as positional arguments
+    function: _tp.Callable[..., float]
+    # Canonical names, see `trnsys_dck_parser.common.get_canonical_name`
+    variable_names: tuple[str, ...]
+    unit_outputs: tuple[tuple[int, int], ...]
+
+    def __call__(self, variables: _einterp.Variables, unit_outputs: _einterp.UnitOutputs | None = None) -> float:
+        return self.function(*_get_arguments(self.variable_names, self.unit_outputs, variables, unit_outputs))
+
+
+@_dc.dataclass(frozen=True)
+class CompiledEquations:
+    # Takes the values of `variable_names` followed by those of `unit_outputs` as positional arguments
+    # and returns the values of the equations in the order of `equation_variable_names`
+    function: _tp.Callable[..., tuple[float, ...]]
+    # Canonical names of the variables the equations use but don't define
+    variable_names: tuple[str, ...]
+    unit_outputs: tuple[tuple[int, int], ...]
+    equation_variable_names: tuple[str, ...]
+
+    def __call__(
+        self, variables: _einterp.Variables, unit_outputs: _einterp.UnitOutputs | None = None
+    ) -> dict[str, float]:
+        values = self.function(*_get_arguments(self.variable_names, self.unit_outputs, variables, unit_outputs))
+        return dict(zip(self.equation_variable_names, values))
+
+
+def _get_arguments(
+    variable_names: _tp.Sequence[str],
+    unit_outputs: _tp.Sequence[tuple[int, int]],
+    variable_values: _einterp.Variables,
+    unit_output_values: _einterp.UnitOutputs | None,
+) -> list[float]:
+    canonical_variable_values = {_com.get_canonical_name(n): v for n, v in variable_values.items()}
+    unit_output_values = unit_output_values or {}
+    return [
+        *[canonical_variable_values[n] for n in variable_names],
+        *[unit_output_values[u] for u in unit_outputs],
+    ]
+
+
+# The code of a subexpression with its precedence and its depth of nesting
+_Code = tuple[str, int, int]
+
+
+def _get_operand(code: _Code, minimum_precedence: int) -> str:
+    operand, precedence, _ = code
+    return operand if precedence >= minimum_precedence else f"({operand})"
+
+
+class _CodeGenerator:
+    def __init__(self, function_names: _tp.Container[str]) -> None:
+        self._function_names = function_names
+        self.parameter_names_by_variable_name: dict[str, str] = {}
+        self.parameter_names_by_unit_output: dict[tuple[int, int], str] = {}
+        self.local_names_by_variable_name: dict[str, str] = {}
+        # Assigning the temporaries the generated code uses, to be executed before it
+        self.statements: list[str] = []
+        self._n_temporaries = 0
+
+    @property
+    def parameter_names(self) -> list[str]:
+        return [*self.parameter_names_by_variable_name.values(), *self.parameter_names_by_unit_output.values()]
+
+    def generate(self, expression: _mexpr.Expression) -> str:
+        # Iterative, children first: expressions can nest deeper than the recursion limit. Views are
+        # read through their node types and children, see `trnsys_dck_parser.model.compact.get_identity`.
+        # The stack holds the nodes with their identities and, once their children are pushed, with
+        # the identities of those.
+        codes: dict[_tp.Hashable, _Code] = {}
+        stack: list[tuple[_mexpr.Expression, _tp.Hashable, list[_tp.Hashable] | None]] = [
+            (expression, _mcomp.get_identity(expression), None)
+        ]
+        while stack:
+            node, identity, child_identities = stack.pop()
+            if identity in codes:
+                continue
+
+            node_type = _mcomp.get_node_type(node)
+            if child_identities is not None:
+                codes[identity] = self._generate(node, node_type, [self._spill(codes[i]) for i in child_identities])
+                continue
+
+            children = _mtrav.get_children(node)
+            if not children:
+                codes[identity] = self._generate(node, node_type, [])
+                continue
+
+            self._check_function(node, node_type)
+            child_identities = [_mcomp.get_identity(c) for c in children]
+            stack.append((node, identity, child_identities))
+            stack.extend((c, i, None) for c, i in zip(reversed(children), reversed(child_identities)))
+
+        code, _, _ = codes[_mcomp.get_identity(expression)]
+        return code
+
+    def _generate(
+        self, expression: _mexpr.Expression, node_type: type[_mexpr.Expression], children: _tp.Sequence[_Code]
+    ) -> _Code:
+        # pylint: disable=too-many-return-statements
+        depth = max((d for _, _, d in children), default=0) + 1
+
+        if node_type is _mexpr.Negation:
+            (x,) = children
+            return f"-{_get_operand(x, _NEGATION_PRECEDENCE)}", _NEGATION_PRECEDENCE, depth
+
+        if node_type is _mexpr.Power:
+            (base, _, _), (exponent, _, _) = children
+            return f"_power({base}, {exponent})", _ATOM_PRECEDENCE, depth
+
+        if binary_operator := _BINARY_OPERATORS.get(node_type):
+            operator, precedence = binary_operator
+            x, y = children
+            # All binary operators are left-associative
+            return f"{_get_operand(x, precedence)} {operator} {_get_operand(y, precedence + 1)}", precedence, depth
+
+        if node_type is _mexpr.FunctionCall:
+            arguments = ", ".join(c for c, _, _ in children)
+            return f"f_{self._check_function(expression, node_type)}({arguments})", _ATOM_PRECEDENCE, depth
+
+        # Only the leaves of views are materialized
+        expression = _mcomp.materialize(expression)
+
+        if isinstance(expression, _mexpr.Literal):
+            code, precedence = self._generate_literal(expression.value)
+            return code, precedence, depth
+
+        if isinstance(expression, _mexpr.Variable):
+            return self._get_variable_local_name(_com.get_canonical_name(expression.name)), _ATOM_PRECEDENCE, depth
+
+        if isinstance(expression, _mexpr.UnitOutput):
+            return self._get_unit_output_local_name(expression), _ATOM_PRECEDENCE, depth
+
+        raise ValueError(f"Unknown expression type: {type(expression).__name__}.")  # pragma: no cover
+
+    def _check_function(self, expression: _mexpr.Expression, node_type: type[_mexpr.Expression]) -> str | None:
+        # Returns the canonical name of the called function
+        if node_type is not _mexpr.FunctionCall:
+            return None
+
+        function = _mcomp.get_function(expression)
+        function_name = _com.get_canonical_name(function)
+        if function_name not in self._function_names:
+            raise ValueError(f"Unknown function: {function}.")
+        return function_name
+
+    def _spill(self, code: _Code) -> _Code:
+        if code[2] < _MAX_NESTING_DEPTH:
+            return code
+
+        temporary_name = f"t{self._n_temporaries}"
+        self._n_temporaries += 1
+        self.statements.append(f"{temporary_name} = {code[0]}")
+        return temporary_name, _ATOM_PRECEDENCE, 1
+
+    @staticmethod
+    def _generate_literal(value: _mexpr.Number) -> tuple[str, int]:
+        code = repr(value) if _math.isfinite(value) else f'float("{value}")'
+        return code, _NEGATION_PRECEDENCE if value < 0 else _ATOM_PRECEDENCE
+
+    def _get_variable_local_name(self, variable_name: str) -> str:
+        if local_name := self.local_names_by_variable_name.get(variable_name):
+            return local_name
+
+        return self.parameter_names_by_variable_name.setdefault(
+            variable_name, f"v{len(self.parameter_names_by_variable_name)}"
+        )
+
+    def _get_unit_output_local_name(self, unit_output: _mexpr.UnitOutput) -> str:
+        key = (unit_output.unit_number, unit_output.output_number)
+        return self.parameter_names_by_unit_output.setdefault(key, f"u{len(self.parameter_names_by_unit_output)}")
+
+
+class Compiler:
+    # `functions` maps canonical function names to their implementations. Generated functions are
+    # cached by their source code which only depends on the structure of the compiled expressions:
+    # variables and unit outputs are positional parameters, so e.g. "a*b+1" and "x*y+1" share one function.
+    def __init__(
+        self,
+        functions: _tp.Mapping[str, _tp.Callable[..., _tp.Any]] | None = None,
+        power: _tp.Callable[[_tp.Any, _tp.Any], _tp.Any] = _efuncs.power,
+        cache_size: int = _DEFAULT_CACHE_SIZE,
+    ) -> None:
+        functions = _efuncs.FUNCTIONS if functions is None else functions
+
+        self._functions = functions
+        self._namespace = {"_power": power, **{f"f_{n}": f for n, f in functions.items()}}
+        self._bindings = ", ".join(f"{n}={n}" for n in self._namespace)
+        self._create_function = _ft.lru_cache(maxsize=cache_size)(self._create_function_uncached)
+
+    def compile_expression(self, expression: _mexpr.Expression) -> CompiledExpression:
+        generator = _CodeGenerator(self._functions)
+        code = generator.generate(expression)
+
+        body = "\n    ".join([*generator.statements, f"return {code}"])
+        function = self._create_function(tuple(generator.parameter_names), body)
+
+        return CompiledExpression(
+            function,
+            tuple(generator.parameter_names_by_variable_name),
+            tuple(generator.parameter_names_by_unit_output),
+        )
+
+    def compile_equations(self, equations: _meqs.Equations) -> CompiledEquations:
+        generator = _CodeGenerator(self._functions)
+
+        graph = _egraph.create_dependency_graph(equations)
+
+        lines = []
+        for i in graph.evaluation_order:
+            equation = equations.equations[i]
+            code = generator.generate(equation.rhs)
+            lines.extend(generator.statements)
+            generator.statements.clear()
+            lines.append(f"e{i} = {code}")
+            generator.local_names_by_variable_name[_com.get_canonical_name(equation.variable_name)] = f"e{i}"
+
+        lines.append(f"return ({''.join(f'e{i}, ' for i in range(len(equations.equations)))})")
+
+        function = self._create_function(tuple(generator.parameter_names), "\n    ".join(lines))
+
+        return CompiledEquations(
+            function,
+            tuple(generator.parameter_names_by_variable_name),
+            tuple(generator.parameter_names_by_unit_output),
+            tuple(e.variable_name for e in equations.equations),
+        )
+
+    def _create_function_uncached(self, parameter_names: tuple[str, ...], body: str) -> _tp.Callable[..., _tp.Any]:
+        parameters = ", ".join([*parameter_names, "*", self._bindings])
+        source = f"def _compiled({parameters}):\n    {body}\n"
+
+        code = compile(source, "<trnsys-dck-parser>", "exec")
+        namespace: dict[str, _tp.Any] = {}
+        # The source is generated from the model only: names are mangled and literals are `repr`s of numbers
+        exec(code, dict(self._namespace), namespace)  # pylint: disable=exec-used
+
+        return namespace["_compiled"]
+
+
+_DEFAULT_COMPILER = Compiler()
+
+
+def compile_expression(expression: _mexpr.Expression) -> CompiledExpression:
+    return _DEFAULT_COMPILER.compile_expression(expression)
+
+
+def compile_equations(equations: _meqs.Equations) -> CompiledEquations:
+    return _DEFAULT_COMPILER.compile_equations(equations)
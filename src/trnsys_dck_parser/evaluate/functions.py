@@ -0,0 +1,109 @@
+import math as _math
+import typing as _tp
+
+# The built-in functions TRNSYS equations can call. Like in TRNSYS, the trigonometric functions
+# work in degrees and the logical functions return 1 for true and 0 for false.
+
+
+def _boolean(value: bool) -> float:
+    return 1.0 if value else 0.0
+
+
+def ae(x: float, y: float, tolerance: float) -> float:
+    return _boolean(abs(x - y) < tolerance)
+
+
+def and_(x: float, y: float) -> float:
+    return _boolean(x != 0 and y != 0)
+
+
+def or_(x: float, y: float) -> float:
+    return _boolean(x != 0 or y != 0)
+
+
+def not_(x: float) -> float:
+    return _boolean(x == 0)
+
+
+def eql(x: float, y: float) -> float:
+    return _boolean(x == y)
+
+
+def ne(x: float, y: float) -> float:
+    return _boolean(x != y)
+
+
+def gt(x: float, y: float) -> float:
+    return _boolean(x > y)
+
+
+def ge(x: float, y: float) -> float:
+    return _boolean(x >= y)
+
+
+def lt(x: float, y: float) -> float:
+    return _boolean(x < y)
+
+
+def le(x: float, y: float) -> float:
+    return _boolean(x <= y)
+
+
+def sin(x: float) -> float:
+    return _math.sin(_math.radians(x))
+
+
+def cos(x: float) -> float:
+    return _math.cos(_math.radians(x))
+
+
+def tan(x: float) -> float:
+    return _math.tan(_math.radians(x))
+
+
+def asin(x: float) -> float:
+    return _math.degrees(_math.asin(x))
+
+
+def acos(x: float) -> float:
+    return _math.degrees(_math.acos(x))
+
+
+def atan(x: float) -> float:
+    return _math.degrees(_math.atan(x))
+
+
+def int_(x: float) -> float:
+    return float(_math.trunc(x))
+
+
+FUNCTIONS: _tp.Mapping[str, _tp.Callable[..., float]] = {
+    "ABS": abs,
+    "ACOS": acos,
+    "AE": ae,
+    "AND": and_,
+    "ASIN": asin,
+    "ATAN": atan,
+    "COS": cos,
+    "EQL": eql,
+    "EXP": _math.exp,
+    "GE": ge,
+    "GT": gt,
+    "INT": int_,
+    "LE": le,
+    "LN": _math.log,
+    "LOG": _math.log10,
+    "LT": lt,
+    "MAX": max,
+    "MIN": min,
+    "MOD": _math.fmod,
+    "NE": ne,
+    "NOT": not_,
+    "OR": or_,
+    "SIN": sin,
+    "TAN": tan,
+}
+
+# Powers of negative numbers with non-integer exponents aren't real: `math.pow` raises instead
+# of returning a complex number like `**` does.
+power = _math.pow
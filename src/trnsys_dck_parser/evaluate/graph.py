@@ -0,0 +1,136 @@
+import dataclasses as _dc
+import functools as _ft
+import typing as _tp
+
+import trnsys_dck_parser.common as _com
+import trnsys_dck_parser.model.compact as _mcomp
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.expression as _mexpr
+import trnsys_dck_parser.model.traverse as _mtrav
+
+# A canonical variable name (see `trnsys_dck_parser.common.get_canonical_name`) or a
+# (unit number, output number) pair
+Node = str | tuple[int, int]
+
+
+class CyclicDependencyError(ValueError):
+    def __init__(self, cycle: _tp.Sequence[str]) -> None:
+        super().__init__(f"Cyclic dependency involving {cycle[0]}: {' -> '.join([*cycle, cycle[0]])}.")
+        self.cycle = tuple(cycle)
+
+
+@_dc.dataclass(frozen=True)
+class DependencyGraph:
+    equations: tuple[_meqs.Equation, ...]
+    # Canonical names of the defined variables
+    variable_names: tuple[str, ...]
+    # By canonical name of the defined variable
+    equation_indices: _tp.Mapping[str, int]
+    # Variables and unit outputs each equation's right-hand side references, in order of first occurrence
+    dependencies: tuple[tuple[Node, ...], ...]
+    # Indices of the equations directly referencing a node
+    dependents: _tp.Mapping[Node, tuple[int, ...]]
+    # Equation indices such that each equation comes after the equations it depends on
+    evaluation_order: tuple[int, ...]
+
+    @property
+    def inputs(self) -> tuple[Node, ...]:
+        # The variables and unit outputs that are referenced but not defined by the equations
+        return tuple(n for n in self.dependents if n not in self.equation_indices)
+
+    def get_downstream_equation_indices(self, nodes: _tp.Iterable[Node]) -> tuple[int, ...]:
+        # The indices of all equations depending directly or transitively on any of `nodes`, in evaluation order
+        reached: set[int] = set()
+        stack = [i for n in nodes for i in self.dependents.get(n, ())]
+        while stack:
+            index = stack.pop()
+            if index in reached:
+                continue
+            reached.add(index)
+            stack.extend(self.dependents.get(self.variable_names[index], ()))
+
+        return tuple(sorted(reached, key=self._evaluation_positions.__getitem__))
+
+    @_ft.cached_property
+    def _evaluation_positions(self) -> _tp.Sequence[int]:
+        positions = [0] * len(self.evaluation_order)
+        for position, index in enumerate(self.evaluation_order):
+            positions[index] = position
+        return positions
+
+
+def create_dependency_graph(equations: _meqs.Equations | _tp.Sequence[_meqs.Equation]) -> DependencyGraph:
+    equations_sequence = tuple(equations.equations if isinstance(equations, _meqs.Equations) else equations)
+
+    variable_names = tuple(_com.get_canonical_name(e.variable_name) for e in equations_sequence)
+    equation_indices = {n: i for i, n in enumerate(variable_names)}
+    if len(equation_indices) != len(variable_names):
+        raise ValueError("Variables must be defined only once.")
+
+    dependencies = tuple(tuple(dict.fromkeys(iter_dependencies(e.rhs))) for e in equations_sequence)
+
+    dependents: dict[Node, list[int]] = {}
+    for index, nodes in enumerate(dependencies):
+        for node in nodes:
+            dependents.setdefault(node, []).append(index)
+
+    evaluation_order = _get_evaluation_order(equations_sequence, equation_indices, dependencies)
+
+    return DependencyGraph(
+        equations_sequence,
+        variable_names,
+        equation_indices,
+        dependencies,
+        {n: tuple(i) for n, i in dependents.items()},
+        evaluation_order,
+    )
+
+
+def iter_dependencies(expression: _mexpr.Expression) -> _tp.Iterator[Node]:
+    for node in _mtrav.walk(expression):
+        # Only the leaves of views
+        if _mcomp.get_node_type(node) in (_mexpr.Variable, _mexpr.UnitOutput):
+            node = _mcomp.materialize(node)
+        if isinstance(node, _mexpr.Variable):
+            yield _com.get_canonical_name(node.name)
+        elif isinstance(node, _mexpr.UnitOutput):
+            yield node.unit_number, node.output_number
+
+
+def _get_evaluation_order(
+    equations: _tp.Sequence[_meqs.Equation],
+    equation_indices: _tp.Mapping[str, int],
+    dependencies: _tp.Sequence[_tp.Sequence[Node]],
+) -> tuple[int, ...]:
+    # Iterative depth-first search: decks can contain chains of thousands of equations, which would
+    # exceed the recursion limit
+    equation_dependencies = [
+        [equation_indices[n] for n in d if isinstance(n, str) and n in equation_indices] for d in dependencies
+    ]
+
+    order: list[int] = []
+    visited: set[int] = set()
+    for root_index in range(len(equations)):
+        if root_index in visited:
+            continue
+
+        path = [root_index]
+        on_path = {root_index}
+        iterators = [iter(equation_dependencies[root_index])]
+        while iterators:
+            dependency_index = next(iterators[-1], None)
+            if dependency_index is None:
+                index = path.pop()
+                on_path.remove(index)
+                iterators.pop()
+                visited.add(index)
+                order.append(index)
+            elif dependency_index in on_path:
+                cycle = path[path.index(dependency_index) :]
+                raise CyclicDependencyError([equations[i].variable_name for i in cycle])
+            elif dependency_index not in visited:
+                path.append(dependency_index)
+                on_path.add(dependency_index)
+                iterators.append(iter(equation_dependencies[dependency_index]))
+
+    return tuple(order)
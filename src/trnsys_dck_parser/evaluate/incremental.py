@@ -0,0 +1,100 @@
+import typing as _tp
+
+import trnsys_dck_parser.common as _com
+import trnsys_dck_parser.evaluate.compile as _ecomp
+import trnsys_dck_parser.evaluate.graph as _egraph
+import trnsys_dck_parser.evaluate.interpret as _einterp
+import trnsys_dck_parser.model.equations as _meqs
+
+
+class IncrementalEvaluator:
+    # Keeps the values of all equations and, when inputs change, re-evaluates only the equations
+    # downstream of them. Propagation stops at equations whose value didn't change.
+    def __init__(
+        self,
+        equations: _meqs.Equations,
+        variables: _einterp.Variables,
+        unit_outputs: _einterp.UnitOutputs | None = None,
+        compiler: _ecomp.Compiler | None = None,
+    ) -> None:
+        self.graph = _egraph.create_dependency_graph(equations)
+
+        compiler = compiler or _ecomp.Compiler()
+        compiled_expressions = [compiler.compile_expression(e.rhs) for e in self.graph.equations]
+        self._functions = [c.function for c in compiled_expressions]
+        self._arguments: list[list[_egraph.Node]] = [[*c.variable_names, *c.unit_outputs] for c in compiled_expressions]
+        self._variable_names = self.graph.variable_names
+        # Interactive use typically changes the same inputs over and over again
+        self._downstream_equation_indices: dict[frozenset[_egraph.Node], tuple[int, ...]] = {}
+
+        self._values: dict[_egraph.Node, float] = {}
+        self._set_inputs(variables, unit_outputs or {})
+
+        missing_inputs = [n for n in self.graph.inputs if n not in self._values]
+        if missing_inputs:
+            raise ValueError(f"Missing values for: {', '.join(map(str, missing_inputs))}.")
+
+        for index in self.graph.evaluation_order:
+            self._evaluate(index)
+
+    @property
+    def values(self) -> dict[str, float]:
+        return {e.variable_name: self._values[n] for e, n in zip(self.graph.equations, self._variable_names)}
+
+    def __getitem__(self, variable_name: str) -> float:
+        canonical_name = _com.get_canonical_name(variable_name)
+        if canonical_name not in self.graph.equation_indices:
+            raise KeyError(variable_name)
+        return self._values[canonical_name]
+
+    def update(
+        self, variables: _einterp.Variables | None = None, unit_outputs: _einterp.UnitOutputs | None = None
+    ) -> dict[str, float]:
+        # Returns the new values of the equations whose value changed
+        changed_nodes = self._set_inputs(variables or {}, unit_outputs or {})
+
+        changed_values: dict[str, float] = {}
+        if not changed_nodes:
+            return changed_values
+
+        key = frozenset(changed_nodes)
+        if (downstream_equation_indices := self._downstream_equation_indices.get(key)) is None:
+            downstream_equation_indices = self.graph.get_downstream_equation_indices(key)
+            self._downstream_equation_indices[key] = downstream_equation_indices
+
+        for index in downstream_equation_indices:
+            if not changed_nodes.intersection(self.graph.dependencies[index]):
+                continue
+
+            if self._evaluate(index):
+                changed_nodes.add(self._variable_names[index])
+                changed_values[self.graph.equations[index].variable_name] = self._values[self._variable_names[index]]
+
+        return changed_values
+
+    def _set_inputs(self, variables: _einterp.Variables, unit_outputs: _einterp.UnitOutputs) -> set[_egraph.Node]:
+        inputs: list[tuple[_egraph.Node, float]] = [
+            *[(_com.get_canonical_name(n), v) for n, v in variables.items()],
+            *unit_outputs.items(),
+        ]
+
+        changed_nodes: set[_egraph.Node] = set()
+        for node, value in inputs:
+            if node in self.graph.equation_indices:
+                raise ValueError(f"{node} is defined by an equation and can't be set.")
+            if self._values.get(node) != value:
+                self._values[node] = value
+                changed_nodes.add(node)
+
+        return changed_nodes
+
+    def _evaluate(self, index: int) -> bool:
+        values = self._values
+        value = self._functions[index](*[values[n] for n in self._arguments[index]])
+
+        variable_name = self._variable_names[index]
+        if values.get(variable_name) == value:
+            return False
+
+        values[variable_name] = value
+        return True
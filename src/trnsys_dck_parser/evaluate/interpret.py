@@ -0,0 +1,61 @@
+import typing as _tp
+
+import trnsys_dck_parser.common as _com
+import trnsys_dck_parser.evaluate.functions as _efuncs
+import trnsys_dck_parser.model.compact as _mcomp
+import trnsys_dck_parser.model.expression as _mexpr
+
+Variables = _tp.Mapping[str, float]
+UnitOutputs = _tp.Mapping[tuple[int, int], float]
+
+
+# Evaluates an expression by walking its tree. `variables` must be keyed by canonical names
+# (see `trnsys_dck_parser.common.get_canonical_name`).
+def evaluate_expression(  # pylint: disable=too-many-return-statements
+    expression: _mexpr.Expression, variables: Variables, unit_outputs: UnitOutputs
+) -> float:
+    if isinstance(expression, _mexpr.Literal):
+        return expression.value
+
+    if isinstance(expression, _mexpr.Variable):
+        return variables[_com.get_canonical_name(expression.name)]
+
+    if isinstance(expression, _mexpr.UnitOutput):
+        return unit_outputs[(expression.unit_number, expression.output_number)]
+
+    if isinstance(expression, _mexpr.Negation):
+        return -evaluate_expression(expression.x, variables, unit_outputs)
+
+    if isinstance(expression, _mexpr.BinaryExpression):
+        x = evaluate_expression(expression.x, variables, unit_outputs)
+        y = evaluate_expression(expression.y, variables, unit_outputs)
+        return _evaluate_binary_expression(expression, x, y)
+
+    if isinstance(expression, _mexpr.FunctionCall):
+        function = _efuncs.FUNCTIONS[_com.get_canonical_name(expression.function)]
+        arguments = [evaluate_expression(a, variables, unit_outputs) for a in expression.arguments]
+        return function(*arguments)
+
+    if isinstance(expression, _mcomp.ExpressionView):
+        return evaluate_expression(expression.materialize(), variables, unit_outputs)
+
+    raise ValueError(f"Unknown expression type: {type(expression).__name__}.")  # pragma: no cover
+
+
+def _evaluate_binary_expression(expression: _mexpr.BinaryExpression, x: float, y: float) -> float:
+    if isinstance(expression, _mexpr.Addition):
+        return x + y
+
+    if isinstance(expression, _mexpr.Subtraction):
+        return x - y
+
+    if isinstance(expression, _mexpr.Multiplication):
+        return x * y
+
+    if isinstance(expression, _mexpr.Division):
+        return x / y
+
+    if isinstance(expression, _mexpr.Power):
+        return _efuncs.power(x, y)
+
+    raise ValueError(f"Unknown binary expression type: {type(expression).__name__}.")  # pragma: no cover
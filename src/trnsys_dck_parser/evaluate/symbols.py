@@ -0,0 +1,101 @@
+import dataclasses as _dc
+import typing as _tp
+
+import trnsys_dck_parser.common as _com
+import trnsys_dck_parser.evaluate.graph as _egraph
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.expression as _mexpr
+import trnsys_dck_parser.model.unit as _munit
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.deck as _pdeck
+
+# A canonical variable name or a (unit number, output number) pair, as in the dependency graph
+Symbol = _egraph.Node
+
+
+@_dc.dataclass(frozen=True)
+class Site:
+    # An equation or, for uses only, a unit reading the symbol in its parameters, inputs or initial values
+    owner: _meqs.Equation | _munit.Unit
+    # Offsets within the deck: of the equation if known, of the unit's block for units
+    start_index: int | None
+    end_index: int | None
+
+
+@_dc.dataclass(frozen=True)
+class SymbolTable:
+    # By canonical variable name. Variables should be defined once, but decks with duplicate
+    # definitions are indexed all the same.
+    definitions: _tp.Mapping[str, tuple[Site, ...]]
+    # By symbol, in order of appearance, each site once
+    uses: _tp.Mapping[Symbol, tuple[Site, ...]]
+
+    def get_definition(self, variable_name: str) -> Site | None:
+        definitions = self.definitions.get(_com.get_canonical_name(variable_name))
+        return definitions[0] if definitions else None
+
+    def get_uses(self, symbol: Symbol) -> tuple[Site, ...]:
+        if isinstance(symbol, str):
+            symbol = _com.get_canonical_name(symbol)
+        return self.uses.get(symbol, ())
+
+    def get_readers(self, unit_number: int, output_number: int) -> tuple[Site, ...]:
+        return self.uses.get((unit_number, output_number), ())
+
+
+class _SymbolTableBuilder:
+    def __init__(self) -> None:
+        self._definitions: dict[str, list[Site]] = {}
+        self._uses: dict[Symbol, list[Site]] = {}
+
+    def add_equation(self, equation: _meqs.Equation, offset: int) -> None:
+        if equation.start_index is None or equation.end_index is None:
+            site = Site(equation, None, None)
+        else:
+            site = Site(equation, offset + equation.start_index, offset + equation.end_index)
+
+        self._definitions.setdefault(_com.get_canonical_name(equation.variable_name), []).append(site)
+        self._add_uses(site, [equation.rhs])
+
+    def add_unit(self, unit: _munit.Unit, start_index: int, end_index: int) -> None:
+        expressions = [
+            *(unit.parameters.values if unit.parameters else []),
+            *(unit.inputs.connections + unit.inputs.initial_values if unit.inputs else []),
+            *(unit.derivatives.initial_values if unit.derivatives else []),
+        ]
+        self._add_uses(Site(unit, start_index, end_index), expressions)
+
+    def _add_uses(self, site: Site, expressions: _tp.Iterable[_mexpr.Expression]) -> None:
+        symbols = dict.fromkeys(s for e in expressions for s in _egraph.iter_dependencies(e))
+        for symbol in symbols:
+            self._uses.setdefault(symbol, []).append(site)
+
+    def build(self) -> SymbolTable:
+        return SymbolTable(
+            {n: tuple(s) for n, s in self._definitions.items()}, {s: tuple(u) for s, u in self._uses.items()}
+        )
+
+
+def create_symbol_table(equations: _meqs.Equations | _tp.Sequence[_meqs.Equation]) -> SymbolTable:
+    builder = _SymbolTableBuilder()
+    for equation in equations.equations if isinstance(equations, _meqs.Equations) else equations:
+        builder.add_equation(equation, 0)
+    return builder.build()
+
+
+def create_deck_symbol_table(parsed_blocks: _tp.Iterable[_pdeck.ParsedBlock]) -> SymbolTable:
+    # Blocks which failed to parse are skipped
+    builder = _SymbolTableBuilder()
+    for parsed_block in parsed_blocks:
+        if not _pcom.is_success(parsed_block.result):
+            continue
+
+        block = parsed_block.result.value
+        if isinstance(block, _meqs.Equations):
+            for equation in block.equations:
+                builder.add_equation(equation, parsed_block.start_index)
+        elif isinstance(block, _munit.Unit):
+            end_index = parsed_block.start_index + len(parsed_block.input_string)
+            builder.add_unit(block, parsed_block.start_index, end_index)
+
+    return builder.build()
@@ -0,0 +1,155 @@
+import typing as _tp
+
+import numpy as _np
+import numpy.typing as _npt
+
+import trnsys_dck_parser.common as _com
+import trnsys_dck_parser.evaluate.compile as _ecomp
+import trnsys_dck_parser.model.equations as _meqs
+
+# Requires the optional `numpy` dependency.
+
+Variables = _tp.Mapping[str, _npt.ArrayLike]
+UnitOutputs = _tp.Mapping[tuple[int, int], _npt.ArrayLike]
+
+
+def _boolean(values: _npt.NDArray[_np.bool_]) -> _npt.NDArray[_np.float64]:
+    return values.astype(_np.float64)
+
+
+def ae(x: _npt.ArrayLike, y: _npt.ArrayLike, tolerance: _npt.ArrayLike) -> _npt.NDArray[_np.float64]:
+    return _boolean(_np.abs(_np.subtract(x, y)) < tolerance)
+
+
+def and_(x: _npt.ArrayLike, y: _npt.ArrayLike) -> _npt.NDArray[_np.float64]:
+    return _boolean(_np.logical_and(_np.not_equal(x, 0), _np.not_equal(y, 0)))
+
+
+def or_(x: _npt.ArrayLike, y: _npt.ArrayLike) -> _npt.NDArray[_np.float64]:
+    return _boolean(_np.logical_or(_np.not_equal(x, 0), _np.not_equal(y, 0)))
+
+
+def not_(x: _npt.ArrayLike) -> _npt.NDArray[_np.float64]:
+    return _boolean(_np.equal(x, 0))
+
+
+def eql(x: _npt.ArrayLike, y: _npt.ArrayLike) -> _npt.NDArray[_np.float64]:
+    return _boolean(_np.equal(x, y))
+
+
+def ne(x: _npt.ArrayLike, y: _npt.ArrayLike) -> _npt.NDArray[_np.float64]:
+    return _boolean(_np.not_equal(x, y))
+
+
+def gt(x: _npt.ArrayLike, y: _npt.ArrayLike) -> _npt.NDArray[_np.float64]:
+    return _boolean(_np.greater(x, y))
+
+
+def ge(x: _npt.ArrayLike, y: _npt.ArrayLike) -> _npt.NDArray[_np.float64]:
+    return _boolean(_np.greater_equal(x, y))
+
+
+def lt(x: _npt.ArrayLike, y: _npt.ArrayLike) -> _npt.NDArray[_np.float64]:
+    return _boolean(_np.less(x, y))
+
+
+def le(x: _npt.ArrayLike, y: _npt.ArrayLike) -> _npt.NDArray[_np.float64]:
+    return _boolean(_np.less_equal(x, y))
+
+
+def sin(x: _npt.ArrayLike) -> _npt.NDArray[_np.float64]:
+    return _np.sin(_np.radians(x))
+
+
+def cos(x: _npt.ArrayLike) -> _npt.NDArray[_np.float64]:
+    return _np.cos(_np.radians(x))
+
+
+def tan(x: _npt.ArrayLike) -> _npt.NDArray[_np.float64]:
+    return _np.tan(_np.radians(x))
+
+
+def asin(x: _npt.ArrayLike) -> _npt.NDArray[_np.float64]:
+    return _np.degrees(_np.arcsin(x))
+
+
+def acos(x: _npt.ArrayLike) -> _npt.NDArray[_np.float64]:
+    return _np.degrees(_np.arccos(x))
+
+
+def atan(x: _npt.ArrayLike) -> _npt.NDArray[_np.float64]:
+    return _np.degrees(_np.arctan(x))
+
+
+# Vectorized counterparts of `trnsys_dck_parser.evaluate.functions.FUNCTIONS`
+FUNCTIONS: _tp.Mapping[str, _tp.Callable[..., _npt.NDArray[_np.float64]]] = {
+    "ABS": _np.abs,
+    "ACOS": acos,
+    "AE": ae,
+    "AND": and_,
+    "ASIN": asin,
+    "ATAN": atan,
+    "COS": cos,
+    "EQL": eql,
+    "EXP": _np.exp,
+    "GE": ge,
+    "GT": gt,
+    "INT": _np.trunc,
+    "LE": le,
+    "LN": _np.log,
+    "LOG": _np.log10,
+    "LT": lt,
+    "MAX": _np.maximum,
+    "MIN": _np.minimum,
+    "MOD": _np.fmod,
+    "NE": ne,
+    "NOT": not_,
+    "OR": or_,
+    "SIN": sin,
+    "TAN": tan,
+}
+
+# `float_power` always computes in floating point: `power` would reject negative integer exponents
+# of integer literals such as "10**-8".
+_COMPILER = _ecomp.Compiler(FUNCTIONS, _np.float_power)
+
+
+def compile_equations(equations: _meqs.Equations) -> _ecomp.CompiledEquations:
+    return _COMPILER.compile_equations(equations)
+
+
+def evaluate_equations(
+    equations: _meqs.Equations, variables: Variables, unit_outputs: UnitOutputs | None = None
+) -> dict[str, _npt.NDArray[_np.float64]]:
+    compiled_equations = compile_equations(equations)
+
+    canonical_variables = {_com.get_canonical_name(n): v for n, v in variables.items()}
+    unit_outputs = unit_outputs or {}
+    arguments = [
+        *[_np.asarray(canonical_variables[n], dtype=_np.float64) for n in compiled_equations.variable_names],
+        *[_np.asarray(unit_outputs[u], dtype=_np.float64) for u in compiled_equations.unit_outputs],
+    ]
+
+    values = compiled_equations.function(*arguments)
+
+    # Equations not depending on any input evaluate to scalars: give all results the same shape
+    shape = _np.broadcast_shapes(*[a.shape for a in arguments])
+    results = {}
+    for variable_name, value in zip(compiled_equations.equation_variable_names, values):
+        array = _np.asarray(value, dtype=_np.float64)
+        results[variable_name] = array if array.shape == shape else _np.broadcast_to(array, shape).copy()
+
+    return results
+
+
+def evaluate_equations_to_structured_array(
+    equations: _meqs.Equations, variables: Variables, unit_outputs: UnitOutputs | None = None
+) -> _npt.NDArray[_np.void]:
+    results = evaluate_equations(equations, variables, unit_outputs)
+
+    shape = next(iter(results.values())).shape if results else ()
+    structured_array = _np.empty(shape, dtype=[(n, _np.float64) for n in results])
+    for variable_name, values in results.items():
+        structured_array[variable_name] = values
+
+    return structured_array
@@ -0,0 +1,475 @@
+import array as _array
+import dataclasses as _dc
+import enum as _enum
+import typing as _tp
+
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.expression as _mexpr
+
+_EquationsT = _tp.TypeVar("_EquationsT", bound=_meqs.Equations)
+
+
+class NodeKind(_enum.IntEnum):
+    INTEGER = 0
+    # An integer not fitting into 64 bits
+    BIG_INTEGER = 1
+    FLOAT = 2
+    VARIABLE = 3
+    UNIT_OUTPUT = 4
+    FUNCTION_CALL = 5
+    NEGATION = 6
+    ADDITION = 7
+    SUBTRACTION = 8
+    MULTIPLICATION = 9
+    DIVISION = 10
+    POWER = 11
+
+
+_BINARY_EXPRESSION_TYPES: _tp.Mapping[NodeKind, type[_mexpr.BinaryExpression]] = {
+    NodeKind.ADDITION: _mexpr.Addition,
+    NodeKind.SUBTRACTION: _mexpr.Subtraction,
+    NodeKind.MULTIPLICATION: _mexpr.Multiplication,
+    NodeKind.DIVISION: _mexpr.Division,
+    NodeKind.POWER: _mexpr.Power,
+}
+_BINARY_EXPRESSION_KINDS = {t: k for k, t in _BINARY_EXPRESSION_TYPES.items()}
+
+_NODE_TYPES: _tp.Mapping[NodeKind, type[_mexpr.Expression]] = {
+    NodeKind.INTEGER: _mexpr.Literal,
+    NodeKind.BIG_INTEGER: _mexpr.Literal,
+    NodeKind.FLOAT: _mexpr.Literal,
+    NodeKind.VARIABLE: _mexpr.Variable,
+    NodeKind.UNIT_OUTPUT: _mexpr.UnitOutput,
+    NodeKind.FUNCTION_CALL: _mexpr.FunctionCall,
+    NodeKind.NEGATION: _mexpr.Negation,
+    **_BINARY_EXPRESSION_TYPES,
+}
+
+_INT64_MIN = -(2**63)
+_INT64_MAX = 2**63 - 1
+
+
+class ExpressionArrays:
+    # Expression nodes stored in typed arrays instead of as one object each: node `i` is `kinds[i]`
+    # and its two operands `operands[2*i]` and `operands[2*i + 1]`, i.e. takes 17 bytes plus the ones
+    # for its float value or function arguments. Depending on the node's kind, the operands are
+    #  - integers: the value
+    #  - big integers: the index into `big_integers`
+    #  - floats: the index into `floats`
+    #  - variables: the index of the name into `names`
+    #  - unit outputs: the unit and the output number
+    #  - function calls: the index of the function name into `names` and the index into `arguments`
+    #    of the number of arguments, which is followed by the argument nodes
+    #  - negations: the negated node
+    #  - binary expressions: the two operand nodes
+    # The arrays support the buffer protocol, e.g. for wrapping them in NumPy arrays without copying.
+    def __init__(self) -> None:
+        self.kinds = _array.array("B")
+        self.operands = _array.array("q")
+        self.floats = _array.array("d")
+        self.arguments = _array.array("q")
+        self.names: list[str] = []
+        self.big_integers: list[int] = []
+        self._name_indices: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @property
+    def n_bytes(self) -> int:
+        # Of the arrays' items, without the names and big integers
+        arrays: list[_array.array] = [self.kinds, self.operands, self.floats, self.arguments]
+        return sum(len(a) * a.itemsize for a in arrays)
+
+    def append_literal(self, value: _mexpr.Number) -> int:
+        if isinstance(value, float):
+            self.floats.append(value)
+            return self._append(NodeKind.FLOAT, len(self.floats) - 1)
+
+        if _INT64_MIN <= value <= _INT64_MAX:
+            return self._append(NodeKind.INTEGER, value)
+
+        self.big_integers.append(value)
+        return self._append(NodeKind.BIG_INTEGER, len(self.big_integers) - 1)
+
+    def append_variable(self, name: str) -> int:
+        return self._append(NodeKind.VARIABLE, self._get_name_index(name))
+
+    def append_unit_output(self, unit_number: int, output_number: int) -> int:
+        return self._append(NodeKind.UNIT_OUTPUT, unit_number, output_number)
+
+    def append_function_call(self, function: str, arguments: _tp.Sequence[int]) -> int:
+        arguments_index = len(self.arguments)
+        self.arguments.append(len(arguments))
+        self.arguments.extend(arguments)
+        return self._append(NodeKind.FUNCTION_CALL, self._get_name_index(function), arguments_index)
+
+    def append_negation(self, x: int) -> int:
+        return self._append(NodeKind.NEGATION, x)
+
+    def append_binary_expression(self, expression_type: type[_mexpr.BinaryExpression], x: int, y: int) -> int:
+        return self._append(_BINARY_EXPRESSION_KINDS[expression_type], x, y)
+
+    def get_kind(self, index: int) -> NodeKind:
+        return NodeKind(self.kinds[index])
+
+    def get_node_type(self, index: int) -> type[_mexpr.Expression]:
+        # The type of the ordinary node
+        return _NODE_TYPES[NodeKind(self.kinds[index])]
+
+    def get_function(self, index: int) -> str:
+        if self.kinds[index] != NodeKind.FUNCTION_CALL:
+            raise ValueError(f"Not a function call: {self.get_kind(index).name}.")
+        return self.names[self.operands[2 * index]]
+
+    def get_child_indices(self, index: int) -> _tp.Sequence[int]:
+        kind = self.kinds[index]
+
+        if kind == NodeKind.NEGATION:
+            return (self.operands[2 * index],)
+
+        if kind >= NodeKind.ADDITION:
+            return self.operands[2 * index : 2 * index + 2]
+
+        if kind == NodeKind.FUNCTION_CALL:
+            arguments_index = self.operands[2 * index + 1]
+            n_arguments = self.arguments[arguments_index]
+            return self.arguments[arguments_index + 1 : arguments_index + 1 + n_arguments]
+
+        return ()
+
+    def add(self, expression: _mexpr.Expression) -> int:
+        # Appends the nodes of `expression` and returns the index of its root. Subtrees occurring
+        # several times as the same object are only appended once.
+        indices: dict[int, int] = {}
+        stack: list[tuple[_mexpr.Expression, bool]] = [(expression, False)]
+        while stack:
+            node, are_children_done = stack.pop()
+            if id(node) in indices:
+                continue
+
+            if isinstance(node, ExpressionView) and node.arrays is self:
+                indices[id(node)] = node.index
+                continue
+
+            children = _get_node_children(node)
+            if are_children_done or not children:
+                indices[id(node)] = self._append_node(node, [indices[id(c)] for c in children])
+            else:
+                stack.append((node, True))
+                stack.extend((c, False) for c in children)
+
+        return indices[id(expression)]
+
+    def materialize(self, index: int, node_factory: _mexpr.NodeFactory | None = None) -> _mexpr.Expression:
+        # Creates the ordinary expression of the node at `index`. Iterative: expressions can nest deeper
+        # than the recursion limit.
+        node_factory = _mexpr.NodeFactory() if node_factory is None else node_factory
+
+        expressions: dict[int, _mexpr.Expression] = {}
+        stack = [(index, False)]
+        while stack:
+            node_index, are_children_done = stack.pop()
+            if node_index in expressions:
+                continue
+
+            child_indices = self.get_child_indices(node_index)
+            if are_children_done or not child_indices:
+                children = [expressions[i] for i in child_indices]
+                expressions[node_index] = self.create_node(node_index, children, node_factory)
+            else:
+                stack.append((node_index, True))
+                stack.extend((i, False) for i in child_indices)
+
+        return expressions[index]
+
+    def get_view(self, index: int) -> "ExpressionView":
+        return ExpressionView(self, index)
+
+    def _append(self, kind: NodeKind, first: int, second: int = 0) -> int:
+        self.kinds.append(kind)
+        self.operands.append(first)
+        self.operands.append(second)
+        return len(self.kinds) - 1
+
+    def _get_name_index(self, name: str) -> int:
+        if (name_index := self._name_indices.get(name)) is None:
+            name_index = self._name_indices[name] = len(self.names)
+            self.names.append(name)
+        return name_index
+
+    def _append_node(self, node: _mexpr.Expression, child_indices: _tp.Sequence[int]) -> int:
+        # pylint: disable=too-many-return-statements
+        if isinstance(node, ExpressionView):
+            return self.add(node.materialize())
+
+        if isinstance(node, _mexpr.Literal):
+            return self.append_literal(node.value)
+
+        if isinstance(node, _mexpr.Variable):
+            return self.append_variable(node.name)
+
+        if isinstance(node, _mexpr.UnitOutput):
+            return self.append_unit_output(node.unit_number, node.output_number)
+
+        if isinstance(node, _mexpr.FunctionCall):
+            return self.append_function_call(node.function, child_indices)
+
+        if isinstance(node, _mexpr.Negation):
+            return self.append_negation(*child_indices)
+
+        if isinstance(node, _mexpr.BinaryExpression):
+            return self.append_binary_expression(type(node), *child_indices)
+
+        raise ValueError(f"Unknown expression type: {type(node).__name__}.")  # pragma: no cover
+
+    def create_node(
+        self,
+        index: int,
+        children: _tp.Sequence[_mexpr.Expression],
+        node_factory: _mexpr.NodeFactory | None = None,
+    ) -> _mexpr.Expression:
+        # The ordinary node at `index` with `children` as its children
+        # pylint: disable=too-many-return-statements
+        node_factory = _mexpr.NodeFactory() if node_factory is None else node_factory
+        kind = self.kinds[index]
+        first, second = self.operands[2 * index : 2 * index + 2]
+
+        if kind == NodeKind.INTEGER:
+            return node_factory.literal(first)
+
+        if kind == NodeKind.BIG_INTEGER:
+            return node_factory.literal(self.big_integers[first])
+
+        if kind == NodeKind.FLOAT:
+            return node_factory.literal(self.floats[first])
+
+        if kind == NodeKind.VARIABLE:
+            return node_factory.variable(self.names[first])
+
+        if kind == NodeKind.UNIT_OUTPUT:
+            return node_factory.unit_output(first, second)
+
+        if kind == NodeKind.FUNCTION_CALL:
+            return node_factory.function_call(self.names[first], children)
+
+        if kind == NodeKind.NEGATION:
+            return node_factory.negation(*children)
+
+        x, y = children
+        return node_factory.binary_expression(_BINARY_EXPRESSION_TYPES[NodeKind(kind)], x, y)
+
+
+def _get_node_children(expression: _mexpr.Expression) -> _tp.Sequence[_mexpr.Expression]:
+    # Of ordinary nodes: views are added as a whole, see `ExpressionArrays.add`
+    if isinstance(expression, _mexpr.UnaryExpression):
+        return (expression.x,)
+    if isinstance(expression, _mexpr.BinaryExpression):
+        return expression.x, expression.y
+    if isinstance(expression, _mexpr.FunctionCall):
+        return expression.arguments
+    return ()
+
+
+# A node of an `ExpressionArrays`, in place of an ordinary expression. The ordinary expression is only
+# created when asked for, and not kept: views are compared and hashed through the arrays. Consumers of
+# expressions, such as the compiler and the writer, read views through their node type and children, see
+# `get_node_type`, and only materialize their leaves.
+@_dc.dataclass(frozen=True, slots=True, eq=False)
+class ExpressionView(_mexpr.Expression):
+    arrays: ExpressionArrays = _dc.field(repr=False)
+    index: int
+
+    @property
+    def kind(self) -> NodeKind:
+        return self.arrays.get_kind(self.index)
+
+    @property
+    def node_type(self) -> type[_mexpr.Expression]:
+        return self.arrays.get_node_type(self.index)
+
+    @property
+    def function(self) -> str:
+        return self.arrays.get_function(self.index)
+
+    @property
+    def children(self) -> _tp.Sequence["ExpressionView"]:
+        return [ExpressionView(self.arrays, i) for i in self.arrays.get_child_indices(self.index)]
+
+    def create_node(self, children: _tp.Sequence[_mexpr.Expression]) -> _mexpr.Expression:
+        # The ordinary node this view stands for, with `children` instead of the views of its children
+        return self.arrays.create_node(self.index, children)
+
+    def materialize(self, node_factory: _mexpr.NodeFactory | None = None) -> _mexpr.Expression:
+        return self.arrays.materialize(self.index, node_factory)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, _mexpr.Expression):
+            return NotImplemented
+
+        # Iteratively, as expressions can nest deeper than the recursion limit. Leaves compare as
+        # ordinary nodes.
+        stack: list[tuple[_mexpr.Expression, _mexpr.Expression]] = [(self, other)]
+        while stack:
+            expression, other_expression = stack.pop()
+            if get_identity(expression) == get_identity(other_expression):
+                continue
+
+            if not isinstance(expression, ExpressionView) and not isinstance(other_expression, ExpressionView):
+                if expression != other_expression:
+                    return False
+                continue
+
+            node_type = get_node_type(expression)
+            if node_type is not get_node_type(other_expression):
+                return False
+
+            children, other_children = _get_children(expression), _get_children(other_expression)
+            if not children:
+                if materialize(expression) != materialize(other_expression):
+                    return False
+                continue
+
+            if len(children) != len(other_children) or (
+                node_type is _mexpr.FunctionCall and get_function(expression) != get_function(other_expression)
+            ):
+                return False
+
+            stack.extend(zip(children, other_children))
+
+        return True
+
+    def __hash__(self) -> int:
+        # Equal to the one of the ordinary expression. Children first, iteratively.
+        arrays = self.arrays
+        hashes: dict[int, _HashedChild] = {}
+        stack = [(self.index, False)]
+        while stack:
+            index, are_children_done = stack.pop()
+            if index in hashes:
+                continue
+
+            child_indices = arrays.get_child_indices(index)
+            if not child_indices:
+                hashes[index] = _HashedChild(hash(arrays.create_node(index, ())))
+            elif are_children_done:
+                hashes[index] = _HashedChild(hash(_get_key(arrays, index, [hashes[i] for i in child_indices])))
+            else:
+                stack.append((index, True))
+                stack.extend((i, False) for i in child_indices)
+
+        return hashes[self.index].hash
+
+    @property
+    def structural_hash(self) -> bytes:
+        return self.materialize().structural_hash
+
+
+class _HashedChild:
+    # Stands in for a child with its precomputed hash in the key of its parent
+    __slots__ = ("hash",)
+
+    def __init__(self, node_hash: int) -> None:
+        self.hash = node_hash
+
+    def __hash__(self) -> int:
+        return self.hash
+
+
+def _get_key(arrays: ExpressionArrays, index: int, children: _tp.Sequence[_HashedChild]) -> tuple[_tp.Any, ...]:
+    # As hashed by ordinary nodes, see `trnsys_dck_parser.model.expression._Node`
+    node_type = arrays.get_node_type(index)
+    if node_type is _mexpr.FunctionCall:
+        return node_type, (arrays.get_function(index), tuple(children))
+    return node_type, tuple(children)
+
+
+# The helpers below check for views by their exact type: `isinstance` goes through `abc` for other
+# expressions, which is slow for the consumers calling them once per node.
+# pylint: disable=unidiomatic-typecheck
+
+
+def _get_children(expression: _mexpr.Expression) -> _tp.Sequence[_mexpr.Expression]:
+    return expression.children if type(expression) is ExpressionView else _get_node_children(expression)
+
+
+def get_node_type(expression: _mexpr.Expression) -> type[_mexpr.Expression]:
+    # The type of the ordinary node of a view, the type of other expressions
+    return expression.node_type if type(expression) is ExpressionView else type(expression)
+
+
+def get_function(expression: _mexpr.Expression) -> str:
+    # The called function of function calls and their views
+    if type(expression) is ExpressionView:
+        return expression.function
+    if not isinstance(expression, _mexpr.FunctionCall):
+        raise ValueError(f"Not a function call: {type(expression).__name__}.")
+    return expression.function
+
+
+def get_identity(expression: _mexpr.Expression) -> _tp.Hashable:
+    # Identifies the nodes of an expression while it's alive, e.g. for memoizing per node. Views by
+    # their arrays and index: the views of children are created on each access.
+    if type(expression) is ExpressionView:
+        return id(expression.arrays), expression.index
+    return id(expression)
+
+
+def materialize(expression: _mexpr.Expression) -> _mexpr.Expression:
+    # The ordinary expression of a view, other expressions as they are
+    return expression.materialize() if type(expression) is ExpressionView else expression
+
+
+# pylint: enable=unidiomatic-typecheck
+
+
+class CompactNodeFactory(_mexpr.NodeFactory):
+    # Has the parsers append their nodes to `arrays` and return views. Only the views of whole
+    # expressions outlive the parse, e.g. the right-hand sides of equations.
+
+    def __init__(self, arrays: ExpressionArrays | None = None) -> None:
+        self.arrays = ExpressionArrays() if arrays is None else arrays
+
+    def literal(self, value: _mexpr.Number) -> ExpressionView:
+        return ExpressionView(self.arrays, self.arrays.append_literal(value))
+
+    def variable(self, name: str) -> ExpressionView:
+        return ExpressionView(self.arrays, self.arrays.append_variable(name))
+
+    def unit_output(self, unit_number: int, output_number: int) -> ExpressionView:
+        return ExpressionView(self.arrays, self.arrays.append_unit_output(unit_number, output_number))
+
+    def function_call(self, function: str, arguments: _tp.Sequence[_mexpr.Expression]) -> ExpressionView:
+        argument_indices = [self._get_index(a) for a in arguments]
+        return ExpressionView(self.arrays, self.arrays.append_function_call(function, argument_indices))
+
+    def negation(self, x: _mexpr.Expression) -> ExpressionView:
+        return ExpressionView(self.arrays, self.arrays.append_negation(self._get_index(x)))
+
+    def binary_expression(
+        self, expression_type: type[_mexpr.BinaryExpression], x: _mexpr.Expression, y: _mexpr.Expression
+    ) -> ExpressionView:
+        index = self.arrays.append_binary_expression(expression_type, self._get_index(x), self._get_index(y))
+        return ExpressionView(self.arrays, index)
+
+    def _get_index(self, expression: _mexpr.Expression) -> int:
+        if isinstance(expression, ExpressionView) and expression.arrays is self.arrays:
+            return expression.index
+        return self.arrays.add(expression)
+
+
+def compact_equations(equations: _EquationsT, arrays: ExpressionArrays | None = None) -> _EquationsT:
+    # Replaces the right-hand sides by views of `arrays`
+    arrays = ExpressionArrays() if arrays is None else arrays
+    compacted_equations = [_dc.replace(e, rhs=arrays.get_view(arrays.add(e.rhs))) for e in equations.equations]
+    return _dc.replace(equations, equations=compacted_equations)
+
+
+def materialize_equations(equations: _EquationsT, node_factory: _mexpr.NodeFactory | None = None) -> _EquationsT:
+    # Replaces right-hand sides which are views by ordinary expressions
+    node_factory = _mexpr.InterningNodeFactory() if node_factory is None else node_factory
+    materialized_equations = [
+        _dc.replace(e, rhs=e.rhs.materialize(node_factory)) if isinstance(e.rhs, ExpressionView) else e
+        for e in equations.equations
+    ]
+    return _dc.replace(equations, equations=materialized_equations)
@@ -0,0 +1,7 @@
+import dataclasses as _dc
+
+
+@_dc.dataclass
+class ControlStatement:
+    keyword: str
+    arguments: list[str]
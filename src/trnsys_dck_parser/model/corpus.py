@@ -0,0 +1,105 @@
+import dataclasses as _dc
+import typing as _tp
+
+import trnsys_dck_parser.model.compact as _mcomp
+import trnsys_dck_parser.model.deck as _mdeck
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.expression as _mexpr
+import trnsys_dck_parser.model.traverse as _mtrav
+
+# Decks of parametric studies differ in a few equations only. A corpus stores each distinct equation and
+# each distinct subtree of their right-hand sides once, by structural hash, and decks as the sequences of
+# the hashes of their equations.
+
+
+@_dc.dataclass(frozen=True)
+class CorpusDeck:
+    equation_hashes: tuple[bytes, ...]
+    # Of the whole sequence: decks with the same equations in the same order have the same one
+    structural_hash: bytes
+
+
+class Corpus:
+    def __init__(self) -> None:
+        self._expressions: dict[bytes, _mexpr.Expression] = {}
+        # With the first hash object computed for each, which decks share instead of equal copies
+        self._equations: dict[bytes, tuple[bytes, _meqs.Equation]] = {}
+        self._decks: dict[str, CorpusDeck] = {}
+
+    def __len__(self) -> int:
+        return len(self._decks)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._decks
+
+    @property
+    def n_expressions(self) -> int:
+        # Distinct subtrees
+        return len(self._expressions)
+
+    @property
+    def n_equations(self) -> int:
+        return len(self._equations)
+
+    def add_expression(self, expression: _mexpr.Expression) -> _mexpr.Expression:
+        # Returns the stored expression equal to `expression`. Subtrees already stored aren't descended
+        # into: all of theirs are as well. Views are stored as ordinary expressions.
+        expression = _mcomp.materialize(expression)
+        expressions = self._expressions
+        if (stored_expression := expressions.get(expression.structural_hash)) is not None:
+            return stored_expression
+
+        # By node identity, as the nodes of `expression` are kept alive by it
+        stored_nodes: dict[int, _mexpr.Expression] = {}
+        stack: list[tuple[_mexpr.Expression, bool]] = [(expression, False)]
+        while stack:
+            node, are_children_done = stack.pop()
+            if id(node) in stored_nodes:
+                continue
+
+            if (stored_node := expressions.get(node.structural_hash)) is not None:
+                stored_nodes[id(node)] = stored_node
+                continue
+
+            children = _mtrav.get_children(node)
+            if are_children_done or not children:
+                stored_node = _mtrav.with_children(node, [stored_nodes[id(c)] for c in children])
+                stored_nodes[id(node)] = expressions[node.structural_hash] = stored_node
+            else:
+                stack.append((node, True))
+                stack.extend((c, False) for c in children)
+
+        return stored_nodes[id(expression)]
+
+    def add_equation(self, equation: _meqs.Equation) -> _meqs.Equation:
+        # Returns the stored equation equal to `equation`. Stored equations are shared between decks,
+        # so they don't have offsets.
+        return self._add_equation(equation)[1]
+
+    def _add_equation(self, equation: _meqs.Equation) -> tuple[bytes, _meqs.Equation]:
+        structural_hash = equation.structural_hash
+        if (entry := self._equations.get(structural_hash)) is None:
+            stored_equation = _meqs.Equation(equation.variable_name, self.add_expression(equation.rhs))
+            entry = self._equations[structural_hash] = (structural_hash, stored_equation)
+        return entry
+
+    def add_equations(self, name: str, equations: _tp.Iterable[_meqs.Equation]) -> CorpusDeck:
+        # Replaces the deck called `name`, if any. Equations only used by a replaced deck are kept.
+        equation_hashes = tuple(self._add_equation(e)[0] for e in equations)
+        deck = CorpusDeck(equation_hashes, _mexpr.compute_structural_hash("Deck", (equation_hashes,)))
+        self._decks[name] = deck
+        return deck
+
+    def add_deck(self, name: str, blocks: _tp.Iterable[_mdeck.Block]) -> CorpusDeck:
+        # The equations of the deck's equations and constants blocks, in order
+        equations = (e for b in blocks if isinstance(b, _meqs.Equations) for e in b.equations)
+        return self.add_equations(name, equations)
+
+    def get_deck(self, name: str) -> CorpusDeck:
+        return self._decks[name]
+
+    def get_equation(self, structural_hash: bytes) -> _meqs.Equation:
+        return self._equations[structural_hash][1]
+
+    def get_equations(self, name: str) -> list[_meqs.Equation]:
+        return [self._equations[h][1] for h in self._decks[name].equation_hashes]
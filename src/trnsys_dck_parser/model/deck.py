@@ -0,0 +1,5 @@
+import trnsys_dck_parser.model.control as _mctl
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.unit as _munit
+
+Block = _meqs.Equations | _munit.Unit | _mctl.ControlStatement
@@ -0,0 +1,137 @@
+import dataclasses as _dc
+import typing as _tp
+
+import trnsys_dck_parser.common as _com
+import trnsys_dck_parser.model.compact as _mcomp
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.expression as _mexpr
+import trnsys_dck_parser.model.traverse as _mtrav
+
+# Differences between parsed equations, i.e. regardless of formatting and comments. Equations are
+# matched by canonical variable name and compared by the structural hashes of their right-hand sides,
+# which are cached by the nodes: unchanged equations and subtrees cost a comparison of two hashes.
+
+
+@_dc.dataclass(frozen=True)
+class SubtreeChange:
+    # The indices of the children leading from the right-hand side to the subtree, see `traverse.get_children`
+    path: tuple[int, ...]
+    old: _mexpr.Expression
+    new: _mexpr.Expression
+
+
+@_dc.dataclass(frozen=True)
+class EquationChange:
+    old: _meqs.Equation
+    new: _meqs.Equation
+    # The outermost subtrees which differ, in pre-order
+    subtree_changes: tuple[SubtreeChange, ...]
+
+    @property
+    def variable_name(self) -> str:
+        return self.new.variable_name
+
+
+@_dc.dataclass(frozen=True)
+class EquationsDiff:
+    # In the order of the new equations, but for the removed ones
+    added: tuple[_meqs.Equation, ...]
+    removed: tuple[_meqs.Equation, ...]
+    changed: tuple[EquationChange, ...]
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+
+_EquationsLike = _meqs.Equations | _tp.Sequence[_meqs.Equation]
+
+
+def _get_equations(equations: _EquationsLike) -> _tp.Sequence[_meqs.Equation]:
+    return equations.equations if isinstance(equations, _meqs.Equations) else equations
+
+
+class EquationsDiffer:
+    # Diffs equations against the same baseline, which is indexed once, e.g. for many variants of a deck.
+    # Variables defined more than once are matched in order of definition.
+
+    def __init__(self, baseline: _EquationsLike) -> None:
+        self._baseline = list(_get_equations(baseline))
+        self._baseline_indices: dict[str, list[int]] = {}
+        for index, equation in enumerate(self._baseline):
+            self._baseline_indices.setdefault(_com.get_canonical_name(equation.variable_name), []).append(index)
+
+    def diff(self, equations: _EquationsLike) -> EquationsDiff:
+        added = []
+        changed = []
+        is_matched = [False] * len(self._baseline)
+        n_definitions: dict[str, int] = {}
+        for equation in _get_equations(equations):
+            name = _com.get_canonical_name(equation.variable_name)
+            definition_index = n_definitions[name] = n_definitions.get(name, 0) + 1
+            indices = self._baseline_indices.get(name, [])
+            if definition_index > len(indices):
+                added.append(equation)
+                continue
+
+            index = indices[definition_index - 1]
+            is_matched[index] = True
+            baseline_equation = self._baseline[index]
+            if baseline_equation.rhs is equation.rhs:
+                continue
+
+            if baseline_equation.rhs.structural_hash != equation.rhs.structural_hash:
+                subtree_changes = diff_expressions(baseline_equation.rhs, equation.rhs)
+                changed.append(EquationChange(baseline_equation, equation, subtree_changes))
+
+        removed = [e for e, m in zip(self._baseline, is_matched) if not m]
+        return EquationsDiff(tuple(added), tuple(removed), tuple(changed))
+
+
+def diff_equations(old: _EquationsLike, new: _EquationsLike) -> EquationsDiff:
+    return EquationsDiffer(old).diff(new)
+
+
+# A path as a linked list from the end: the paths of deeply nested subtrees share their prefixes
+_Path = tuple[int, "_Path"] | None
+
+
+def diff_expressions(old: _mexpr.Expression, new: _mexpr.Expression) -> tuple[SubtreeChange, ...]:
+    # Descends into nodes which differ in their children only, e.g. additions or calls of the same
+    # function with as many arguments. Iteratively, as expressions can nest deeper than the recursion limit.
+    # Views are compared as the ordinary expressions, whose nodes cache their structural hashes.
+    subtree_changes = []
+    stack: list[tuple[_mexpr.Expression, _mexpr.Expression, _Path]] = [
+        (_mcomp.materialize(old), _mcomp.materialize(new), None)
+    ]
+    while stack:
+        old_node, new_node, path = stack.pop()
+        if old_node is new_node or old_node.structural_hash == new_node.structural_hash:
+            continue
+
+        old_children, new_children = _mtrav.get_children(old_node), _mtrav.get_children(new_node)
+        if not old_children or not _has_same_node_with_children(old_node, new_node, new_children):
+            subtree_changes.append(SubtreeChange(_get_indices(path), old_node, new_node))
+            continue
+
+        for index in reversed(range(len(old_children))):
+            stack.append((old_children[index], new_children[index], (index, path)))
+
+    return tuple(subtree_changes)
+
+
+def _has_same_node_with_children(
+    old_node: _mexpr.Expression, new_node: _mexpr.Expression, new_children: _tp.Sequence[_mexpr.Expression]
+) -> bool:
+    # Whether `old_node` with the children of `new_node` is `new_node`
+    if type(old_node) is not type(new_node) or len(_mtrav.get_children(old_node)) != len(new_children):
+        return False
+    return _mtrav.with_children(old_node, new_children).structural_hash == new_node.structural_hash
+
+
+def _get_indices(path: _Path) -> tuple[int, ...]:
+    indices = []
+    while path is not None:
+        index, path = path
+        indices.append(index)
+    return tuple(reversed(indices))
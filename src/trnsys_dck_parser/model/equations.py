@@ -13,3 +13,16 @@ class Equations:
 class Equation:
     variable_name: str
     rhs: _expr.Expression
+    # Offsets of the equation in the input it was parsed from, if any. Not part of the equation's identity.
+    start_index: int | None = _dc.field(default=None, compare=False)
+    end_index: int | None = _dc.field(default=None, compare=False)
+
+    @property
+    def structural_hash(self) -> bytes:
+        # Not cached, as equations are mutable, but cheap once the right-hand side's is
+        return _expr.compute_structural_hash("Equation", (self.variable_name, self.rhs))
+
+
+@_dc.dataclass
+class Constants(Equations):
+    pass
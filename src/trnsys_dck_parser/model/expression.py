@@ -1,11 +1,14 @@
 import abc as _abc
 import dataclasses as _dc
+import hashlib as _hashlib
 import typing as _tp
 
 import trnsys_dck_parser.common as _pcom
 
 
 class Expression(_abc.ABC):
+    __slots__ = ()
+
     def __neg__(self) -> "Negation":
         return Negation(self)
 
@@ -36,68 +39,303 @@ class Expression(_abc.ABC):
     def __pow__(self, power: "Expression") -> "Power":
         return Power(self, power)
 
+    @property
+    def structural_hash(self) -> bytes:
+        # Equal for structurally equal expressions and, unlike `hash`, stable across processes and
+        # platforms, e.g. for comparing and deduplicating the expressions of many decks
+        raise NotImplementedError(f"{type(self).__name__} doesn't support structural hashing.")
+
 
 Number = int | float
 
 
-@_dc.dataclass(eq=True)
-class Literal(Expression):
+def compute_structural_hash(kind: str, values: tuple[_tp.Any, ...]) -> bytes:
+    # A Merkle hash: of the structural hashes of the expressions among `values`, not of their contents.
+    # Like for `InterningNodeFactory`, integer and float literals such as "1" and "1.0" differ.
+    hasher = _hashlib.blake2b(_encode_structural_value(kind), digest_size=16)
+    for value in values:
+        hasher.update(_encode_structural_value(value))
+    return hasher.digest()
+
+
+def _encode_structural_value(value: _tp.Any) -> bytes:
+    if isinstance(value, Expression):
+        return b"e" + value.structural_hash
+    if isinstance(value, tuple):
+        return b"t%d:" % len(value) + b"".join(_encode_structural_value(v) for v in value)
+    if isinstance(value, float):
+        return b"f" + value.hex().encode("ascii") + b";"
+    if isinstance(value, int):
+        return b"i%d;" % value
+    if isinstance(value, str):
+        encoded_value = value.encode("utf-8")
+        return b"s%d:" % len(encoded_value) + encoded_value
+    if isinstance(value, bytes):
+        return b"b%d:" % len(value) + value
+
+    raise TypeError(f"Can't hash values of type {type(value).__name__} structurally.")
+
+
+# Nodes are immutable and cache their hash, so that structurally equal subtrees can be shared (see
+# `InterningNodeFactory`) and compared and hashed in constant time when they are. Their structural
+# hash is computed on first use and cached as well.
+@_dc.dataclass(frozen=True, slots=True, eq=False)
+class _Node(Expression, _abc.ABC):
+    _hash: int = _dc.field(init=False, repr=False, compare=False)
+    _structural_hash: bytes | None = _dc.field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_hash", hash((type(self), self._key)))
+        object.__setattr__(self, "_structural_hash", None)
+
+    # The constructor arguments
+    @property
+    @_abc.abstractmethod
+    def _key(self) -> tuple[_tp.Any, ...]:
+        raise NotImplementedError()
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+
+        if not isinstance(other, _Node) or type(other) is not type(self):
+            return NotImplemented
+
+        if self._hash != other._hash:
+            return False
+
+        return self._has_same_structure(other)
+
+    def _has_same_structure(self, other: "_Node") -> bool:
+        # Iteratively, as expressions can nest deeper than the recursion limit. Shared subtrees
+        # compare by identity and ones with the same cached structural hash are equal. Otherwise,
+        # values compare as such: unlike for the structural hash, literals such as "1" and "1.0" are equal.
+        # pylint: disable=protected-access
+        stack: list[tuple[_Node, _Node]] = [(self, other)]
+        while stack:
+            node, other_node = stack.pop()
+            if node is other_node:
+                continue
+
+            if type(node) is not type(other_node) or node._hash != other_node._hash:
+                return False
+
+            if node._structural_hash is not None and node._structural_hash == other_node._structural_hash:
+                continue
+
+            values, other_values = _flatten_key(node._key), _flatten_key(other_node._key)
+            if len(values) != len(other_values):
+                return False
+
+            for value, other_value in zip(values, other_values):
+                if isinstance(value, _Node) and isinstance(other_value, _Node):
+                    stack.append((value, other_value))
+                elif value is not other_value and value != other_value:
+                    return False
+
+        return True
+
+    def __reduce__(self) -> tuple[type["_Node"], tuple[_tp.Any, ...]]:
+        # String hashes differ between processes: recompute the cached hash when unpickling
+        return type(self), self._key
+
+    @property
+    def structural_hash(self) -> bytes:
+        if self._structural_hash is None:
+            self._set_structural_hashes()
+        return _tp.cast(bytes, self._structural_hash)
+
+    def _set_structural_hashes(self) -> None:
+        # Of the nodes without one, children first. Iteratively, as expressions can nest deeper than
+        # the recursion limit.
+        # pylint: disable=protected-access
+        stack: list[_Node] = [self]
+        while stack:
+            node = stack[-1]
+            if node._structural_hash is not None:
+                stack.pop()
+                continue
+
+            children = [c for c in node._iter_child_nodes() if c._structural_hash is None]
+            if children:
+                stack.extend(children)
+                continue
+
+            stack.pop()
+            object.__setattr__(node, "_structural_hash", compute_structural_hash(type(node).__name__, node._key))
+
+    def _iter_child_nodes(self) -> _tp.Iterator["_Node"]:
+        for value in self._key:
+            values = value if isinstance(value, tuple) else (value,)
+            yield from (v for v in values if isinstance(v, _Node))
+
+
+def _flatten_key(key: tuple[_tp.Any, ...]) -> list[_tp.Any]:
+    # With the lengths of nested tuples, e.g. of function arguments
+    values = []
+    for value in key:
+        if isinstance(value, tuple):
+            values.append(len(value))
+            values.extend(value)
+        else:
+            values.append(value)
+    return values
+
+
+@_dc.dataclass(frozen=True, slots=True, eq=False)
+class Literal(_Node):
     value: Number
 
+    @property
+    def _key(self) -> tuple[_tp.Any, ...]:
+        return (self.value,)
+
 
-@_dc.dataclass(eq=True)
-class UnaryExpression(Expression, _abc.ABC):
+@_dc.dataclass(frozen=True, slots=True, eq=False)
+class UnaryExpression(_Node, _abc.ABC):
     x: Expression
 
+    @property
+    def _key(self) -> tuple[_tp.Any, ...]:
+        return (self.x,)
 
-@_dc.dataclass(eq=True)
+
+@_dc.dataclass(frozen=True, slots=True, eq=False)
 class Negation(UnaryExpression):
     pass
 
 
-@_dc.dataclass(eq=True)
-class BinaryExpression(Expression, _abc.ABC):
+@_dc.dataclass(frozen=True, slots=True, eq=False)
+class BinaryExpression(_Node, _abc.ABC):
     x: Expression
     y: Expression
 
+    @property
+    def _key(self) -> tuple[_tp.Any, ...]:
+        return (self.x, self.y)
+
 
 class Addition(BinaryExpression):
-    pass
+    __slots__ = ()
 
 
 class Subtraction(BinaryExpression):
-    pass
+    __slots__ = ()
 
 
 class Multiplication(BinaryExpression):
-    pass
+    __slots__ = ()
 
 
 class Division(BinaryExpression):
-    pass
+    __slots__ = ()
 
 
 class Power(BinaryExpression):
-    pass
+    __slots__ = ()
 
 
-@_dc.dataclass(eq=True)
-class Variable(Expression):
+@_dc.dataclass(frozen=True, slots=True, eq=False)
+class Variable(_Node):
     name: str
 
-    def __post_init__(self):
+    def __post_init__(self) -> None:
         pattern = _pcom.IDENTIFIER_PATTERN
         if not pattern.fullmatch(self.name):
             raise ValueError(f"Variable names must match the following regex pattern: {pattern.pattern}")
+        super(Variable, self).__post_init__()  # pylint: disable=super-with-arguments
+
+    @property
+    def _key(self) -> tuple[_tp.Any, ...]:
+        return (self.name,)
 
 
-@_dc.dataclass(eq=True)
-class UnitOutput(Expression):
+@_dc.dataclass(frozen=True, slots=True, eq=False)
+class UnitOutput(_Node):
     unit_number: int
     output_number: int
 
+    @property
+    def _key(self) -> tuple[_tp.Any, ...]:
+        return (self.unit_number, self.output_number)
+
 
-@_dc.dataclass(eq=True)
-class FunctionCall(Expression):
+@_dc.dataclass(frozen=True, slots=True, eq=False)
+class FunctionCall(_Node):
     function: str
     arguments: _tp.Sequence[Expression]
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "arguments", tuple(self.arguments))
+        super(FunctionCall, self).__post_init__()  # pylint: disable=super-with-arguments
+
+    @property
+    def _key(self) -> tuple[_tp.Any, ...]:
+        return (self.function, self.arguments)
+
+
+class NodeFactory:
+    # Creates the nodes of the expressions the parsers build. Factories needn't return nodes of the
+    # corresponding types, see `trnsys_dck_parser.model.compact.CompactNodeFactory`.
+
+    def literal(self, value: Number) -> Expression:
+        return Literal(value)
+
+    def variable(self, name: str) -> Expression:
+        return Variable(name)
+
+    def unit_output(self, unit_number: int, output_number: int) -> Expression:
+        return UnitOutput(unit_number, output_number)
+
+    def function_call(self, function: str, arguments: _tp.Sequence[Expression]) -> Expression:
+        return FunctionCall(function, arguments)
+
+    def negation(self, x: Expression) -> Expression:
+        return Negation(x)
+
+    def binary_expression(self, expression_type: type[BinaryExpression], x: Expression, y: Expression) -> Expression:
+        return expression_type(x, y)
+
+
+_NodeT = _tp.TypeVar("_NodeT", bound=Expression)
+
+
+class InterningNodeFactory(NodeFactory):
+    # Returns the same node for structurally equal expressions built by the same factory. Children
+    # are looked up by identity, which is sound because the factory keeps them alive.
+
+    def __init__(self) -> None:
+        self._nodes: dict[tuple[_tp.Any, ...], Expression] = {}
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def literal(self, value: Number) -> Literal:
+        # Including the type keeps integer and float literals such as "1" and "1.0" apart
+        return self._intern((Literal, type(value), value), lambda: Literal(value))
+
+    def variable(self, name: str) -> Variable:
+        return self._intern((Variable, name), lambda: Variable(name))
+
+    def unit_output(self, unit_number: int, output_number: int) -> UnitOutput:
+        return self._intern((UnitOutput, unit_number, output_number), lambda: UnitOutput(unit_number, output_number))
+
+    def function_call(self, function: str, arguments: _tp.Sequence[Expression]) -> FunctionCall:
+        key = (FunctionCall, function, *map(id, arguments))
+        return self._intern(key, lambda: FunctionCall(function, arguments))
+
+    def negation(self, x: Expression) -> Negation:
+        return self._intern((Negation, id(x)), lambda: Negation(x))
+
+    def binary_expression(
+        self, expression_type: type[BinaryExpression], x: Expression, y: Expression
+    ) -> BinaryExpression:
+        return self._intern((expression_type, id(x), id(y)), lambda: expression_type(x, y))
+
+    def _intern(self, key: tuple[_tp.Any, ...], create_node: _tp.Callable[[], _NodeT]) -> _NodeT:
+        if (node := self._nodes.get(key)) is None:
+            node = self._nodes[key] = create_node()
+        return _tp.cast(_NodeT, node)
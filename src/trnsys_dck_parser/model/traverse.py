@@ -0,0 +1,202 @@
+import dataclasses as _dc
+import typing as _tp
+
+import trnsys_dck_parser.model.compact as _mcomp
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.expression as _mexpr
+
+# Iterative traversals of expressions: expressions can nest deeper than the recursion limit. Nodes are
+# dispatched on their type through tables, which are looked up by the exact type of the node. Other
+# expression types, such as subclasses, are resolved to their closest base class in the table once.
+# The children of views of compact expressions are views as well, created on each call.
+
+_T = _tp.TypeVar("_T")
+_EquationsT = _tp.TypeVar("_EquationsT", bound=_meqs.Equations)
+
+_Children = _tp.Sequence[_mexpr.Expression]
+
+
+def _get_no_children(_: _tp.Any) -> _Children:
+    return ()
+
+
+def _get_unary_children(expression: _mexpr.UnaryExpression) -> _Children:
+    return (expression.x,)
+
+
+def _get_binary_children(expression: _mexpr.BinaryExpression) -> _Children:
+    return expression.x, expression.y
+
+
+def _get_arguments(expression: _mexpr.FunctionCall) -> _Children:
+    return expression.arguments
+
+
+def _create_node_with_operands(expression: _tp.Any, children: _Children) -> _mexpr.Expression:
+    return _tp.cast(_mexpr.Expression, type(expression)(*children))
+
+
+def _create_function_call(expression: _mexpr.FunctionCall, children: _Children) -> _mexpr.Expression:
+    return _mexpr.FunctionCall(expression.function, children)
+
+
+def _get_leaf(expression: _mexpr.Expression, _: _Children) -> _mexpr.Expression:
+    return expression
+
+
+def _get_view_children(view: _mcomp.ExpressionView) -> _Children:
+    return view.children
+
+
+def _create_node_of_view(view: _mcomp.ExpressionView, children: _Children) -> _mexpr.Expression:
+    return view.create_node(children)
+
+
+_CHILDREN_GETTERS: dict[type, _tp.Callable[[_tp.Any], _Children]] = {
+    _mexpr.Expression: _get_no_children,
+    _mexpr.UnaryExpression: _get_unary_children,
+    _mexpr.BinaryExpression: _get_binary_children,
+    _mexpr.FunctionCall: _get_arguments,
+    _mcomp.ExpressionView: _get_view_children,
+}
+
+_NODE_CREATORS: dict[type, _tp.Callable[[_tp.Any, _Children], _mexpr.Expression]] = {
+    _mexpr.Expression: _get_leaf,
+    _mexpr.UnaryExpression: _create_node_with_operands,
+    _mexpr.BinaryExpression: _create_node_with_operands,
+    _mexpr.FunctionCall: _create_function_call,
+    _mcomp.ExpressionView: _create_node_of_view,
+}
+
+
+def _lookup(table: dict[type, _T], node_type: type) -> _T:
+    if (entry := table.get(node_type)) is None:
+        entry = table[node_type] = next(table[t] for t in node_type.__mro__ if t in table)
+    return entry
+
+
+def get_children(expression: _mexpr.Expression) -> _Children:
+    return _lookup(_CHILDREN_GETTERS, type(expression))(expression)
+
+
+def with_children(expression: _mexpr.Expression, children: _Children) -> _mexpr.Expression:
+    # Copy on write: the expression itself if the children are the same objects
+    original_children = get_children(expression)
+    if len(children) == len(original_children) and all(c is o for c, o in zip(children, original_children)):
+        return expression
+
+    return _lookup(_NODE_CREATORS, type(expression))(expression, children)
+
+
+def walk(
+    expression: _mexpr.Expression, should_descend: _tp.Callable[[_mexpr.Expression], bool] | None = None
+) -> _tp.Iterator[_mexpr.Expression]:
+    # Lazily, in pre-order and from left to right, each occurrence of a subtree. Stop iterating to stop
+    # walking. The children of nodes for which `should_descend` returns false are skipped.
+    stack = [expression]
+    while stack:
+        node = stack.pop()
+        yield node
+        if should_descend is None or should_descend(node):
+            stack.extend(reversed(get_children(node)))
+
+
+def walk_post_order(expression: _mexpr.Expression) -> _tp.Iterator[_mexpr.Expression]:
+    # Lazily, children before their parent and from left to right, each occurrence of a subtree
+    stack: list[tuple[_mexpr.Expression, bool]] = [(expression, False)]
+    while stack:
+        node, are_children_done = stack.pop()
+        children = get_children(node)
+        if are_children_done or not children:
+            yield node
+        else:
+            stack.append((node, True))
+            stack.extend((c, False) for c in reversed(children))
+
+
+class Transformer:
+    # Rewrites expressions bottom-up. Override the methods for the node types to rewrite: they're called
+    # with each node, rebuilt with its transformed children if any of them changed, and return the node
+    # itself to keep it. Unchanged subtrees are reused. Subtrees occurring several times as the same
+    # object within the expressions of one `transform` or `transform_equations` call are transformed once.
+
+    def __init__(self) -> None:
+        self._handlers: dict[type, _tp.Callable[[_tp.Any], _mexpr.Expression]] = {
+            _mexpr.Expression: self.other,
+            _mexpr.Literal: self.literal,
+            _mexpr.Variable: self.variable,
+            _mexpr.UnitOutput: self.unit_output,
+            _mexpr.FunctionCall: self.function_call,
+            _mexpr.Negation: self.negation,
+            _mexpr.BinaryExpression: self.binary_expression,
+        }
+
+    def literal(self, node: _mexpr.Literal) -> _mexpr.Expression:
+        return node
+
+    def variable(self, node: _mexpr.Variable) -> _mexpr.Expression:
+        return node
+
+    def unit_output(self, node: _mexpr.UnitOutput) -> _mexpr.Expression:
+        return node
+
+    def function_call(self, node: _mexpr.FunctionCall) -> _mexpr.Expression:
+        return node
+
+    def negation(self, node: _mexpr.Negation) -> _mexpr.Expression:
+        return node
+
+    def binary_expression(self, node: _mexpr.BinaryExpression) -> _mexpr.Expression:
+        return node
+
+    def other(self, node: _mexpr.Expression) -> _mexpr.Expression:
+        return node
+
+    def transform(self, expression: _mexpr.Expression) -> _mexpr.Expression:
+        return self._transform([expression])[0]
+
+    def transform_equations(self, equations: _EquationsT) -> _EquationsT:
+        # In one pass over all right-hand sides. Equations with a changed right-hand side lose their
+        # offsets, as they weren't parsed from anywhere.
+        rhss = self._transform([e.rhs for e in equations.equations])
+        if all(r is e.rhs for r, e in zip(rhss, equations.equations)):
+            return equations
+
+        transformed_equations = [
+            e if r is e.rhs else _meqs.Equation(e.variable_name, r) for e, r in zip(equations.equations, rhss)
+        ]
+        return _dc.replace(equations, equations=transformed_equations)
+
+    def _transform(self, expressions: _tp.Sequence[_mexpr.Expression]) -> list[_mexpr.Expression]:
+        # By node identity, as the nodes are kept alive by `expressions`: equal nodes, such as the
+        # literals "1" and "1.0" for Python, may be transformed differently
+        handlers = self._handlers
+        results: dict[int, _mexpr.Expression] = {}
+        for expression in expressions:
+            stack: list[tuple[_mexpr.Expression, bool]] = [(expression, False)]
+            while stack:
+                node, are_children_done = stack.pop()
+                if id(node) in results:
+                    continue
+
+                # By exact type, as for `trnsys_dck_parser.model.compact.get_node_type`
+                if type(node) is _mcomp.ExpressionView:  # pylint: disable=unidiomatic-typecheck
+                    results[id(node)] = self._transform_view(node)
+                    continue
+
+                children = get_children(node)
+                if are_children_done or not children:
+                    rebuilt_node = with_children(node, [results[id(c)] for c in children])
+                    results[id(node)] = _lookup(handlers, type(rebuilt_node))(rebuilt_node)
+                else:
+                    stack.append((node, True))
+                    stack.extend((c, False) for c in children)
+
+        return [results[id(e)] for e in expressions]
+
+    def _transform_view(self, view: _mcomp.ExpressionView) -> _mexpr.Expression:
+        # As the ordinary expression, which is only created for that: the methods are called with nodes,
+        # and views of children aren't kept alive by their parents. The view itself is kept if unchanged.
+        expression = view.materialize()
+        transformed_expression = self.transform(expression)
+        return view if transformed_expression is expression else transformed_expression
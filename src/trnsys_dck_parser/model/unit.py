@@ -0,0 +1,41 @@
+import dataclasses as _dc
+
+import trnsys_dck_parser.model.control as _mctl
+import trnsys_dck_parser.model.expression as _expr
+
+
+@_dc.dataclass
+class Parameters:
+    n_parameters: int
+    values: list[_expr.Expression]
+
+
+@_dc.dataclass
+class Inputs:
+    n_inputs: int
+    connections: list[_expr.Expression]
+    initial_values: list[_expr.Expression]
+
+
+@_dc.dataclass
+class Derivatives:
+    n_derivatives: int
+    initial_values: list[_expr.Expression]
+
+
+@_dc.dataclass
+class Labels:
+    n_labels: int
+    labels: list[str]
+
+
+@_dc.dataclass
+class Unit:  # pylint: disable=too-many-instance-attributes
+    unit_number: int
+    type_number: int
+    name: str | None
+    parameters: Parameters | None = None
+    inputs: Inputs | None = None
+    derivatives: Derivatives | None = None
+    labels: Labels | None = None
+    statements: list[_mctl.ControlStatement] = _dc.field(default_factory=list)
@@ -0,0 +1,216 @@
+import dataclasses as _dc
+import functools as _ft
+import hashlib as _hl
+import io as _io
+import os as _os
+import pathlib as _pl
+import pickle as _pickle
+import tempfile as _tf
+import typing as _tp
+import zlib as _zlib
+
+import trnsys_dck_parser.model.compact as _mcomp
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.expression as _mexpr
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.deck as _pdeck
+import trnsys_dck_parser.parse.equations as _peqs
+
+_T = _tp.TypeVar("_T")
+
+_DEFAULT_MAX_SIZE_IN_BYTES = 256 * 1024 * 1024
+
+# Evicting down to a bit below the maximum size avoids scanning the directory on every write
+# once the cache is full
+_EVICTION_TARGET_FRACTION = 0.9
+
+_ENTRY_SUFFIX = ".pickle.z"
+
+# Changes to the serialization format which don't show in the parser sources
+_FORMAT_VERSION = "2"
+
+
+@_dc.dataclass
+class CacheStatistics:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class ParseCache:
+    # Stores parse results on disk, keyed by a hash of the kind of parse, the parser version and
+    # the input. Entries are written atomically, so several processes can share a directory.
+    # Entries are evicted least recently used first once the directory exceeds `max_size_in_bytes`.
+
+    def __init__(
+        self,
+        directory: str | _os.PathLike[str],
+        max_size_in_bytes: int = _DEFAULT_MAX_SIZE_IN_BYTES,
+        parser_version: str | None = None,
+    ) -> None:
+        self.directory = _pl.Path(directory)
+        self.max_size_in_bytes = max_size_in_bytes
+        self.parser_version = get_parser_version() if parser_version is None else parser_version
+        self.statistics = CacheStatistics()
+        self._size_in_bytes: int | None = None
+
+    def parse_equations(self, input_string: _pcom.Input) -> _pcom.ParseResult[_meqs.Equations]:
+        return self.get_or_parse("equations", input_string, _peqs.parse_equations)
+
+    def parse_constants(self, input_string: _pcom.Input) -> _pcom.ParseResult[_meqs.Constants]:
+        return self.get_or_parse("constants", input_string, _peqs.parse_constants)
+
+    def parse_deck(self, input_string: str) -> list[_pdeck.ParsedBlock]:
+        return self.get_or_parse("deck", input_string, lambda s: list(_pdeck.parse_deck(_pcom.decode(s))))
+
+    def get_or_parse(self, kind: str, input_string: _pcom.Input, parse: _tp.Callable[[_pcom.Input], _T]) -> _T:
+        path = self._get_entry_path(kind, input_string)
+
+        value = self._read(path)
+        if value is not None:
+            self.statistics.hits += 1
+            return _tp.cast(_T, value)
+
+        self.statistics.misses += 1
+        value = parse(input_string)
+        self._write(path, _make_picklable(value))
+        return value
+
+    def clear(self) -> None:
+        for path in self._iter_entry_paths():
+            path.unlink(missing_ok=True)
+        self._size_in_bytes = 0
+
+    def _get_entry_path(self, kind: str, input_string: _pcom.Input) -> _pl.Path:
+        content = input_string.encode("utf-8", "surrogatepass") if isinstance(input_string, str) else input_string
+
+        hash_ = _hl.sha256(f"{kind}\0{self.parser_version}\0".encode())
+        hash_.update(content)
+        key = hash_.hexdigest()
+
+        return self.directory / key[:2] / f"{key}{_ENTRY_SUFFIX}"
+
+    def _read(self, path: _pl.Path) -> object | None:
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        try:
+            value = _loads(_zlib.decompress(data))
+        except Exception:  # pylint: disable=broad-exception-caught
+            # Truncated by a full disk or written by an incompatible version: parse again
+            path.unlink(missing_ok=True)
+            return None
+
+        # The modification time doubles as last access time for eviction
+        try:
+            _os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        return value
+
+    def _write(self, path: _pl.Path, value: object) -> None:
+        data = _zlib.compress(_dumps(value), level=1)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file_descriptor, temporary_path = _tf.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with _os.fdopen(file_descriptor, "wb") as file:
+                file.write(data)
+            _os.replace(temporary_path, path)
+        except BaseException:
+            _os.unlink(temporary_path)
+            raise
+
+        if self._size_in_bytes is None:
+            self._size_in_bytes = sum(s.st_size for _, s in self._iter_entry_stats())
+        else:
+            self._size_in_bytes += len(data)
+
+        if self._size_in_bytes > self.max_size_in_bytes:
+            self._evict()
+
+    def _evict(self) -> None:
+        # Other processes may be writing and evicting concurrently: start from the actual contents
+        entry_stats = sorted(self._iter_entry_stats(), key=lambda p_s: p_s[1].st_mtime)
+        size_in_bytes = sum(s.st_size for _, s in entry_stats)
+
+        target_size_in_bytes = self.max_size_in_bytes * _EVICTION_TARGET_FRACTION
+        for path, stat in entry_stats:
+            if size_in_bytes <= target_size_in_bytes:
+                break
+            path.unlink(missing_ok=True)
+            size_in_bytes -= stat.st_size
+            self.statistics.evictions += 1
+
+        self._size_in_bytes = size_in_bytes
+
+    def _iter_entry_paths(self) -> _tp.Iterator[_pl.Path]:
+        return self.directory.glob(f"*/*{_ENTRY_SUFFIX}")
+
+    def _iter_entry_stats(self) -> _tp.Iterator[tuple[_pl.Path, _os.stat_result]]:
+        for path in self._iter_entry_paths():
+            try:
+                yield path, path.stat()
+            except FileNotFoundError:
+                pass
+
+
+@_ft.cache
+def get_parser_version() -> str:
+    # Derived from the sources of the parsers and models, so that any change to them invalidates
+    # cached results
+    package_directory = _pl.Path(__file__).parent.parent
+    hash_ = _hl.sha256(_FORMAT_VERSION.encode())
+    for subpackage in ["model", "parse"]:
+        for path in sorted((package_directory / subpackage).rglob("*.py")):
+            hash_.update(path.relative_to(package_directory).as_posix().encode())
+            hash_.update(path.read_bytes())
+
+    return hash_.hexdigest()[:16]
+
+
+class _Pickler(_pickle.Pickler):
+    # Pickling recurses once per level of nesting, and expressions can nest deeper than the recursion
+    # limit: stores them as the indices of their roots into compact arrays instead, which are flat
+    def __init__(self, file: _tp.BinaryIO) -> None:
+        super().__init__(file, protocol=_pickle.HIGHEST_PROTOCOL)
+        self.arrays = _mcomp.ExpressionArrays()
+
+    def persistent_id(self, obj: object) -> int | None:
+        if isinstance(obj, _mexpr.Expression) and not isinstance(obj, _mcomp.ExpressionView):
+            return self.arrays.add(obj)
+        return None
+
+
+class _Unpickler(_pickle.Unpickler):
+    def __init__(self, file: _tp.BinaryIO, arrays: _mcomp.ExpressionArrays) -> None:
+        super().__init__(file)
+        self._arrays = arrays
+        # Shares the subtrees of the loaded expressions as parsing does
+        self._node_factory = _mexpr.InterningNodeFactory()
+
+    def persistent_load(self, pid: object) -> _mexpr.Expression:
+        return self._arrays.materialize(_tp.cast(int, pid), self._node_factory)
+
+
+def _dumps(value: object) -> bytes:
+    file = _io.BytesIO()
+    pickler = _Pickler(file)
+    pickler.dump(value)
+    return _pickle.dumps((pickler.arrays, file.getvalue()), protocol=_pickle.HIGHEST_PROTOCOL)
+
+
+def _loads(data: bytes) -> object:
+    arrays, value_data = _pickle.loads(data)
+    return _Unpickler(_io.BytesIO(value_data), arrays).load()
+
+
+def _make_picklable(value: _T) -> _T:
+    # Memory maps and other buffers can't be pickled
+    if isinstance(value, _pcom.ParseError) and not isinstance(value.input_string, (str, bytes)):
+        return _tp.cast(_T, _dc.replace(value, input_string=bytes(value.input_string)))
+
+    return value
@@ -1,18 +1,58 @@
 import abc as _abc
 import dataclasses as _dc
+import functools as _ft
+import mmap as _mmap
 import re as _re
 import typing as _tp
 
+import trnsys_dck_parser.parse.profile as _pprof
+
+# Besides `str`, the lexer and the parsers run directly over buffers of (UTF-8 or ASCII) encoded text
+# such as the contents of a memory-mapped deck file. Offsets then count bytes instead of characters.
+Input = str | bytes | bytearray | memoryview | _mmap.mmap
+
+
+@_dc.dataclass(frozen=True)
+class TextEdit:
+    start_index: int
+    removed_length: int
+    inserted_text: str
+
+    @property
+    def end_index(self) -> int:
+        # Exclusive end of the removed text
+        return self.start_index + self.removed_length
+
+    @property
+    def length_change(self) -> int:
+        return len(self.inserted_text) - self.removed_length
+
+    def apply(self, input_string: str) -> str:
+        if self.start_index < 0 or self.removed_length < 0 or self.end_index > len(input_string):
+            raise ValueError("Edit is out of range.")
+
+        return input_string[: self.start_index] + self.inserted_text + input_string[self.end_index :]
+
+    def shift(self, offset: int) -> "TextEdit":
+        return TextEdit(self.start_index + offset, self.removed_length, self.inserted_text)
+
+
+def decode(value: Input) -> str:
+    if isinstance(value, str):
+        return value
+
+    return bytes(value).decode("utf-8", errors="replace")
+
 
 @_dc.dataclass
 class ParseError:
     error_message: str
-    input_string: str
+    input_string: Input
     error_start: int
 
     @property
     def error_string(self) -> str:
-        return self.input_string[self.error_start :]
+        return decode(self.input_string[self.error_start :])
 
     def __repr__(self) -> str:
         return f"Parse error: {self.error_message}: {self.error_string[:10]}"  # pragma: no cover
@@ -53,7 +93,7 @@ def error(result: ParseResult[_T_co]) -> ParseError:
     return _tp.cast(ParseError, result)
 
 
-@_dc.dataclass
+@_dc.dataclass(eq=False)
 class TokenDefinition:
     description: str
     pattern: _re.Pattern = _dc.field(init=False)
@@ -75,8 +115,9 @@ class Tokens:
 @_dc.dataclass
 class Token:
     definition: TokenDefinition
-    value: str
-    input_string: str
+    # `bytes` if the input isn't a `str`: values are only decoded where the model needs a `str`
+    value: str | bytes
+    input_string: Input
     start_index_inclusive: int
     end_index_exclusive: int
 
@@ -84,9 +125,18 @@ class Token:
 LexerResult = Token | ParseError
 
 
-@_dc.dataclass
 class ParseErrorException(Exception):
-    parse_error: ParseError
+    # Speculative parses raise and catch these without ever looking at the error, so the `ParseError`
+    # and its message are only created once `parse_error` is asked for
+    def __init__(self, parse_error: ParseError | _tp.Callable[[], ParseError]) -> None:
+        super().__init__()
+        self._parse_error = parse_error
+
+    @property
+    def parse_error(self) -> ParseError:
+        if not isinstance(self._parse_error, ParseError):
+            self._parse_error = self._parse_error()
+        return self._parse_error
 
 
 class _Ignore:
@@ -98,31 +148,190 @@ class _Ignore:
     )
 
     Pattern = _re.compile(_IGNORE_REGEX, _re.RegexFlag.MULTILINE)
+    BytesPattern = _re.compile(_IGNORE_REGEX.encode("ascii"), _re.RegexFlag.MULTILINE)
 
 
-class Lexer:
-    def __init__(self, input_string: str, token_definitions: _tp.Sequence[TokenDefinition], start_pos: int) -> None:
-        self.input_string = input_string
+# Whitespace and comments, which separate tokens
+IGNORED_REGEX = _Ignore.Pattern.pattern
+
+
+def skip_ignored(input_string: Input, pos: int) -> int:
+    pattern: _re.Pattern = _Ignore.Pattern if isinstance(input_string, str) else _Ignore.BytesPattern
+    while match := pattern.match(input_string, pos):
+        pos = match.end()
+
+    return pos
+
+
+_REST_OF_LINE_REGEX = r"[ \t]*([^\n!]*?)[ \t]*(?=!|$)"
+_REST_OF_LINE_PATTERN = _re.compile(_REST_OF_LINE_REGEX, _re.RegexFlag.MULTILINE)
+_REST_OF_LINE_BYTES_PATTERN = _re.compile(_REST_OF_LINE_REGEX.encode("ascii"), _re.RegexFlag.MULTILINE)
+
 
+_INLINE_FLAG_LETTERS = {
+    _re.RegexFlag.IGNORECASE: "i",
+    _re.RegexFlag.MULTILINE: "m",
+    _re.RegexFlag.DOTALL: "s",
+    _re.RegexFlag.VERBOSE: "x",
+    _re.RegexFlag.ASCII: "a",
+}
+
+
+def _get_inline_regex(token_definition: TokenDefinition) -> str:
+    regex = token_definition.pattern.pattern
+
+    flags = token_definition.flags
+    letters = "".join(letter for flag, letter in _INLINE_FLAG_LETTERS.items() if flag in flags)
+    if len(letters) != bin(flags).count("1"):
+        raise ValueError(f"Token definition {token_definition.description!r} uses unsupported flags {flags!r}.")
+
+    return f"(?{letters}:{regex})" if letters else regex
+
+
+def _compile(regex: str, is_text: bool) -> _re.Pattern:
+    return _re.compile(regex) if is_text else _re.compile(regex.encode("ascii"))
+
+
+# All token definitions of a lexer mode folded into one alternation of named groups. The alternatives
+# are ordered by descending priority, so the regex engine tries them in the same order in which
+# `SequentialLexer` tries the individual patterns. Whitespace and comments are skipped by a
+# possessive prefix of the same pattern, so a token costs a single `match` call.
+class LexerMode:
+    def __init__(self, token_definitions: _tp.Sequence[TokenDefinition], is_text: bool) -> None:
         def get_priority(token_definition: TokenDefinition) -> int:
             return token_definition.priority
 
-        self._token_definitions = [
+        self.token_definitions = [
             *sorted(token_definitions, key=get_priority, reverse=True),
             Tokens.END,
         ]
+
+        inline_regexes = [_get_inline_regex(d) for d in self.token_definitions]
+        self.token_patterns = [_compile(r, is_text) for r in inline_regexes]
+
+        alternatives = "|".join(f"(?P<_{i}>{r})" for i, r in enumerate(inline_regexes))
+        self.pattern = _compile(f"(?:{IGNORED_REGEX})*+(?:{alternatives})", is_text)
+
+        # Maps ``match.lastindex`` (the outermost, i.e. named, group closes last) to the token definition
+        self.token_definitions_by_group_index: list[TokenDefinition | None] = [None] * (self.pattern.groups + 1)
+        for i, token_definition in enumerate(self.token_definitions):
+            self.token_definitions_by_group_index[self.pattern.groupindex[f"_{i}"]] = token_definition
+
+        self._shadowing_patterns: dict[tuple[TokenDefinition, LexerMode], list[_re.Pattern] | None] = {}
+
+    def is_lexed_the_same(self, token: Token, mode: "LexerMode") -> bool:
+        # Whether this mode would lex `token`, which was lexed in `mode`, the same. That's the case if
+        # none of the alternatives tried before the token's definition here matches. The ones also tried
+        # before it in `mode` are known not to match.
+        key = (token.definition, mode)
+        if key not in self._shadowing_patterns:
+            self._shadowing_patterns[key] = self._get_shadowing_patterns(token.definition, mode)
+
+        shadowing_patterns = self._shadowing_patterns[key]
+        if shadowing_patterns is None:
+            return False
+
+        return not any(p.match(token.input_string, token.start_index_inclusive) for p in shadowing_patterns)
+
+    def _get_shadowing_patterns(self, token_definition: TokenDefinition, mode: "LexerMode") -> list[_re.Pattern] | None:
+        if token_definition not in self.token_definitions:
+            return None
+
+        index = self.token_definitions.index(token_definition)
+        tried_definitions = mode.token_definitions[: mode.token_definitions.index(token_definition)]
+
+        return [
+            p
+            for d, p in zip(self.token_definitions[:index], self.token_patterns[:index])
+            if not any(d is t for t in tried_definitions)
+        ]
+
+
+@_ft.cache
+def _get_mode(token_definitions: tuple[TokenDefinition, ...], is_text: bool) -> LexerMode:
+    return LexerMode(token_definitions, is_text)
+
+
+class Lexer:
+    # Parsers and their sub parsers can share a lexer, each lexing in its own mode, i.e. with its own
+    # token definitions. Then they also share the lookahead token: a sub parser hands its last
+    # lookahead over to its parent instead of the parent lexing that input again.
+    def __init__(self, input_string: Input, token_definitions: _tp.Sequence[TokenDefinition], start_pos: int) -> None:
+        self.input_string = input_string
+
+        self.mode = self.create_mode(token_definitions)
         self.current_pos = start_pos
+        # Maintained by the parsers
+        self.lookahead: Token | None = None
 
-    def get_next_token(self) -> LexerResult:
-        while match := self._match(_Ignore.Pattern):
-            self.advance_input(match.end())
+        # Only lexers created while profiling pay for it: they get an instrumented `get_next_token`
+        self.profile = _pprof.get_current_profile()
+        if self.profile is not None:
+            self.get_next_token = self._get_next_token_and_profile  # type: ignore[method-assign]
 
-        for token_definition in self._token_definitions:
-            match = self._match(token_definition.pattern)
-            if match:
-                self.advance_input(match.end())
-                token = Token(token_definition, match.group(), self.input_string, match.start(), match.end())
-                return token
+    def create_mode(self, token_definitions: _tp.Sequence[TokenDefinition]) -> LexerMode:
+        return _get_mode(tuple(token_definitions), isinstance(self.input_string, str))
+
+    def switch_mode(self, mode: LexerMode) -> LexerMode:
+        # Returns the previous mode
+        previous_mode = self.mode
+        if mode is previous_mode:
+            return previous_mode
+
+        self.mode = mode
+        lookahead = self.lookahead
+        if lookahead and not mode.is_lexed_the_same(lookahead, previous_mode):
+            self.lookahead = None
+            self.current_pos = lookahead.start_index_inclusive
+
+        return previous_mode
+
+    def get_next_token(self) -> LexerResult:  # pylint: disable=method-hidden
+        mode = self.mode
+
+        match = mode.pattern.match(self.input_string, self.current_pos)
+        if not match:
+            return self._create_unrecognized_token_error()
+
+        group_index = match.lastindex
+        assert group_index is not None
+
+        token_definition = mode.token_definitions_by_group_index[group_index]
+        assert token_definition
+
+        end = match.end()
+        self.advance_input(end)
+        return Token(token_definition, match.group(group_index), self.input_string, match.start(group_index), end)
+
+    def _get_next_token_and_profile(self) -> LexerResult:
+        profile = self.profile
+        assert profile
+
+        result = type(self).get_next_token(self)
+
+        token_definitions = self.mode.token_definitions
+        if isinstance(result, Token):
+            statistics = profile.get_token_statistics(result.definition.description)
+            statistics.n_tokens += 1
+            statistics.n_regex_attempts += 1
+            n_misses = next(i for i, d in enumerate(token_definitions) if d is result.definition)
+        else:
+            n_misses = len(token_definitions)
+
+        for token_definition in token_definitions[:n_misses]:
+            statistics = profile.get_token_statistics(token_definition.description)
+            statistics.n_regex_attempts += 1
+            statistics.n_regex_misses += 1
+
+        return result
+
+    def _skip_ignored(self) -> None:
+        if self.profile is not None:
+            self.profile.n_skip_ignored_calls += 1
+        self.advance_input(skip_ignored(self.input_string, self.current_pos))
+
+    def _create_unrecognized_token_error(self) -> ParseError:
+        self._skip_ignored()
 
         parsing_error = ParseError(
             "Not a recognized token.",
@@ -142,72 +351,184 @@ class Lexer:
 
         self.current_pos = to
 
+    def rewind(self, to: int) -> None:
+        # Back to where a parser started an alternative it gave up on: the lookahead is lexed again
+        self.lookahead = None
+        self.current_pos = to
+
+
+# Tries one token definition after the other. Kept as the reference the combined-pattern
+# `Lexer` is checked and benchmarked against.
+class SequentialLexer(Lexer):
+    def get_next_token(self) -> LexerResult:
+        self._skip_ignored()
+
+        for token_definition, pattern in zip(self.mode.token_definitions, self.mode.token_patterns):
+            match = self._match(pattern)
+            if match:
+                self.advance_input(match.end())
+                token = Token(token_definition, match.group(), self.input_string, match.start(), match.end())
+                return token
+
+        return self._create_unrecognized_token_error()
+
 
 class ParserBase(_tp.Generic[_T_co], _abc.ABC):
-    def __init__(self, lexer: Lexer) -> None:
+    def __init__(self, lexer: Lexer, mode: LexerMode | None = None) -> None:
+        # A sub parser sharing its parent's lexer passes its own `mode`
         self._lexer = lexer
-        self._current_token: _tp.Optional[Token] = None
+        self._mode = lexer.mode if mode is None else mode
         self._remaining_input_string_start_index = 0
 
-    def _accept(self, token_definition: TokenDefinition) -> str | None:
-        if not self._current_token:
-            self._set_next_token()
+        self._profile = lexer.profile
+        if self._profile is not None:
+            self._profile.n_parsers_created += 1
 
-        assert self._current_token
+    def _accept(self, token_definition: TokenDefinition) -> str | bytes | None:
+        lexer = self._lexer
+        current_token = lexer.lookahead or self._set_next_token()
 
-        if self._current_token.definition != token_definition:
+        if current_token.definition is not token_definition:
             return None
 
-        self._remaining_input_string_start_index = self._current_token.end_index_exclusive
-        value = self._current_token.value
+        self._remaining_input_string_start_index = current_token.end_index_exclusive
+        lexer.lookahead = None
 
-        self._current_token = None
+        return current_token.value
 
-        return value
+    def _peek(self) -> TokenDefinition:
+        current_token = self._lexer.lookahead or self._set_next_token()
+        return current_token.definition
+
+    def _try_peek(self) -> TokenDefinition | None:
+        # Like `_peek`, but returns `None` instead of raising if the next token isn't recognized
+        if not self._lexer.lookahead:
+            next_token = self._lexer.get_next_token()
+            if isinstance(next_token, ParseError):
+                return None
+            self._lexer.lookahead = next_token
 
-    def _expect(self, token_definition: TokenDefinition) -> str:
+        return self._lexer.lookahead.definition
+
+    def _at(self, token_definition: TokenDefinition) -> bool:
+        # Lookahead for optional parts of the grammar which never raises
+        return self._try_peek() is token_definition
+
+    def _expect(self, token_definition: TokenDefinition) -> str | bytes:
         value = self._accept(token_definition)
         if value is not None:
             return value
 
-        expected_token = token_definition.description
-
-        self._raise_parsing_error(f"Expected {expected_token} but found {{actual_token}}.")
+        self._raise_parsing_error(
+            "Expected {expected_token} but found {actual_token}.", expected_token=token_definition.description
+        )
 
     def _expect_sub_parser(self, parser: "ParserBase[_S_co]") -> _S_co:
-        match result := parser.parse():
-            case ParseError():
-                raise ParseErrorException(result)
-            case ParseSuccess():
-                self._advance_input(result.remaining_string_input_start_index)
+        result = parser.parse_or_raise(self._remaining_input_string_start_index)
+        self._advance_input(result.remaining_string_input_start_index)
+        return result.value
+
+    def _accept_sub_parser(self, parser: "ParserBase[_S_co]") -> _S_co | None:
+        # For optional parts of the grammar: returns `None` without creating the sub parser's error
+        try:
+            result = parser.parse_or_raise(self._remaining_input_string_start_index)
+        except ParseErrorException:
+            self._count_caught_exception()
+            return None
+
+        self._advance_input(result.remaining_string_input_start_index)
+        return result.value
 
-                return result.value
-            case _ as unreachable:  # pragma: no cover
-                _tp.assert_never(unreachable)
+    def _rest_of_line(self) -> str:
+        # Lines are not significant to the lexer, so this must not be called with a pending lookahead token
+        assert not self._lexer.lookahead
 
-    def _set_next_token(self) -> None:
+        input_string = self._lexer.input_string
+        pattern: _re.Pattern = _REST_OF_LINE_PATTERN if isinstance(input_string, str) else _REST_OF_LINE_BYTES_PATTERN
+        match = pattern.match(input_string, self._remaining_input_string_start_index)
+        assert match
+
+        self._advance_input(match.end())
+
+        return decode(match.group(1))
+
+    def _set_next_token(self) -> Token:
         next_token = self._lexer.get_next_token()
         if isinstance(next_token, ParseError):
+            self._count_raised_exception()
             raise ParseErrorException(next_token)
-        self._current_token = next_token
+        self._lexer.lookahead = next_token
+        return next_token
+
+    def _skip_ignored(self, pos: int) -> int:
+        if self._profile is not None:
+            self._profile.n_skip_ignored_calls += 1
+        return skip_ignored(self._lexer.input_string, pos)
 
     def _advance_input(self, to: int) -> None:
         self._remaining_input_string_start_index = to
         self._lexer.advance_input(to)
 
-    def _raise_parsing_error(self, error_message: str, actual_token_key: str = "actual_token") -> _tp.NoReturn:
-        assert self._current_token
+    def _rewind(self, to: int) -> None:
+        self._remaining_input_string_start_index = to
+        self._lexer.rewind(to)
+
+    def _raise_parsing_error(
+        self, error_message: str, actual_token_key: str = "actual_token", **format_arguments: str
+    ) -> _tp.NoReturn:
+        current_token = self._lexer.lookahead
+        assert current_token
+
+        self._count_raised_exception()
+        raise ParseErrorException(
+            _ft.partial(
+                _create_parse_error,
+                error_message,
+                {**format_arguments, actual_token_key: current_token.definition.description},
+                self._lexer.input_string,
+                current_token.start_index_inclusive,
+            )
+        )
 
-        actual_token_description = self._current_token.definition.description
+    def parse(self) -> ParseResult[_T_co]:
+        try:
+            return self.parse_or_raise()
+        except ParseErrorException as exception:
+            self._count_caught_exception()
+            return exception.parse_error
 
-        formatted_error_message = error_message.format(**{actual_token_key: actual_token_description})
+    def parse_or_raise(self, start_index: int | None = None) -> ParseSuccess[_T_co]:
+        # `start_index` is where a sub parser starts, in particular one sharing its parent's lexer
+        if start_index is not None:
+            self._remaining_input_string_start_index = start_index
 
-        parsing_error = ParseError(
-            formatted_error_message, self._lexer.input_string, self._current_token.start_index_inclusive
-        )
+        profile = self._profile
+        start_time = profile.start_rule() if profile is not None else 0.0
+
+        previous_mode = self._lexer.switch_mode(self._mode)
+        try:
+            value = self._parse()
+        finally:
+            self._lexer.switch_mode(previous_mode)
+            if profile is not None:
+                profile.stop_rule(f"{type(self).__module__}.{type(self).__qualname__}", start_time)
 
-        raise ParseErrorException(parsing_error)
+        return ParseSuccess(value, self._remaining_input_string_start_index)
 
     @_abc.abstractmethod
-    def parse(self) -> ParseResult:
+    def _parse(self) -> _T_co:
         raise NotImplementedError()  # pragma: no cover
+
+    def _count_raised_exception(self) -> None:
+        if self._profile is not None:
+            self._profile.n_exceptions_raised += 1
+
+    def _count_caught_exception(self) -> None:
+        if self._profile is not None:
+            self._profile.n_exceptions_caught += 1
+
+
+def _create_parse_error(
+    error_message: str, format_arguments: dict[str, str], input_string: Input, error_start: int
+) -> ParseError:
+    return ParseError(error_message.format(**format_arguments), input_string, error_start)
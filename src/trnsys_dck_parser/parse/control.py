@@ -0,0 +1,57 @@
+import re as _re
+
+import trnsys_dck_parser.model.control as _mctl
+import trnsys_dck_parser.parse.common as _pcom
+
+KEYWORDS = (
+    "ACCELERATE",
+    "ASSIGN",
+    "CHECK",
+    "DESIGNATE",
+    "DFQ",
+    "END",
+    "EQSOLVER",
+    "INCLUDE",
+    "LIMITS",
+    "LIST",
+    "LOOP",
+    "MAP",
+    "NAN_CHECK",
+    "NOCHECK",
+    "NOLIST",
+    "OVERWRITE_CHECK",
+    "SIMULATION",
+    "SOLVER",
+    "TIME_REPORT",
+    "TOLERANCES",
+    "VERSION",
+    "WIDTH",
+)
+
+_ARGUMENT_PATTERN = _re.compile(r'"[^"]*"|[^\s"]+')
+
+
+class Tokens:
+    KEYWORD = _pcom.TokenDefinition(
+        "control statement keyword", rf"(?:{'|'.join(KEYWORDS)})\b", _re.RegexFlag.IGNORECASE
+    )
+
+
+def split_arguments(arguments: str) -> list[str]:
+    return _ARGUMENT_PATTERN.findall(arguments)
+
+
+class Parser(_pcom.ParserBase[_mctl.ControlStatement]):
+    def __init__(self, input_string: _pcom.Input, start_pos: int = 0) -> None:
+        lexer = _pcom.Lexer(input_string, [Tokens.KEYWORD], start_pos)
+        super().__init__(lexer)
+
+    def _parse(self) -> _mctl.ControlStatement:
+        keyword = self._expect(Tokens.KEYWORD)
+        arguments = split_arguments(self._rest_of_line())
+        return _mctl.ControlStatement(_pcom.decode(keyword).upper(), arguments)
+
+
+def parse_control_statement(input_string: _pcom.Input) -> _pcom.ParseResult[_mctl.ControlStatement]:
+    parser = Parser(input_string)
+    return parser.parse()
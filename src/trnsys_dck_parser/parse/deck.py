@@ -0,0 +1,304 @@
+import bisect as _bisect
+import dataclasses as _dc
+import io as _io
+import os as _os
+import re as _re
+import typing as _tp
+
+import trnsys_dck_parser.model.deck as _mdeck
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.expression as _mexpr
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.control as _pctl
+import trnsys_dck_parser.parse.equations as _peqs
+import trnsys_dck_parser.parse.unit as _punit
+
+
+def _create_control_parser(input_string: str, start_pos: int, _node_factory: _mexpr.NodeFactory | None) -> _pctl.Parser:
+    return _pctl.Parser(input_string, start_pos)
+
+
+# Without a node factory, each block is parsed with its own interning one, which is dropped with the
+# block's nodes: streaming a deck takes memory for its largest block only. Passing a factory shares it
+# between the blocks, so that e.g. a variable used in several blocks is represented by one node only.
+_BLOCK_PARSER_CLASSES: _tp.Mapping[
+    str, _tp.Callable[[str, int, _mexpr.NodeFactory | None], _pcom.ParserBase[_mdeck.Block]]
+] = {
+    "EQUATIONS": _peqs.Parser,
+    "CONSTANTS": _peqs.ConstantsParser,
+    "UNIT": _punit.Parser,
+    **{keyword: _create_control_parser for keyword in _pctl.KEYWORDS},
+}
+
+# A top-level block starts on a line whose first word is a block keyword. The negative
+# lookahead keeps equations such as "END = 10" inside their block.
+_BLOCK_START_PATTERN = _re.compile(r"[ \t]*([a-zA-Z_]+)\b(?![ \t]*=)")
+
+# The same for a whole deck at once, capturing the integers following the keyword: e.g. the number
+# of equations of an EQUATIONS block or the unit and type numbers of a UNIT
+_INDEX_PATTERN = _re.compile(
+    rf"^[ \t]*({'|'.join(_BLOCK_PARSER_CLASSES)})\b(?![ \t]*=)"
+    r"(?:[ \t]+([0-9]+)(?![^\s!])(?:[ \t]+TYPE[ \t]+([0-9]+)(?![^\s!]))?)?",
+    _re.RegexFlag.MULTILINE | _re.RegexFlag.IGNORECASE,
+)
+
+# Lines whose first non-blank character is "*" are comment lines of decks, whereas "*" continues a product
+# in equations parsed on their own. Blocks are parsed with the "*" of their comment lines replaced by "!",
+# which keeps the offsets.
+_COMMENT_LINE_PATTERN = _re.compile(r"^([ \t]*)\*", _re.RegexFlag.MULTILINE)
+
+_DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_T = _tp.TypeVar("_T")
+
+
+@_dc.dataclass
+class ParsedBlock:
+    # Upper-cased block keyword or `None` for input in front of the first block
+    keyword: str | None
+    # Offset of `input_string` within the deck
+    start_index: int
+    input_string: str
+    result: _pcom.ParseResult[_mdeck.Block]
+
+
+@_dc.dataclass
+class ParsedDeck:
+    input_string: str
+    blocks: list[ParsedBlock]
+
+
+@_dc.dataclass(frozen=True)
+class IndexedBlock:
+    # Upper-cased block keyword or `None` for input in front of the first block
+    keyword: str | None
+    # Offsets within the deck
+    start_index: int
+    end_index: int
+    number: int | None = None
+    type_number: int | None = None
+
+
+class DeckIndex:
+    # The blocks of a deck, located without parsing them. Blocks are parsed on first access only.
+
+    def __init__(
+        self, input_string: str, blocks: _tp.Sequence[IndexedBlock], node_factory: _mexpr.NodeFactory | None = None
+    ) -> None:
+        self.input_string = input_string
+        self.blocks = blocks
+        self._node_factory = node_factory
+        # By start index
+        self._parsed_blocks: dict[int, ParsedBlock] = {}
+
+    def get_blocks(self, keyword: str) -> list[IndexedBlock]:
+        keyword = keyword.upper()
+        return [b for b in self.blocks if b.keyword == keyword]
+
+    def parse_block(self, block: IndexedBlock) -> ParsedBlock:
+        if (parsed_block := self._parsed_blocks.get(block.start_index)) is None:
+            input_string = self.input_string[block.start_index : block.end_index]
+            parsed_block = _parse_block(block.keyword, block.start_index, input_string, self._node_factory)
+            # Only empty input in front of the first block isn't a block, and that isn't indexed
+            assert parsed_block
+            self._parsed_blocks[block.start_index] = parsed_block
+
+        return parsed_block
+
+    def parse_blocks(self, keyword: str | None = None) -> _tp.Iterator[ParsedBlock]:
+        blocks = self.blocks if keyword is None else self.get_blocks(keyword)
+        return (self.parse_block(b) for b in blocks)
+
+
+def index_deck(input_string: str, node_factory: _mexpr.NodeFactory | None = None) -> DeckIndex:
+    matches = list(_INDEX_PATTERN.finditer(input_string))
+
+    start_indices = [m.start() for m in matches]
+    end_indices = [*start_indices[1:], len(input_string)]
+    blocks = [
+        IndexedBlock(m.group(1).upper(), s, e, *(None if n is None else int(n) for n in m.group(2, 3)))
+        for m, s, e in zip(matches, start_indices, end_indices)
+    ]
+
+    first_block_start_index = start_indices[0] if matches else len(input_string)
+    if _pcom.skip_ignored(_mask_comment_lines(input_string[:first_block_start_index]), 0) != first_block_start_index:
+        blocks.insert(0, IndexedBlock(None, 0, first_block_start_index))
+
+    return DeckIndex(input_string, blocks, node_factory)
+
+
+def parse_deck(input_string: str, node_factory: _mexpr.NodeFactory | None = None) -> _tp.Iterator[ParsedBlock]:
+    return parse_deck_file(_io.StringIO(input_string), node_factory=node_factory)
+
+
+def parse_deck_file(
+    file: str | _os.PathLike[str] | _tp.TextIO,
+    chunk_size: int = _DEFAULT_CHUNK_SIZE,
+    node_factory: _mexpr.NodeFactory | None = None,
+) -> _tp.Iterator[ParsedBlock]:
+    if isinstance(file, (str, _os.PathLike)):
+        with open(file, encoding="utf-8", errors="replace") as text_file:
+            yield from _parse_blocks(_iter_lines(text_file, chunk_size), node_factory=node_factory)
+    else:
+        yield from _parse_blocks(_iter_lines(file, chunk_size), node_factory=node_factory)
+
+
+def get_block_keyword(line: str) -> str | None:
+    match = _BLOCK_START_PATTERN.match(line)
+    if not match:
+        return None
+
+    keyword = match.group(1).upper()
+
+    return keyword if keyword in _BLOCK_PARSER_CLASSES else None
+
+
+def _iter_lines(file: _tp.TextIO, chunk_size: int) -> _tp.Iterator[str]:
+    remainder = ""
+    while chunk := file.read(chunk_size):
+        *lines, remainder = (remainder + chunk).split("\n")
+        for line in lines:
+            yield line + "\n"
+
+    if remainder:
+        yield remainder
+
+
+def create_parsed_deck(input_string: str) -> ParsedDeck:
+    # The starting point for `reparse_deck`
+    return ParsedDeck(input_string, list(parse_deck(input_string)))
+
+
+def reparse_deck(previous_deck: ParsedDeck, edit: _pcom.TextEdit) -> ParsedDeck:
+    # Only the blocks touched by the edit are parsed again. The others are reused, shifted if they
+    # follow the edit. Within equations and constants blocks only the edited equations are parsed again.
+    previous_input_string = previous_deck.input_string
+    input_string = edit.apply(previous_input_string)
+    blocks = previous_deck.blocks
+
+    # Block boundaries depend on whole lines
+    edited_lines_start_index, edited_lines_end_index = _get_edited_lines(previous_input_string, edit)
+
+    start_indices = [b.start_index for b in blocks]
+    block_index = _bisect.bisect_right(start_indices, edited_lines_start_index) - 1
+    end_block_index = max(_bisect.bisect_left(start_indices, edited_lines_end_index), block_index + 1)
+
+    if (
+        block_index >= 0
+        and end_block_index == block_index + 1
+        and edited_lines_start_index > blocks[block_index].start_index
+        and not _contains_block_start(
+            input_string, edited_lines_start_index, edited_lines_end_index + edit.length_change
+        )
+        and (parsed_block := _reparse_block(blocks[block_index], input_string, edit))
+    ):
+        reparsed_blocks = [parsed_block]
+    else:
+        # The first line of the preceding block is left untouched, so its block starts where it did before
+        block_index = max(block_index - 1, 0)
+        reparse_start_index = blocks[block_index].start_index if block_index > 0 else 0
+        reparse_end_index = _get_block_end_index(blocks, end_block_index, len(previous_input_string))
+        reparsed_blocks = _reparse_blocks(input_string, reparse_start_index, reparse_end_index + edit.length_change)
+
+    shifted_blocks = [_dc.replace(b, start_index=b.start_index + edit.length_change) for b in blocks[end_block_index:]]
+
+    return ParsedDeck(input_string, [*blocks[:block_index], *reparsed_blocks, *shifted_blocks])
+
+
+def _get_edited_lines(input_string: str, edit: _pcom.TextEdit) -> tuple[int, int]:
+    start_index = input_string.rfind("\n", 0, edit.start_index) + 1
+    end_of_line_index = input_string.find("\n", edit.end_index)
+    end_index = len(input_string) if end_of_line_index == -1 else end_of_line_index + 1
+    return start_index, end_index
+
+
+def _contains_block_start(input_string: str, start_index: int, end_index: int) -> bool:
+    lines = input_string[start_index:end_index].split("\n")
+    return any(get_block_keyword(l) for l in lines)
+
+
+def _get_block_end_index(blocks: _tp.Sequence[ParsedBlock], end_block_index: int, input_length: int) -> int:
+    return blocks[end_block_index].start_index if end_block_index < len(blocks) else input_length
+
+
+def _reparse_blocks(input_string: str, start_index: int, end_index: int) -> list[ParsedBlock]:
+    lines = _iter_lines(_io.StringIO(input_string[start_index:end_index]), _DEFAULT_CHUNK_SIZE)
+    return list(_parse_blocks(lines, start_index))
+
+
+def _reparse_block(block: ParsedBlock, deck_input_string: str, edit: _pcom.TextEdit) -> ParsedBlock | None:
+    if block.keyword not in ("EQUATIONS", "CONSTANTS") or not _pcom.is_success(block.result):
+        return None
+
+    block_edit = edit.shift(-block.start_index)
+    end_index = block.start_index + len(block.input_string) + edit.length_change
+    input_string = deck_input_string[block.start_index : end_index]
+
+    masked_input_string = _mask_comment_lines(input_string)
+    result = _peqs.reparse_equations(
+        _tp.cast(_pcom.ParseSuccess[_meqs.Equations], block.result), masked_input_string, block_edit
+    )
+
+    return ParsedBlock(
+        block.keyword, block.start_index, input_string, _check_end_of_block(input_string, masked_input_string, result)
+    )
+
+
+def _parse_blocks(
+    lines: _tp.Iterable[str], start_index: int = 0, node_factory: _mexpr.NodeFactory | None = None
+) -> _tp.Iterator[ParsedBlock]:
+    keyword: str | None = None
+    block_lines: list[str] = []
+    index = start_index
+    for line in lines:
+        if next_keyword := get_block_keyword(line):
+            if parsed_block := _parse_block(keyword, start_index, "".join(block_lines), node_factory):
+                yield parsed_block
+
+            keyword = next_keyword
+            start_index = index
+            block_lines = []
+
+        block_lines.append(line)
+        index += len(line)
+
+    if parsed_block := _parse_block(keyword, start_index, "".join(block_lines), node_factory):
+        yield parsed_block
+
+
+def _parse_block(
+    keyword: str | None, start_index: int, input_string: str, node_factory: _mexpr.NodeFactory | None
+) -> ParsedBlock | None:
+    masked_input_string = _mask_comment_lines(input_string)
+    if not keyword:
+        error_start = _pcom.skip_ignored(masked_input_string, 0)
+        if error_start == len(input_string):
+            return None
+
+        parse_error = _pcom.ParseError("Expected the start of a block.", input_string, error_start)
+        return ParsedBlock(keyword, start_index, input_string, parse_error)
+
+    parser = _BLOCK_PARSER_CLASSES[keyword](masked_input_string, 0, node_factory)
+    result = parser.parse()
+
+    return ParsedBlock(
+        keyword, start_index, input_string, _check_end_of_block(input_string, masked_input_string, result)
+    )
+
+
+def _mask_comment_lines(input_string: str) -> str:
+    return _COMMENT_LINE_PATTERN.sub(r"\1!", input_string)
+
+
+def _check_end_of_block(
+    input_string: str, masked_input_string: str, result: _pcom.ParseResult[_T]
+) -> _pcom.ParseResult[_T]:
+    if _pcom.is_success(result):
+        end_index = _pcom.skip_ignored(masked_input_string, result.remaining_string_input_start_index)
+        if end_index != len(input_string):
+            return _pcom.ParseError("Unexpected input after end of block.", input_string, end_index)
+        return result
+
+    # Errors refer to the block as it is
+    parse_error = _pcom.error(result)
+    return _pcom.ParseError(parse_error.error_message, input_string, parse_error.error_start)
@@ -1,3 +1,5 @@
+import bisect as _bisect
+import dataclasses as _dc
 import typing as _tp
 import re as _re
 
@@ -6,55 +8,291 @@ import trnsys_dck_parser.model.expression as _mexp
 import trnsys_dck_parser.parse.common as _pcom
 import trnsys_dck_parser.parse.tokens as _ptok
 import trnsys_dck_parser.parse.expression.parse as _pexp
+import trnsys_dck_parser.parse.expression.tokenize as _petok
 
 
 class Tokens:
     EQUATIONS = _pcom.TokenDefinition("EQUATIONS", r"EQUATIONS", _re.RegexFlag.IGNORECASE)
+    CONSTANTS = _pcom.TokenDefinition("CONSTANTS", r"CONSTANTS", _re.RegexFlag.IGNORECASE)
     POSITIVE_INTEGER = _pcom.TokenDefinition("positive integer", _ptok.Regexes.POSITIVE_INTEGER)
     EQUALS = _pcom.TokenDefinition("=", r"=")
 
 
+# Most equations of decks assign a number or another variable. Those "trivial" equations are matched as
+# a whole by one pattern instead of token by token by the parsers. The pattern consists of the lexer's
+# token regexes, tried in the lexer's order and in atomic groups, as the lexer doesn't backtrack either.
+_IGNORED_REGEX = f"(?:{_pcom.IGNORED_REGEX})*+"
+_IDENTIFIER_REGEX = _ptok.Tokens.IDENTIFIER.pattern.pattern
+_TRIVIAL_EQUATION_REGEX = (
+    f"{_IGNORED_REGEX}(?P<name>(?>{_IDENTIFIER_REGEX})){_IGNORED_REGEX}={_IGNORED_REGEX}"
+    f"(?>(?P<float>{_petok.Tokens.FLOAT.pattern.pattern})"
+    f"|(?P<integer>{_petok.Tokens.NEGATIVE_INTEGER.pattern.pattern}|{_petok.Tokens.POSITIVE_INTEGER.pattern.pattern})"
+    f"|(?P<variable>{_IDENTIFIER_REGEX}))"
+)
+_TRIVIAL_EQUATION_PATTERN = _re.compile(_TRIVIAL_EQUATION_REGEX)
+_TRIVIAL_EQUATION_BYTES_PATTERN = _re.compile(_TRIVIAL_EQUATION_REGEX.encode("ascii"))
+
+# The expression parser goes on after an operand followed by one of these
+_CONTINUING_TOKEN_DEFINITIONS = {
+    _petok.Tokens.PLUS,
+    _petok.Tokens.MINUS,
+    _petok.Tokens.TIMES,
+    _petok.Tokens.DIVIDE,
+    _petok.Tokens.POWER,
+}
+
+
+class _TrivialEquationMatcher:
+    def __init__(self, lexer: _pcom.Lexer) -> None:
+        is_text = isinstance(lexer.input_string, str)
+        self._pattern: _re.Pattern = _TRIVIAL_EQUATION_PATTERN if is_text else _TRIVIAL_EQUATION_BYTES_PATTERN
+        self._expression_mode = lexer.create_mode(_petok.TOKEN_DEFINITIONS)
+
+    def match(self, input_string: _pcom.Input, pos: int) -> _re.Match | None:
+        # The match of the equation at `pos` if it's trivial, i.e. if the expression parser would also end
+        # its right-hand side after the first token: the token following it is checked the way the
+        # expression parser lexes it
+        if not (match := self._pattern.match(input_string, pos)):
+            return None
+
+        mode = self._expression_mode
+        if not (next_token_match := mode.pattern.match(input_string, match.end())):
+            # Not a recognized token: it's up to the parsers to report it or to end the block there
+            return None
+
+        assert next_token_match.lastindex is not None
+        next_token_definition = mode.token_definitions_by_group_index[next_token_match.lastindex]
+        if next_token_definition in _CONTINUING_TOKEN_DEFINITIONS:
+            return None
+        if match["variable"] is not None and next_token_definition is _petok.Tokens.LEFT_PAREN:
+            # A function call
+            return None
+
+        return match
+
+
 class Parser(_pcom.ParserBase[_meqs.Equations]):
-    def __init__(self, input_string: str, start_pos: int = 0) -> None:
+    _KEYWORD = Tokens.EQUATIONS
+
+    def __init__(
+        self,
+        input_string: _pcom.Input,
+        start_pos: int = 0,
+        node_factory: _mexp.NodeFactory | None = None,
+        use_fast_path: bool = True,
+        is_strict: bool = False,
+    ) -> None:
         lexer = _pcom.Lexer(
-            input_string, [Tokens.EQUATIONS, Tokens.POSITIVE_INTEGER, Tokens.EQUALS, _ptok.Tokens.IDENTIFIER], start_pos
+            input_string, [self._KEYWORD, Tokens.POSITIVE_INTEGER, Tokens.EQUALS, _ptok.Tokens.IDENTIFIER], start_pos
         )
         super().__init__(lexer)
+        # Shared by the expressions of all equations
+        self._node_factory = _mexp.InterningNodeFactory() if node_factory is None else node_factory
+        self._expression_parser = _pexp.Parser(input_string, node_factory=self._node_factory, lexer=lexer)
+        self._trivial_equation_matcher = _TrivialEquationMatcher(lexer) if use_fast_path else None
+        # Whether to read exactly as many equations as the block declares, as TRNSYS does: missing ones are
+        # errors and any further ones are left to whatever follows the block
+        self._is_strict = is_strict
 
-    def parse(self) -> _pcom.ParseResult[_meqs.Equations]:
-        try:
-            equations = self._equations()
-            return _pcom.ParseSuccess(equations, self._remaining_input_string_start_index)
-        except _pcom.ParseErrorException as exception:
-            return exception.parse_error
+    def _parse(self) -> _meqs.Equations:
+        return self._equations()
 
     def _equations(self) -> _meqs.Equations:
-        self._expect(Tokens.EQUATIONS)
+        self._expect(self._KEYWORD)
 
-        n_equations_value = self._expect(Tokens.POSITIVE_INTEGER)
-        n_equations = None if n_equations_value is None else int(n_equations_value)
+        n_equations = int(self._expect(Tokens.POSITIVE_INTEGER))
 
         equations = [self._equation()]
-        while True:
-            try:
-                equations.append(self._equation())
-            except _pcom.ParseErrorException:
-                break
+        if self._is_strict:
+            while len(equations) < n_equations:
+                # Raises why the next declared equation isn't one
+                equations.append(self._try_equation() or self._equation())
+        else:
+            while equation := self._try_equation():
+                equations.append(equation)
 
+        return self._create_equations(n_equations, equations)
+
+    def _create_equations(self, n_equations: int | None, equations: list[_meqs.Equation]) -> _meqs.Equations:
         return _meqs.Equations(n_equations, equations)
 
     def _equation(self) -> _meqs.Equation:
+        if trivial_equation := self._try_trivial_equation():
+            return trivial_equation
+
+        start_index = self._get_next_token_start_index()
         variable_name = self._expect(_ptok.Tokens.IDENTIFIER)
         self._expect(Tokens.EQUALS)
         expression = self._expression()
-        equation = _meqs.Equation(variable_name, expression)
+        end_index = self._remaining_input_string_start_index
+        equation = _meqs.Equation(_pcom.decode(variable_name), expression, start_index, end_index)
+        self._count_equation("full")
         return equation
 
+    def _try_equation(self) -> _meqs.Equation | None:
+        # The block ends before the first thing that isn't an equation. That's the normal case, so
+        # it's detected by lookahead instead of by raising and catching a parse error.
+        if trivial_equation := self._try_trivial_equation():
+            return trivial_equation
+
+        start_pos = self._remaining_input_string_start_index
+        start_index = self._get_next_token_start_index()
+        if not self._at(_ptok.Tokens.IDENTIFIER):
+            return None
+        variable_name = self._expect(_ptok.Tokens.IDENTIFIER)
+
+        if not self._at(Tokens.EQUALS):
+            self._rewind(start_pos)
+            return None
+        self._expect(Tokens.EQUALS)
+
+        expression = self._accept_sub_parser(self._expression_parser)
+        if expression is None:
+            self._rewind(start_pos)
+            return None
+
+        end_index = self._remaining_input_string_start_index
+        self._count_equation("full")
+        return _meqs.Equation(_pcom.decode(variable_name), expression, start_index, end_index)
+
+    def _try_trivial_equation(self) -> _meqs.Equation | None:
+        # The same equation as the parsers would produce, with the parser and the lexer left in an
+        # equivalent state, or `None` without changing anything if the equation isn't trivial
+        if self._trivial_equation_matcher is None:
+            return None
+
+        lexer = self._lexer
+        match = self._trivial_equation_matcher.match(lexer.input_string, self._remaining_input_string_start_index)
+        if not match:
+            return None
+
+        variable_name = _pcom.decode(match["name"])
+        if self._KEYWORD.pattern.match(variable_name):
+            # The lexer takes the start of the name for the block keyword
+            return None
+
+        if (value := match["variable"]) is not None:
+            rhs = self._node_factory.variable(_pcom.decode(value))
+        elif (value := match["float"]) is not None:
+            rhs = self._node_factory.literal(float(value))
+        else:
+            rhs = self._node_factory.literal(int(match["integer"]))
+
+        end_index = match.end()
+        self._remaining_input_string_start_index = end_index
+        lexer.lookahead = None
+        lexer.advance_input(end_index)
+
+        self._count_equation("trivial")
+        return _meqs.Equation(variable_name, rhs, match.start("name"), end_index)
+
+    def _count_equation(self, tier: str) -> None:
+        if self._profile is not None:
+            self._profile.count_equation(tier)
+
+    def _get_next_token_start_index(self) -> int:
+        if lookahead := self._lexer.lookahead:
+            return lookahead.start_index_inclusive
+        return self._skip_ignored(self._remaining_input_string_start_index)
+
     def _expression(self) -> _mexp.Expression:
-        parser = _pexp.Parser(self._lexer.input_string, self._remaining_input_string_start_index)
-        return self._expect_sub_parser(parser)
+        return self._expect_sub_parser(self._expression_parser)
+
+
+class ConstantsParser(Parser):
+    _KEYWORD = Tokens.CONSTANTS
+
+    def _create_equations(self, n_equations: int | None, equations: list[_meqs.Equation]) -> _meqs.Constants:
+        return _meqs.Constants(n_equations, equations)
+
+
+class _ContinuationParser(Parser):
+    # Parses the equations of a block from `start_pos` on, i.e. without the block header, up to `stop_index`
+    def __init__(self, input_string: _pcom.Input, start_pos: int, stop_index: int | None) -> None:
+        super().__init__(input_string, start_pos)
+        self._remaining_input_string_start_index = start_pos
+        self._stop_index = stop_index
+
+    def _equations(self) -> _meqs.Equations:
+        equations = [self._equation()]
+        while self._stop_index is None or self._get_next_token_start_index() < self._stop_index:
+            if not (equation := self._try_equation()):
+                break
+            equations.append(equation)
+
+        return self._create_equations(None, equations)
+
+
+def reparse_equations(
+    previous_result: _pcom.ParseSuccess[_meqs.Equations],
+    input_string: str,
+    edit: _pcom.TextEdit,
+    is_strict: bool = False,
+) -> _pcom.ParseResult[_meqs.Equations]:
+    # Parses the block `input_string` resulting from applying `edit` to the input of `previous_result`.
+    # Only the equations around the edit are parsed again, the others are reused with shifted offsets.
+    previous_equations = previous_result.value
+    if (result := _reparse_edited_equations(previous_result, input_string, edit, is_strict)) is not None:
+        return result
+
+    if isinstance(previous_equations, _meqs.Constants):
+        return ConstantsParser(input_string, is_strict=is_strict).parse()
 
+    return Parser(input_string, is_strict=is_strict).parse()
 
-def parse_equations(input_string: str) -> _pcom.ParseResult[_meqs.Equations]:
-    parser = Parser(input_string)
+
+def _reparse_edited_equations(
+    previous_result: _pcom.ParseSuccess[_meqs.Equations], input_string: str, edit: _pcom.TextEdit, is_strict: bool
+) -> _pcom.ParseResult[_meqs.Equations] | None:
+    equations = previous_result.value.equations
+    if any(e.start_index is None for e in equations):
+        return None
+    start_indices = [_tp.cast(int, e.start_index) for e in equations]
+
+    # Parsing the equation preceding the edited one may have looked ahead into the edited one's
+    # first token: start one equation earlier
+    first_index = _bisect.bisect_left(start_indices, edit.start_index) - 2
+    if first_index < 0:
+        return None
+
+    end_index = _bisect.bisect_right(start_indices, edit.end_index)
+    if end_index < len(equations):
+        stop_index = start_indices[end_index] + edit.length_change
+    else:
+        stop_index = None
+
+    parser = _ContinuationParser(input_string, start_indices[first_index], stop_index)
+    result = parser.parse()
+    if not _pcom.is_success(result):
+        return None
+
+    reparsed_equations = [*equations[:first_index], *result.value.equations]
+    if stop_index is None:
+        remaining_start_index = result.remaining_string_input_start_index
+    elif _pcom.skip_ignored(input_string, result.remaining_string_input_start_index) != stop_index:
+        return None
+    else:
+        reparsed_equations += [_shift_equation(e, edit.length_change) for e in equations[end_index:]]
+        remaining_start_index = previous_result.remaining_string_input_start_index + edit.length_change
+
+    # Let parsing the whole block tell which equations are missing or left over
+    if is_strict and len(reparsed_equations) != previous_result.value.n_equations:
+        return None
+
+    return _pcom.ParseSuccess(_dc.replace(previous_result.value, equations=reparsed_equations), remaining_start_index)
+
+
+def _shift_equation(equation: _meqs.Equation, offset: int) -> _meqs.Equation:
+    start_index = _tp.cast(int, equation.start_index)
+    end_index = _tp.cast(int, equation.end_index)
+    return _dc.replace(equation, start_index=start_index + offset, end_index=end_index + offset)
+
+
+def parse_equations(input_string: _pcom.Input, is_strict: bool = False) -> _pcom.ParseResult[_meqs.Equations]:
+    parser = Parser(input_string, is_strict=is_strict)
     return parser.parse()
+
+
+def parse_constants(input_string: _pcom.Input, is_strict: bool = False) -> _pcom.ParseResult[_meqs.Constants]:
+    parser = ConstantsParser(input_string, is_strict=is_strict)
+    return _tp.cast(_pcom.ParseResult[_meqs.Constants], parser.parse())
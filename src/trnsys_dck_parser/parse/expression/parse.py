@@ -1,4 +1,5 @@
 import dataclasses as _dc
+import enum as _enum
 import typing as _tp
 
 import trnsys_dck_parser.model.expression as _exp
@@ -17,27 +18,156 @@ ParseResult = _pcom.ParseResult[_exp.Expression]
 
 
 class Parser(_pcom.ParserBase[_exp.Expression]):
-    def __init__(self, input_string: str, start_pos: int = 0) -> None:
-        lexer = _petok.create_lexer(input_string, start_pos)
-        super().__init__(lexer)
+    def __init__(
+        self,
+        input_string: _pcom.Input,
+        start_pos: int = 0,
+        node_factory: _exp.NodeFactory | None = None,
+        lexer: _pcom.Lexer | None = None,
+    ) -> None:
+        # Given `lexer`, the parser shares it and its lookahead token with the parser of the surrounding block
+        if lexer is None:
+            super().__init__(_petok.create_lexer(input_string, start_pos))
+        else:
+            super().__init__(lexer, lexer.create_mode(_petok.TOKEN_DEFINITIONS))
+        self._node_factory = _exp.InterningNodeFactory() if node_factory is None else node_factory
 
-    def parse(self) -> ParseResult:
-        try:
-            expression = self._expression()
-            parse_success = _pcom.ParseSuccess(expression, self._remaining_input_string_start_index)
-            return parse_success
-        except _pcom.ParseErrorException as exception:
-            return exception.parse_error
+    def _parse(self) -> _exp.Expression:
+        return self._expression()
+
+    def _expression(self) -> _exp.Expression:
+        # Operator-precedence parsing with explicit stacks instead of one Python frame per grammar
+        # rule and nesting level. The result is the same as `RecursiveParser`'s. Nested expressions
+        # (parentheses, unary minus operands and function arguments) share the operand and operator
+        # stacks: their contexts only remember where their operators start.
+        operands: list[_exp.Expression] = []
+        operators: list[tuple[type[_exp.BinaryExpression], int]] = []
+        contexts = [_Context(_ContextKind.ROOT, 0)]
+        while True:
+            operand = self._operand(contexts, len(operators))
+            if operand is None:
+                continue
+
+            while not self._continue_after_operand(contexts[-1], operand, operands, operators):
+                context = contexts.pop()
+                self._reduce(operands, operators, context.operators_start, 0)
+                expression = operands.pop()
+
+                match context.kind:
+                    case _ContextKind.ROOT:
+                        return expression
+                    case _ContextKind.PARENTHESES:
+                        self._expect(_petok.Tokens.RIGHT_PAREN)
+                        operand = expression
+                    case _ContextKind.NEGATION:
+                        operand = self._node_factory.negation(expression)
+                    case _ContextKind.ARGUMENT:
+                        assert context.function is not None and context.arguments is not None
+                        context.arguments.append(expression)
+                        if self._accept(_petok.Tokens.COMMA):
+                            contexts.append(
+                                _Context(_ContextKind.ARGUMENT, len(operators), context.function, context.arguments)
+                            )
+                            break
+                        self._expect(_petok.Tokens.RIGHT_PAREN)
+                        operand = self._node_factory.function_call(context.function, context.arguments)
+
+    def _operand(self, contexts: list["_Context"], operators_start: int) -> _exp.Expression | None:
+        # Returns `None` if the operand is a nested expression: its context is pushed onto `contexts`
+        token_definition = self._peek()
+
+        if number_type := _NUMBER_TYPES.get(token_definition):
+            return self._node_factory.literal(number_type(self._expect(token_definition)))
+
+        if token_definition is _ptok.Tokens.IDENTIFIER:
+            identifier = _pcom.decode(self._expect(token_definition))
+            if not self._accept(_petok.Tokens.LEFT_PAREN):
+                return self._node_factory.variable(identifier)
+
+            contexts.append(_Context(_ContextKind.ARGUMENT, operators_start, identifier, []))
+            return None
+
+        if token_definition is _petok.Tokens.LEFT_SQUARE_BRACKET:
+            self._expect(token_definition)
+            unit_number, output_number = self._unit_and_output_number()
+            self._expect(_petok.Tokens.RIGHT_SQUARE_BRACKET)
+            return self._node_factory.unit_output(unit_number, output_number)
+
+        if context_kind := _NESTED_EXPRESSION_KINDS.get(token_definition):
+            # The operand of a unary minus is a whole expression: "-a*b+c" is "-(a*b+c)"
+            self._expect(token_definition)
+            contexts.append(_Context(context_kind, operators_start))
+            return None
+
+        self._raise_parsing_error(
+            "Expected number, variable, function call, opening square bracket or "
+            "opening parenthesis but found {actual_token}"
+        )
+
+    def _continue_after_operand(
+        self,
+        context: "_Context",
+        operand: _exp.Expression,
+        operands: list[_exp.Expression],
+        operators: list[tuple[type[_exp.BinaryExpression], int]],
+    ) -> bool:
+        # Returns whether an operator was accepted, i.e. whether another operand must follow
+        token_definition = self._peek()
+
+        if context.base is not None:
+            operand = self._node_factory.binary_expression(_exp.Power, context.base, operand)
+            context.base = None
+        elif token_definition is _petok.Tokens.POWER:
+            # Powers don't associate: "a**b**c" ends after "a**b"
+            self._expect(token_definition)
+            context.base = operand
+            return True
+
+        operands.append(operand)
+
+        if operator := _BINARY_OPERATORS.get(token_definition):
+            self._expect(token_definition)
+            self._reduce(operands, operators, context.operators_start, operator[1])
+            operators.append(operator)
+            return True
+
+        return False
+
+    def _reduce(
+        self,
+        operands: list[_exp.Expression],
+        operators: list[tuple[type[_exp.BinaryExpression], int]],
+        operators_start: int,
+        minimum_binding_power: int,
+    ) -> None:
+        while len(operators) > operators_start and operators[-1][1] >= minimum_binding_power:
+            expression_type, _ = operators.pop()
+            y = operands.pop()
+            x = operands.pop()
+            operands.append(self._node_factory.binary_expression(expression_type, x, y))
+
+    def _unit_and_output_number(self) -> _tp.Tuple[int, int]:
+        unit_number = int(self._expect(_petok.Tokens.POSITIVE_INTEGER))
+
+        self._expect(_petok.Tokens.COMMA)
+
+        output_number = int(self._expect(_petok.Tokens.POSITIVE_INTEGER))
+
+        return unit_number, output_number
+
+
+class RecursiveParser(Parser):
+    # The recursive descent parser the iterative one replaces. Kept as a reference.
 
     def _expression(self) -> _exp.Expression:
         addend = self._addend()
         while True:
             if self._accept(_petok.Tokens.PLUS):
                 next_addend = self._addend()
-                addend += next_addend
+                addend = self._node_factory.binary_expression(_exp.Addition, addend, next_addend)
             elif self._accept(_petok.Tokens.MINUS):
                 next_addend = self._addend()
-                addend -= next_addend
+                addend = self._node_factory.binary_expression(_exp.Subtraction, addend, next_addend)
             else:
                 break
 
@@ -48,10 +178,12 @@ class Parser(_pcom.ParserBase[_exp.Expression]):
         while True:
             if self._accept(_petok.Tokens.TIMES):
                 next_multiplicand = self._multiplicand()
-                multiplicand *= next_multiplicand
+                multiplicand = self._node_factory.binary_expression(
+                    _exp.Multiplication, multiplicand, next_multiplicand
+                )
             elif self._accept(_petok.Tokens.DIVIDE):
                 next_multiplicand = self._multiplicand()
-                multiplicand /= next_multiplicand
+                multiplicand = self._node_factory.binary_expression(_exp.Division, multiplicand, next_multiplicand)
             else:
                 break
 
@@ -65,33 +197,33 @@ class Parser(_pcom.ParserBase[_exp.Expression]):
 
         exponent = self._power_operand()
 
-        return base ** exponent
+        return self._node_factory.binary_expression(_exp.Power, base, exponent)
 
     def _power_operand(self) -> _exp.Expression:  # pylint: disable=too-many-return-statements
         if positive_integer := self._accept(_petok.Tokens.POSITIVE_INTEGER):
-            return _exp.Literal(int(positive_integer))
+            return self._node_factory.literal(int(positive_integer))
 
         if negative_integer := self._accept(_petok.Tokens.NEGATIVE_INTEGER):
-            return _exp.Literal(int(negative_integer))
+            return self._node_factory.literal(int(negative_integer))
 
         if number := self._accept(_petok.Tokens.FLOAT):
-            return _exp.Literal(float(number))
+            return self._node_factory.literal(float(number))
 
         if identifier := self._accept(_ptok.Tokens.IDENTIFIER):
             if not self._accept(_petok.Tokens.LEFT_PAREN):
-                return _exp.Variable(identifier)
+                return self._node_factory.variable(_pcom.decode(identifier))
 
             arguments = self._argument_list()
             self._expect(_petok.Tokens.RIGHT_PAREN)
-            return _exp.FunctionCall(identifier, arguments)
+            return self._node_factory.function_call(_pcom.decode(identifier), arguments)
 
         if self._accept(_petok.Tokens.LEFT_SQUARE_BRACKET):
             unit_number, output_number = self._unit_and_output_number()
             self._expect(_petok.Tokens.RIGHT_SQUARE_BRACKET)
-            return _exp.UnitOutput(unit_number, output_number)
+            return self._node_factory.unit_output(unit_number, output_number)
 
         if self._accept(_petok.Tokens.MINUS):
-            return -self._expression()
+            return self._node_factory.negation(self._expression())
 
         if self._accept(_petok.Tokens.LEFT_PAREN):
             expression = self._expression()
@@ -111,11 +243,43 @@ class Parser(_pcom.ParserBase[_exp.Expression]):
 
         return arguments
 
-    def _unit_and_output_number(self) -> _tp.Tuple[int, int]:
-        unit_number = int(self._expect(_petok.Tokens.POSITIVE_INTEGER))
 
-        self._expect(_petok.Tokens.COMMA)
+_NUMBER_TYPES: _tp.Mapping[_pcom.TokenDefinition, type[int] | type[float]] = {
+    _petok.Tokens.POSITIVE_INTEGER: int,
+    _petok.Tokens.NEGATIVE_INTEGER: int,
+    _petok.Tokens.FLOAT: float,
+}
 
-        output_number = int(self._expect(_petok.Tokens.POSITIVE_INTEGER))
+# Binary operators other than "**" with their binding powers. They are all left-associative.
+_BINARY_OPERATORS: _tp.Mapping[_pcom.TokenDefinition, tuple[type[_exp.BinaryExpression], int]] = {
+    _petok.Tokens.PLUS: (_exp.Addition, 1),
+    _petok.Tokens.MINUS: (_exp.Subtraction, 1),
+    _petok.Tokens.TIMES: (_exp.Multiplication, 2),
+    _petok.Tokens.DIVIDE: (_exp.Division, 2),
+}
 
-        return unit_number, output_number
+
+class _ContextKind(_enum.Enum):
+    ROOT = _enum.auto()
+    PARENTHESES = _enum.auto()
+    NEGATION = _enum.auto()
+    ARGUMENT = _enum.auto()
+
+
+_NESTED_EXPRESSION_KINDS: _tp.Mapping[_pcom.TokenDefinition, _ContextKind] = {
+    _petok.Tokens.MINUS: _ContextKind.NEGATION,
+    _petok.Tokens.LEFT_PAREN: _ContextKind.PARENTHESES,
+}
+
+
+@_dc.dataclass(slots=True)
+class _Context:
+    # A nested expression being parsed
+    kind: _ContextKind
+    # Index of the nested expression's first operator on the operator stack
+    operators_start: int
+    # For function arguments
+    function: str | None = None
+    arguments: list[_exp.Expression] | None = None
+    # Set while parsing an exponent
+    base: _exp.Expression | None = None
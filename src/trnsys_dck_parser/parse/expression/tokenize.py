@@ -18,22 +18,23 @@ class Tokens:
     RIGHT_PAREN = _pcom.TokenDefinition('closing parenthesis (")")', r"\)")
 
 
-def create_lexer(input_string: str, start_pos: int) -> _pcom.Lexer:
-    token_definitions = [
-        Tokens.POSITIVE_INTEGER,
-        Tokens.NEGATIVE_INTEGER,
-        Tokens.FLOAT,
-        Tokens.LEFT_SQUARE_BRACKET,
-        Tokens.RIGHT_SQUARE_BRACKET,
-        Tokens.COMMA,
-        _ptok.Tokens.IDENTIFIER,
-        Tokens.PLUS,
-        Tokens.MINUS,
-        Tokens.TIMES,
-        Tokens.DIVIDE,
-        Tokens.POWER,
-        Tokens.LEFT_PAREN,
-        Tokens.RIGHT_PAREN,
-    ]
+TOKEN_DEFINITIONS = [
+    Tokens.POSITIVE_INTEGER,
+    Tokens.NEGATIVE_INTEGER,
+    Tokens.FLOAT,
+    Tokens.LEFT_SQUARE_BRACKET,
+    Tokens.RIGHT_SQUARE_BRACKET,
+    Tokens.COMMA,
+    _ptok.Tokens.IDENTIFIER,
+    Tokens.PLUS,
+    Tokens.MINUS,
+    Tokens.TIMES,
+    Tokens.DIVIDE,
+    Tokens.POWER,
+    Tokens.LEFT_PAREN,
+    Tokens.RIGHT_PAREN,
+]
 
-    return _pcom.Lexer(input_string, token_definitions, start_pos)
+
+def create_lexer(input_string: _pcom.Input, start_pos: int) -> _pcom.Lexer:
+    return _pcom.Lexer(input_string, TOKEN_DEFINITIONS, start_pos)
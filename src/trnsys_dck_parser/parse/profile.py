@@ -0,0 +1,89 @@
+import contextlib as _ctx
+import contextvars as _cv
+import dataclasses as _dc
+import time as _time
+import typing as _tp
+
+# Instrumentation of the lexer and the parsers, for finding out what makes a deck slow to parse. Lexers
+# and parsers created within `profile()` record into its `ParseProfile`, all others don't check
+# anything per token.
+
+
+@_dc.dataclass
+class TokenStatistics:
+    n_tokens: int = 0
+    # The lexer tries the definitions of its mode in order of priority: a token counts as an attempt
+    # for its own and all definitions tried before it, and as a miss for the latter
+    n_regex_attempts: int = 0
+    n_regex_misses: int = 0
+
+
+@_dc.dataclass
+class RuleStatistics:
+    n_calls: int = 0
+    # In seconds, with and without the time spent in the rules parsed by sub parsers
+    total_time: float = 0.0
+    self_time: float = 0.0
+
+
+@_dc.dataclass
+class ParseProfile:  # pylint: disable=too-many-instance-attributes
+    # By token definition description
+    tokens: dict[str, TokenStatistics] = _dc.field(default_factory=dict)
+    # Explicit skips of whitespace and comments. The lexer skips them in front of a token as part of
+    # matching the token, which isn't counted.
+    n_skip_ignored_calls: int = 0
+    n_parsers_created: int = 0
+    n_exceptions_raised: int = 0
+    n_exceptions_caught: int = 0
+    # By parser class: a parser's grammar rule is what its `_parse` parses
+    rules: dict[str, RuleStatistics] = _dc.field(default_factory=dict)
+    # Equations by how they were parsed: "trivial" ones by a single pattern, "full" ones by the parsers
+    n_equations_by_tier: dict[str, int] = _dc.field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        # Time spent in nested rules, for each rule being parsed
+        self._nested_times: list[float] = []
+
+    def get_token_statistics(self, description: str) -> TokenStatistics:
+        if (statistics := self.tokens.get(description)) is None:
+            statistics = self.tokens[description] = TokenStatistics()
+        return statistics
+
+    def count_equation(self, tier: str) -> None:
+        self.n_equations_by_tier[tier] = self.n_equations_by_tier.get(tier, 0) + 1
+
+    def start_rule(self) -> float:
+        self._nested_times.append(0.0)
+        return _time.perf_counter()
+
+    def stop_rule(self, name: str, start_time: float) -> None:
+        total_time = _time.perf_counter() - start_time
+        nested_time = self._nested_times.pop()
+        if self._nested_times:
+            self._nested_times[-1] += total_time
+
+        statistics = self.rules.setdefault(name, RuleStatistics())
+        statistics.n_calls += 1
+        statistics.total_time += total_time
+        statistics.self_time += total_time - nested_time
+
+    def to_dict(self) -> dict[str, _tp.Any]:
+        return _dc.asdict(self)
+
+
+_CURRENT_PROFILE: _cv.ContextVar[ParseProfile | None] = _cv.ContextVar("_CURRENT_PROFILE", default=None)
+
+
+@_ctx.contextmanager
+def profile() -> _tp.Iterator[ParseProfile]:
+    parse_profile = ParseProfile()
+    token = _CURRENT_PROFILE.set(parse_profile)
+    try:
+        yield parse_profile
+    finally:
+        _CURRENT_PROFILE.reset(token)
+
+
+def get_current_profile() -> ParseProfile | None:
+    return _CURRENT_PROFILE.get()
@@ -0,0 +1,134 @@
+import re as _re
+
+import trnsys_dck_parser.model.control as _mctl
+import trnsys_dck_parser.model.expression as _mexp
+import trnsys_dck_parser.model.unit as _munit
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.control as _pctl
+import trnsys_dck_parser.parse.expression.tokenize as _petok
+import trnsys_dck_parser.parse.tokens as _ptok
+
+
+def _create_keyword(keyword: str) -> _pcom.TokenDefinition:
+    return _pcom.TokenDefinition(keyword, rf"{keyword}\b", _re.RegexFlag.IGNORECASE, priority=0)
+
+
+class Tokens:
+    UNIT = _create_keyword("UNIT")
+    TYPE = _create_keyword("TYPE")
+    PARAMETERS = _create_keyword("PARAMETERS")
+    INPUTS = _create_keyword("INPUTS")
+    DERIVATIVES = _create_keyword("DERIVATIVES")
+    LABELS = _create_keyword("LABELS")
+    TRACE = _create_keyword("TRACE")
+    ETRACE = _create_keyword("ETRACE")
+    FORMAT = _create_keyword("FORMAT")
+    QUOTED_STRING = _pcom.TokenDefinition("quoted string", r'"[^"\n]*"')
+
+
+class Parser(_pcom.ParserBase[_munit.Unit]):
+    def __init__(
+        self, input_string: _pcom.Input, start_pos: int = 0, node_factory: _mexp.NodeFactory | None = None
+    ) -> None:
+        lexer = _pcom.Lexer(
+            input_string,
+            [
+                Tokens.UNIT,
+                Tokens.TYPE,
+                Tokens.PARAMETERS,
+                Tokens.INPUTS,
+                Tokens.DERIVATIVES,
+                Tokens.LABELS,
+                Tokens.TRACE,
+                Tokens.ETRACE,
+                Tokens.FORMAT,
+                Tokens.QUOTED_STRING,
+                _petok.Tokens.POSITIVE_INTEGER,
+                _petok.Tokens.NEGATIVE_INTEGER,
+                _petok.Tokens.FLOAT,
+                _petok.Tokens.COMMA,
+                _ptok.Tokens.IDENTIFIER,
+            ],
+            start_pos,
+        )
+        super().__init__(lexer)
+        self._node_factory = _mexp.InterningNodeFactory() if node_factory is None else node_factory
+
+    def _parse(self) -> _munit.Unit:
+        return self._unit()
+
+    def _unit(self) -> _munit.Unit:
+        self._expect(Tokens.UNIT)
+        unit_number = int(self._expect(_petok.Tokens.POSITIVE_INTEGER))
+        self._expect(Tokens.TYPE)
+        type_number = int(self._expect(_petok.Tokens.POSITIVE_INTEGER))
+        name = self._rest_of_line() or None
+
+        unit = _munit.Unit(unit_number, type_number, name)
+
+        while True:
+            if self._accept(Tokens.PARAMETERS):
+                n_parameters = self._count()
+                unit.parameters = _munit.Parameters(n_parameters, self._values(n_parameters))
+            elif self._accept(Tokens.INPUTS):
+                n_inputs = self._count()
+                connections = [self._connection() for _ in range(n_inputs)]
+                unit.inputs = _munit.Inputs(n_inputs, connections, self._values(n_inputs))
+            elif self._accept(Tokens.DERIVATIVES):
+                n_derivatives = self._count()
+                unit.derivatives = _munit.Derivatives(n_derivatives, self._values(n_derivatives))
+            elif self._accept(Tokens.LABELS):
+                n_labels = self._count()
+                labels = [_pcom.decode(self._expect(Tokens.QUOTED_STRING))[1:-1] for _ in range(n_labels)]
+                unit.labels = _munit.Labels(n_labels, labels)
+            elif keyword := self._accept_statement_keyword():
+                arguments = _pctl.split_arguments(self._rest_of_line())
+                unit.statements.append(_mctl.ControlStatement(_pcom.decode(keyword).upper(), arguments))
+            else:
+                break
+
+        return unit
+
+    def _accept_statement_keyword(self) -> str | bytes | None:
+        for token_definition in [Tokens.TRACE, Tokens.ETRACE, Tokens.FORMAT]:
+            if keyword := self._accept(token_definition):
+                return keyword
+
+        return None
+
+    def _count(self) -> int:
+        return int(self._expect(_petok.Tokens.POSITIVE_INTEGER))
+
+    def _values(self, n_values: int) -> list[_mexp.Expression]:
+        return [self._value() for _ in range(n_values)]
+
+    def _value(self) -> _mexp.Expression:
+        if positive_integer := self._accept(_petok.Tokens.POSITIVE_INTEGER):
+            return self._node_factory.literal(int(positive_integer))
+
+        if negative_integer := self._accept(_petok.Tokens.NEGATIVE_INTEGER):
+            return self._node_factory.literal(int(negative_integer))
+
+        if number := self._accept(_petok.Tokens.FLOAT):
+            return self._node_factory.literal(float(number))
+
+        if identifier := self._accept(_ptok.Tokens.IDENTIFIER):
+            return self._node_factory.variable(_pcom.decode(identifier))
+
+        self._raise_parsing_error("Expected number or variable but found {actual_token}.")
+
+    def _connection(self) -> _mexp.Expression:
+        if unit_number := self._accept(_petok.Tokens.POSITIVE_INTEGER):
+            self._expect(_petok.Tokens.COMMA)
+            output_number = self._expect(_petok.Tokens.POSITIVE_INTEGER)
+            return self._node_factory.unit_output(int(unit_number), int(output_number))
+
+        if identifier := self._accept(_ptok.Tokens.IDENTIFIER):
+            return self._node_factory.variable(_pcom.decode(identifier))
+
+        self._raise_parsing_error('Expected unit output ("<unit>,<output>") or variable but found {actual_token}.')
+
+
+def parse_unit(input_string: _pcom.Input) -> _pcom.ParseResult[_munit.Unit]:
+    parser = Parser(input_string)
+    return parser.parse()
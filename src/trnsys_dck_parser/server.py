@@ -0,0 +1,354 @@
+import argparse as _ap
+import asyncio as _aio
+import concurrent.futures as _cf
+import dataclasses as _dc
+import functools as _ft
+import json as _json
+import os as _os
+import sys as _sys
+import threading as _th
+import typing as _tp
+
+import trnsys_dck_parser.cli as _cli
+import trnsys_dck_parser.common as _com
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.deck as _pdeck
+
+# A JSON-RPC 2.0 server keeping the parser loaded between requests, e.g. for editors and commit hooks.
+# Messages are single lines of JSON. Documents are identified by a URI and a version: the text of a
+# version needs to be sent only once, the results of parsing it are kept until a newer version is sent,
+# the document is closed or it is evicted as the least recently used one. Requests for older versions
+# of a document are then cancelled. Cancelled requests stop parsing at the next block.
+
+# As in JSON-RPC, the last one as in the language server protocol
+_PARSE_ERROR = -32700
+_INVALID_REQUEST = -32600
+_METHOD_NOT_FOUND = -32601
+_INVALID_PARAMS = -32602
+_INTERNAL_ERROR = -32603
+_REQUEST_CANCELLED = -32800
+
+# Documents are sent as a whole on one line
+_MAX_MESSAGE_SIZE = 256 * 1024 * 1024
+
+_DEFAULT_MAX_N_DOCUMENTS = 64
+
+_T = _tp.TypeVar("_T")
+
+_RequestId = int | str
+_ReadLine = _tp.Callable[[], _tp.Awaitable[bytes]]
+_WriteLine = _tp.Callable[[bytes], _tp.Awaitable[None]]
+_IsCancelled = _tp.Callable[[], bool]
+
+
+class RequestError(Exception):
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+@_dc.dataclass
+class _Document:
+    version: int
+    text: str
+    _lock: _th.Lock = _dc.field(default_factory=_th.Lock)
+    _deck_index: _pdeck.DeckIndex | None = None
+    _summary: dict[str, _tp.Any] | None = None
+
+    def get_deck_index(self) -> _pdeck.DeckIndex:
+        with self._lock:
+            if self._deck_index is None:
+                self._deck_index = _pdeck.index_deck(self.text)
+            return self._deck_index
+
+    def get_summary(self, is_cancelled: _IsCancelled) -> dict[str, _tp.Any]:
+        deck_index = self.get_deck_index()
+        with self._lock:
+            if self._summary is None:
+                self._summary = _cli.summarize_blocks(_check_cancelled(deck_index.parse_blocks(), is_cancelled))
+            return self._summary
+
+
+def _check_cancelled(items: _tp.Iterable[_T], is_cancelled: _IsCancelled) -> _tp.Iterator[_T]:
+    # Cancelling a request only cancels waiting for its result: stops the work itself before each
+    # item, which e.g. parses the next block of a deck
+    iterator = iter(items)
+    while not is_cancelled():
+        try:
+            yield next(iterator)
+        except StopIteration:
+            return
+    raise RequestError(_REQUEST_CANCELLED, "Request cancelled.")
+
+
+@_dc.dataclass
+class _PendingRequest:
+    uri: str | None
+    version: int | None
+    task: "_aio.Task[_tp.Any]"
+    cancel_event: _th.Event
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+        self.task.cancel()
+
+
+class Server:
+    def __init__(self, executor: _cf.Executor | None = None, max_n_documents: int = _DEFAULT_MAX_N_DOCUMENTS) -> None:
+        # Parsing runs in the executor, so that the server keeps reading requests, e.g. cancellations.
+        # `None` is the event loop's default executor.
+        self._executor = executor
+        self._max_n_documents = max_n_documents
+        # Least recently used first
+        self._documents: dict[str, _Document] = {}
+        self._pending_requests: dict[_RequestId, _PendingRequest] = {}
+        self.is_shut_down = False
+
+    async def serve(self, read_line: _ReadLine, write_line: _WriteLine) -> None:
+        # Until the end of the input or a shutdown request. Responses are written as requests complete.
+        response_tasks: set["_aio.Task[None]"] = set()
+        while not self.is_shut_down and (line := await read_line()):
+            if (response := self._handle_line(line)) is None:
+                continue
+
+            response_task = _aio.create_task(_write_response(response, write_line))
+            response_tasks.add(response_task)
+            response_task.add_done_callback(response_tasks.discard)
+
+        await _aio.gather(*response_tasks)
+
+    def _handle_line(self, line: bytes) -> _tp.Awaitable[dict[str, _tp.Any]] | None:
+        try:
+            message = _json.loads(line)
+        except ValueError:
+            return _completed(_create_error_response(None, _PARSE_ERROR, "Invalid JSON."))
+
+        if not isinstance(message, dict) or not isinstance(method := message.get("method"), str):
+            request_id = message.get("id") if isinstance(message, dict) else None
+            request_id = request_id if _is_request_id(request_id) else None
+            return _completed(_create_error_response(request_id, _INVALID_REQUEST, "Expected a request."))
+
+        params = message.get("params", {})
+        if "id" not in message:
+            self._handle_notification(method, params)
+            return None
+
+        request_id = message["id"]
+        if not _is_request_id(request_id):
+            return _completed(_create_error_response(None, _INVALID_REQUEST, "Expected a string or integer id."))
+
+        cancel_event = _th.Event()
+        try:
+            call = self._prepare_call(method, params, cancel_event.is_set)
+        except RequestError as error:
+            return _completed(_create_error_response(request_id, error.code, str(error)))
+
+        task = _aio.create_task(self._call(call))
+        self._add_pending_request(request_id, params, task, cancel_event)
+        return self._get_response(request_id, task)
+
+    def _handle_notification(self, method: str, params: _tp.Any) -> None:
+        # Unknown notifications are ignored, as JSON-RPC doesn't allow responding to them
+        if method == "$/cancelRequest" and isinstance(params, dict):
+            if _is_request_id(request_id := params.get("id")) and request_id in self._pending_requests:
+                self._pending_requests[request_id].cancel()
+
+        if method == "close" and isinstance(params, dict) and isinstance(uri := params.get("uri"), str):
+            self._documents.pop(uri, None)
+
+    def _add_pending_request(
+        self, request_id: _RequestId, params: _tp.Any, task: "_aio.Task[_tp.Any]", cancel_event: _th.Event
+    ) -> None:
+        uri = params.get("uri") if isinstance(params, dict) else None
+        version = params.get("version") if isinstance(params, dict) else None
+        if isinstance(uri, str) and isinstance(version, int):
+            for pending_request in self._pending_requests.values():
+                if pending_request.uri == uri and _is_older(pending_request.version, version):
+                    pending_request.cancel()
+
+        self._pending_requests[request_id] = _PendingRequest(uri, version, task, cancel_event)
+
+    async def _get_response(self, request_id: _RequestId, task: "_aio.Task[_tp.Any]") -> dict[str, _tp.Any]:
+        try:
+            result = await task
+        except _aio.CancelledError:
+            if not task.cancelled():
+                raise
+            return _create_error_response(request_id, _REQUEST_CANCELLED, "Request cancelled.")
+        except RequestError as error:
+            return _create_error_response(request_id, error.code, str(error))
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            return _create_error_response(request_id, _INTERNAL_ERROR, f"{type(error).__name__}: {error}")
+        finally:
+            if (pending_request := self._pending_requests.get(request_id)) and pending_request.task is task:
+                del self._pending_requests[request_id]
+
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def _prepare_call(self, method: str, params: _tp.Any, is_cancelled: _IsCancelled) -> _tp.Callable[[], _tp.Any]:
+        # Documents are stored right away, so that cancelling a request doesn't lose the text it sent
+        if method == "shutdown":
+            self.is_shut_down = True
+            return lambda: None
+
+        handler = _HANDLERS.get(method)
+        if not handler:
+            raise RequestError(_METHOD_NOT_FOUND, f"Unknown method: {method}.")
+        if not isinstance(params, dict):
+            raise RequestError(_INVALID_PARAMS, "Expected named parameters.")
+
+        return _ft.partial(handler, self._get_document(params), params, is_cancelled)
+
+    async def _call(self, call: _tp.Callable[[], _tp.Any]) -> _tp.Any:
+        return await _aio.get_running_loop().run_in_executor(self._executor, call)
+
+    def _get_document(self, params: dict[str, _tp.Any]) -> _Document:
+        uri, version, text = params.get("uri"), params.get("version"), params.get("text")
+        if not isinstance(uri, str) or not isinstance(version, int) or not isinstance(text, (str, type(None))):
+            raise RequestError(_INVALID_PARAMS, 'Expected a string "uri", an integer "version" and a string "text".')
+
+        document = self._documents.get(uri)
+        if document and document.version > version:
+            raise RequestError(_REQUEST_CANCELLED, "A newer version of the document has been sent.")
+
+        if document and document.version == version:
+            # Most recently used
+            self._documents[uri] = self._documents.pop(uri)
+            return document
+
+        if text is None:
+            raise RequestError(_INVALID_PARAMS, "Unknown document version: send its text.")
+
+        self._documents.pop(uri, None)
+        document = self._documents[uri] = _Document(version, text)
+        while len(self._documents) > self._max_n_documents:
+            del self._documents[next(iter(self._documents))]
+
+        return document
+
+
+def _is_request_id(value: _tp.Any) -> bool:
+    # JSON-RPC also allows null, but no fractions. Booleans are integers in Python.
+    return value is None or isinstance(value, str) or (isinstance(value, int) and not isinstance(value, bool))
+
+
+def _is_older(version: int | None, other_version: int) -> bool:
+    return version is not None and version < other_version
+
+
+async def _completed(response: dict[str, _tp.Any]) -> dict[str, _tp.Any]:
+    return response
+
+
+def _create_error_response(request_id: _tp.Any, code: int, message: str) -> dict[str, _tp.Any]:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+async def _write_response(response: _tp.Awaitable[dict[str, _tp.Any]], write_line: _WriteLine) -> None:
+    await write_line(_json.dumps(await response).encode() + b"\n")
+
+
+def _parse(document: _Document, _params: dict[str, _tp.Any], is_cancelled: _IsCancelled) -> dict[str, _tp.Any]:
+    return document.get_summary(is_cancelled)
+
+
+def _validate(document: _Document, _params: dict[str, _tp.Any], is_cancelled: _IsCancelled) -> dict[str, _tp.Any]:
+    summary = document.get_summary(is_cancelled)
+    return {"success": summary["success"], "errors": summary["errors"]}
+
+
+def _query(document: _Document, params: dict[str, _tp.Any], is_cancelled: _IsCancelled) -> dict[str, _tp.Any]:
+    # The blocks, optionally only those with a keyword, and the definitions of a variable. Only the
+    # equations and constants blocks are parsed and only if definitions are asked for.
+    keyword, variable_name = params.get("keyword"), params.get("variable")
+    if not isinstance(keyword, (str, type(None))) or not isinstance(variable_name, (str, type(None))):
+        raise RequestError(_INVALID_PARAMS, 'Expected a string "keyword" and a string "variable".')
+
+    deck_index = document.get_deck_index()
+    blocks = deck_index.blocks if keyword is None else deck_index.get_blocks(keyword)
+    query_result: dict[str, _tp.Any] = {"blocks": [_dc.asdict(b) for b in blocks]}
+
+    if variable_name is not None:
+        canonical_name = _com.get_canonical_name(variable_name)
+        query_result["definitions"] = [
+            {"keyword": parsed_block.keyword, "start_index": parsed_block.start_index + e.start_index}
+            for b in _check_cancelled(
+                [*deck_index.get_blocks("EQUATIONS"), *deck_index.get_blocks("CONSTANTS")], is_cancelled
+            )
+            if _pcom.is_success((parsed_block := deck_index.parse_block(b)).result)
+            and isinstance(equations := parsed_block.result.value, _meqs.Equations)
+            for e in equations.equations
+            if e.start_index is not None and _com.get_canonical_name(e.variable_name) == canonical_name
+        ]
+
+    return query_result
+
+
+_HANDLERS: _tp.Mapping[str, _tp.Callable[[_Document, dict[str, _tp.Any], _IsCancelled], _tp.Any]] = {
+    "parse": _parse,
+    "validate": _validate,
+    "query": _query,
+}
+
+
+def main(argv: _tp.Sequence[str] | None = None) -> int:
+    arguments = _create_argument_parser().parse_args(argv)
+
+    if arguments.socket is None:
+        _aio.run(_serve_stdio())
+    else:
+        _aio.run(_serve_unix_socket(arguments.socket))
+
+    return 0
+
+
+def _create_argument_parser() -> _ap.ArgumentParser:
+    parser = _ap.ArgumentParser(
+        prog="trnsys-dck-server",
+        description="Serve parse, validate and query requests for TRNSYS deck files as JSON-RPC, one message per line.",
+    )
+    parser.add_argument("--socket", help="path of a Unix socket to listen on (default: standard input and output)")
+    return parser
+
+
+async def _serve_stdio() -> None:
+    # Standard input is read by a thread rather than through the event loop, which doesn't support
+    # pipes on all platforms
+    loop = _aio.get_running_loop()
+    stdin, stdout = _sys.stdin.buffer, _sys.stdout.buffer
+
+    async def read_line() -> bytes:
+        return await loop.run_in_executor(None, stdin.readline, _MAX_MESSAGE_SIZE)
+
+    async def write_line(line: bytes) -> None:
+        stdout.write(line)
+        stdout.flush()
+
+    await Server().serve(read_line, write_line)
+
+
+async def _serve_unix_socket(path: str | _os.PathLike[str]) -> None:
+    # One server for all connections, so that they share documents
+    server = Server()
+    server_closed = _aio.Event()
+
+    async def serve_connection(reader: _aio.StreamReader, writer: _aio.StreamWriter) -> None:
+        async def write_line(line: bytes) -> None:
+            writer.write(line)
+            await writer.drain()
+
+        try:
+            await server.serve(reader.readline, write_line)
+        finally:
+            writer.close()
+            if server.is_shut_down:
+                server_closed.set()
+
+    unix_server = await _aio.start_unix_server(serve_connection, path, limit=_MAX_MESSAGE_SIZE)
+    async with unix_server:
+        await server_closed.wait()
+
+
+if __name__ == "__main__":
+    _sys.exit(main())
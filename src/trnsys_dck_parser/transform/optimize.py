@@ -0,0 +1,274 @@
+import dataclasses as _dc
+import math as _math
+import typing as _tp
+
+import trnsys_dck_parser.common as _com
+import trnsys_dck_parser.evaluate.functions as _efuncs
+import trnsys_dck_parser.evaluate.graph as _egraph
+import trnsys_dck_parser.evaluate.interpret as _einterp
+import trnsys_dck_parser.model.compact as _mcomp
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.expression as _mexpr
+import trnsys_dck_parser.model.traverse as _mtrav
+
+_EquationsT = _tp.TypeVar("_EquationsT", bound=_meqs.Equations)
+
+
+@_dc.dataclass(frozen=True)
+class Options:
+    fold_constants: bool = True
+    simplify: bool = True
+    inline_literals: bool = True
+    eliminate_common_subexpressions: bool = True
+    # Variables introduced for common subexpressions are named by this prefix and a number
+    temporary_name_prefix: str = "cse"
+    # Names the temporaries mustn't take in addition to the variables of the block, e.g. the
+    # variables defined by the other blocks of the deck
+    reserved_names: frozenset[str] = frozenset()
+
+
+def optimize_equations(equations: _EquationsT, options: Options | None = None) -> _EquationsT:
+    # All rewrites keep the values of the equations: they compare equal to the values of the original
+    # equations for all inputs. In particular, floating point operations aren't reassociated, so
+    # e.g. "a*3600/3600" stays as it is. The equations of the block all stay, also the ones whose
+    # uses were inlined: other blocks may use them.
+    options = Options() if options is None else options
+
+    graph = _egraph.create_dependency_graph(equations)
+
+    rewriter = _Rewriter(options)
+    rhss = [e.rhs for e in graph.equations]
+    for index in graph.evaluation_order:
+        rhss[index] = rhs = rewriter.rewrite(rhss[index])
+        if options.inline_literals and isinstance(rhs, _mexpr.Literal):
+            rewriter.literals_by_variable_name[graph.variable_names[index]] = rhs
+
+    if options.eliminate_common_subexpressions:
+        optimized_equations = _eliminate_common_subexpressions(graph, rhss, options)
+    else:
+        optimized_equations = _replace_rhss(graph.equations, rhss)
+
+    return _dc.replace(equations, n_equations=len(optimized_equations), equations=optimized_equations)
+
+
+def optimize_expression(expression: _mexpr.Expression, options: Options | None = None) -> _mexpr.Expression:
+    # Folds constants and simplifies, see `optimize_equations`
+    return _Rewriter(Options() if options is None else options).rewrite(expression)
+
+
+def _map_bottom_up(
+    expression: _mexpr.Expression,
+    rewrite: _tp.Callable[[_mexpr.Expression, _mexpr.Expression], _mexpr.Expression],
+    results: dict[int, _mexpr.Expression],
+) -> _mexpr.Expression:
+    # Iterative post-order traversal: expressions can nest deeper than the recursion limit. `rewrite`
+    # is called with each subtree and the subtree with its children rewritten. Subtrees occurring
+    # several times as the same object are rewritten once, `results` memoizes by node identity: the
+    # caller keeps the nodes alive.
+    stack: list[tuple[_mexpr.Expression, bool]] = [(expression, False)]
+    while stack:
+        node, are_children_done = stack.pop()
+        if id(node) in results:
+            continue
+
+        children = _mtrav.get_children(node)
+        if are_children_done or not children:
+            results[id(node)] = rewrite(node, _mtrav.with_children(node, [results[id(c)] for c in children]))
+        else:
+            stack.append((node, True))
+            stack.extend((c, False) for c in children)
+
+    return results[id(expression)]
+
+
+class _Rewriter:
+    def __init__(self, options: Options) -> None:
+        self._options = options
+        # By canonical variable name
+        self.literals_by_variable_name: dict[str, _mexpr.Literal] = {}
+        self._results: dict[int, _mexpr.Expression] = {}
+        # Keeps the nodes `_results` is keyed by alive, e.g. of materialized views
+        self._expressions: list[_mexpr.Expression] = []
+
+    def rewrite(self, expression: _mexpr.Expression) -> _mexpr.Expression:
+        expression = _mcomp.materialize(expression)
+        self._expressions.append(expression)
+        return _map_bottom_up(expression, self._rewrite_node, self._results)
+
+    def _rewrite_node(self, _: _mexpr.Expression, expression: _mexpr.Expression) -> _mexpr.Expression:
+        if isinstance(expression, _mexpr.Variable):
+            return self.literals_by_variable_name.get(_com.get_canonical_name(expression.name), expression)
+
+        if self._options.fold_constants and (literal := _fold(expression)):
+            return literal
+
+        if self._options.simplify:
+            return _simplify(expression)
+
+        return expression
+
+
+def _fold(expression: _mexpr.Expression) -> _mexpr.Literal | None:
+    children = _mtrav.get_children(expression)
+    if not children or not all(isinstance(c, _mexpr.Literal) for c in children):
+        return None
+
+    if isinstance(expression, _mexpr.FunctionCall) and (
+        _com.get_canonical_name(expression.function) not in _efuncs.FUNCTIONS
+    ):
+        return None
+
+    try:
+        value = _einterp.evaluate_expression(expression, {}, {})
+    except (ArithmeticError, ValueError, TypeError):
+        # E.g. division by zero or a wrong number of arguments: leave the error to the simulation
+        return None
+
+    if not _math.isfinite(value):
+        return None
+
+    return _mexpr.Literal(value)
+
+
+def _simplify(expression: _mexpr.Expression) -> _mexpr.Expression:
+    # Only identities which hold for all values, including infinities and NaNs, up to the sign of zero
+    if isinstance(expression, _mexpr.Negation) and isinstance(expression.x, _mexpr.Negation):
+        return expression.x.x
+
+    if isinstance(expression, _mexpr.BinaryExpression) and (
+        simplify_binary_expression := _BINARY_EXPRESSION_SIMPLIFICATIONS.get(type(expression))
+    ):
+        return simplify_binary_expression(expression.x, expression.y) or expression
+
+    return expression
+
+
+def _simplify_addition(x: _mexpr.Expression, y: _mexpr.Expression) -> _mexpr.Expression | None:
+    if _is_literal(y, 0):
+        return x
+    if _is_literal(x, 0):
+        return y
+    return None
+
+
+def _simplify_subtraction(x: _mexpr.Expression, y: _mexpr.Expression) -> _mexpr.Expression | None:
+    if _is_literal(y, 0):
+        return x
+    if _is_literal(x, 0):
+        return _simplify(_mexpr.Negation(y))
+    return None
+
+
+def _simplify_multiplication(x: _mexpr.Expression, y: _mexpr.Expression) -> _mexpr.Expression | None:
+    if _is_literal(x, 1) or _is_literal(x, -1):
+        x, y = y, x
+    if _is_literal(y, 1):
+        return x
+    if _is_literal(y, -1):
+        return _simplify(_mexpr.Negation(x))
+    return None
+
+
+def _simplify_division_or_power(x: _mexpr.Expression, y: _mexpr.Expression) -> _mexpr.Expression | None:
+    return x if _is_literal(y, 1) else None
+
+
+_BINARY_EXPRESSION_SIMPLIFICATIONS: _tp.Mapping[
+    type[_mexpr.BinaryExpression], _tp.Callable[[_mexpr.Expression, _mexpr.Expression], _mexpr.Expression | None]
+] = {
+    _mexpr.Addition: _simplify_addition,
+    _mexpr.Subtraction: _simplify_subtraction,
+    _mexpr.Multiplication: _simplify_multiplication,
+    _mexpr.Division: _simplify_division_or_power,
+    _mexpr.Power: _simplify_division_or_power,
+}
+
+
+def _is_literal(expression: _mexpr.Expression, value: _mexpr.Number) -> bool:
+    return isinstance(expression, _mexpr.Literal) and expression.value == value
+
+
+def _is_trivial(expression: _mexpr.Expression) -> bool:
+    # Not worth a temporary
+    if isinstance(expression, _mexpr.Negation):
+        expression = expression.x
+    return not _mtrav.get_children(expression)
+
+
+def _eliminate_common_subexpressions(
+    graph: _egraph.DependencyGraph, rhss: _tp.Sequence[_mexpr.Expression], options: Options
+) -> list[_meqs.Equation]:
+    shared_nodes = _get_shared_nodes(rhss)
+    if not shared_nodes:
+        return _replace_rhss(graph.equations, rhss)
+
+    # Shared right-hand sides are referred to by the first equation's variable
+    names: dict[_mexpr.Expression, str] = {}
+    for equation, rhs in zip(graph.equations, rhss):
+        if rhs in shared_nodes:
+            names.setdefault(rhs, equation.variable_name)
+
+    temporary_names = _iter_temporary_names(graph, options)
+    temporary_nodes: list[_mexpr.Expression] = []
+
+    def substitute(node: _mexpr.Expression, substituted_node: _mexpr.Expression) -> _mexpr.Expression:
+        if node not in shared_nodes:
+            return substituted_node
+        if node not in names:
+            names[node] = next(temporary_names)
+            temporary_nodes.append(node)
+        return _mexpr.Variable(names[node])
+
+    # Maps subtrees to themselves with their shared subtrees replaced by variables. Temporaries are
+    # numbered in the order they're first used, the subtrees of a temporary before the temporary.
+    results: dict[int, _mexpr.Expression] = {}
+    substituted_rhss = [_map_bottom_up(r, substitute, results) for r in rhss]
+
+    def substitute_children(node: _mexpr.Expression) -> _mexpr.Expression:
+        return _mtrav.with_children(node, [results[id(c)] for c in _mtrav.get_children(node)])
+
+    # The order of the equations doesn't matter to TRNSYS
+    optimized_equations = [_meqs.Equation(names[n], substitute_children(n)) for n in temporary_nodes]
+    for equation, rhs, substituted_rhs in zip(graph.equations, rhss, substituted_rhss):
+        # The equation naming its right-hand side keeps it
+        if names.get(rhs) == equation.variable_name:
+            substituted_rhs = substitute_children(rhs)
+        optimized_equations.append(_replace_rhs(equation, substituted_rhs))
+
+    return optimized_equations
+
+
+def _get_shared_nodes(rhss: _tp.Iterable[_mexpr.Expression]) -> set[_mexpr.Expression]:
+    # A subtree is shared if it's referenced more than once after sharing all subtrees referenced
+    # more than once: the subtrees of a shared subtree only count once.
+    reference_counts: dict[_mexpr.Expression, int] = {}
+    for rhs in rhss:
+        stack = [rhs]
+        while stack:
+            node = stack.pop()
+            reference_count = reference_counts[node] = reference_counts.get(node, 0) + 1
+            if reference_count == 1:
+                stack.extend(_mtrav.get_children(node))
+
+    return {n for n, c in reference_counts.items() if c > 1 and not _is_trivial(n)}
+
+
+def _iter_temporary_names(graph: _egraph.DependencyGraph, options: Options) -> _tp.Iterator[str]:
+    used_names = {*graph.variable_names, *map(_com.get_canonical_name, options.reserved_names)}
+    number = 1
+    while True:
+        name = f"{options.temporary_name_prefix}{number}"
+        if _com.get_canonical_name(name) not in used_names:
+            yield name
+        number += 1
+
+
+def _replace_rhss(
+    equations: _tp.Sequence[_meqs.Equation], rhss: _tp.Sequence[_mexpr.Expression]
+) -> list[_meqs.Equation]:
+    return [_replace_rhs(e, r) for e, r in zip(equations, rhss)]
+
+
+def _replace_rhs(equation: _meqs.Equation, rhs: _mexpr.Expression) -> _meqs.Equation:
+    # Rewritten equations weren't parsed from anywhere, so they don't have offsets
+    return equation if rhs is equation.rhs else _meqs.Equation(equation.variable_name, rhs)
@@ -0,0 +1,141 @@
+import io as _io
+import re as _re
+import typing as _tp
+
+import trnsys_dck_parser.common as _com
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.deck as _pdeck
+import trnsys_dck_parser.write.expression as _wexpr
+
+_HEADER_PATTERN = _re.compile(r"(?:EQUATIONS|CONSTANTS)[ \t]+([0-9]+)", _re.RegexFlag.IGNORECASE)
+
+
+def format_equations(equations: _meqs.Equations, original_block: _pdeck.ParsedBlock | None = None) -> str:
+    file = _io.StringIO()
+    write_equations(equations, file, original_block)
+    return file.getvalue()
+
+
+def write_equations(
+    equations: _meqs.Equations, file: _tp.TextIO, original_block: _pdeck.ParsedBlock | None = None
+) -> None:
+    # Given the block the equations were parsed from, its comments and spacing are kept: equations
+    # still in the block keep the comment lines in front of them and the comment at the end of their
+    # line, unchanged ones also their text. The others are written as by `format_equation`.
+    if original_block is None:
+        parts = _iter_parts(equations)
+    else:
+        parts = _iter_parts_keeping_layout(equations, original_block)
+
+    _wexpr.write_parts(parts, file)
+
+
+def format_equation(equation: _meqs.Equation) -> str:
+    return "".join(_iter_equation_parts(equation))
+
+
+def _get_keyword(equations: _meqs.Equations) -> str:
+    return "CONSTANTS" if isinstance(equations, _meqs.Constants) else "EQUATIONS"
+
+
+def _iter_parts(equations: _meqs.Equations) -> _tp.Iterator[str]:
+    yield f"{_get_keyword(equations)} {len(equations.equations)}\n"
+    for equation in equations.equations:
+        yield from _iter_equation_parts(equation)
+        yield "\n"
+
+
+def _iter_equation_parts(equation: _meqs.Equation) -> _tp.Iterator[str]:
+    yield equation.variable_name
+    yield " = "
+    yield from _wexpr.iter_expression_parts(equation.rhs)
+
+
+def _iter_parts_keeping_layout(equations: _meqs.Equations, original_block: _pdeck.ParsedBlock) -> _tp.Iterator[str]:
+    input_string = original_block.input_string
+    original_equations = _get_original_equations(original_block)
+
+    header_match = _HEADER_PATTERN.match(input_string, _pcom.skip_ignored(input_string, 0))
+    if not header_match:
+        raise ValueError("The original block must start with an EQUATIONS or CONSTANTS header.")
+
+    # The input is split into the header line, one segment per equation and the rest of the block. An
+    # equation's segment runs from the end of the previous segment up to the end of the equation's line.
+    segment_ends = [min(_get_line_end(input_string, header_match.end()), original_equations[0].start_index or 0)]
+    for equation, next_equation in zip(original_equations, [*original_equations[1:], None]):
+        segment_end = _get_line_end(input_string, _tp.cast(int, equation.end_index))
+        if next_equation:
+            segment_end = min(segment_end, _tp.cast(int, next_equation.start_index))
+        segment_ends.append(segment_end)
+
+    yield input_string[: header_match.start(1)]
+    yield str(len(equations.equations))
+    yield input_string[header_match.end(1) : segment_ends[0]]
+
+    segments_by_name = {
+        _com.get_canonical_name(e.variable_name): (e, s, t)
+        for e, s, t in zip(original_equations, segment_ends, segment_ends[1:])
+    }
+    # Where the input written last ends, if it was copied: input continuing it needn't start a new line
+    copied_end_index: int | None = segment_ends[0]
+    for equation in equations.equations:
+        segment = segments_by_name.get(_com.get_canonical_name(equation.variable_name))
+        if segment:
+            yield from _iter_new_line_parts(input_string, copied_end_index, segment[1])
+            yield from _iter_segment_parts(equation, input_string, *segment)
+            copied_end_index = segment[2]
+        else:
+            yield from _iter_new_line_parts(input_string, copied_end_index, None)
+            yield from _iter_equation_parts(equation)
+            yield "\n"
+            copied_end_index = None
+
+    if segment_ends[-1] < len(input_string):
+        yield from _iter_new_line_parts(input_string, copied_end_index, segment_ends[-1])
+        yield input_string[segment_ends[-1] :]
+
+
+def _iter_new_line_parts(input_string: str, copied_end_index: int | None, start_index: int | None) -> _tp.Iterator[str]:
+    if (
+        copied_end_index is not None
+        and copied_end_index != start_index
+        and not input_string.endswith("\n", 0, copied_end_index)
+    ):
+        yield "\n"
+
+
+def _get_original_equations(original_block: _pdeck.ParsedBlock) -> _tp.Sequence[_meqs.Equation]:
+    result = original_block.result
+    if not _pcom.is_success(result) or not isinstance(result.value, _meqs.Equations):
+        raise ValueError("The original block must be a successfully parsed equations block.")
+
+    original_equations = result.value.equations
+    if any(e.start_index is None or e.end_index is None for e in original_equations):
+        raise ValueError("The original equations must have been parsed from the original block's input.")
+
+    return original_equations
+
+
+def _iter_segment_parts(
+    equation: _meqs.Equation,
+    input_string: str,
+    original_equation: _meqs.Equation,
+    segment_start_index: int,
+    segment_end_index: int,
+) -> _tp.Iterator[str]:
+    start_index = _tp.cast(int, original_equation.start_index)
+    end_index = _tp.cast(int, original_equation.end_index)
+
+    yield input_string[segment_start_index:start_index]
+    if equation.variable_name == original_equation.variable_name and equation.rhs == original_equation.rhs:
+        yield input_string[start_index:end_index]
+    else:
+        yield from _iter_equation_parts(equation)
+    yield input_string[end_index:segment_end_index]
+
+
+def _get_line_end(input_string: str, index: int) -> int:
+    # Index after the end of the line containing `index`, including its newline
+    line_end = input_string.find("\n", index)
+    return len(input_string) if line_end == -1 else line_end + 1
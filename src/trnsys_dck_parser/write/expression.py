@@ -0,0 +1,137 @@
+import itertools as _it
+import math as _math
+import typing as _tp
+
+import trnsys_dck_parser.model.compact as _mcomp
+import trnsys_dck_parser.model.expression as _mexpr
+import trnsys_dck_parser.model.traverse as _mtrav
+
+# Operator and precedence of the binary expressions. The operands of powers are atoms: powers
+# don't associate and bind tighter than anything else. Nodes are dispatched on their exact type.
+_BINARY_OPERATORS: _tp.Mapping[type[_mexpr.Expression], tuple[str, int]] = {
+    _mexpr.Addition: ("+", 1),
+    _mexpr.Subtraction: ("-", 1),
+    _mexpr.Multiplication: ("*", 2),
+    _mexpr.Division: ("/", 2),
+    _mexpr.Power: ("**", 3),
+}
+_ATOM_PRECEDENCE = 4
+
+# Number of parts joined into one string per write
+_WRITE_CHUNK_SIZE = 4096
+
+
+def format_expression(expression: _mexpr.Expression) -> str:
+    # Writes the expression in deck syntax such that parsing it gives back an equal expression.
+    # Parentheses are only added where the parser needs them.
+    return "".join(iter_expression_parts(expression))
+
+
+def write_expression(expression: _mexpr.Expression, file: _tp.TextIO) -> None:
+    write_parts(iter_expression_parts(expression), file)
+
+
+def write_parts(parts: _tp.Iterable[str], file: _tp.TextIO) -> None:
+    # One write per chunk of parts: much faster than one per part, without joining everything first
+    parts_iterator = iter(parts)
+    while chunk := "".join(_it.islice(parts_iterator, _WRITE_CHUNK_SIZE)):
+        file.write(chunk)
+
+
+def format_number(value: _mexpr.Number) -> str:
+    if isinstance(value, int):
+        return str(value)
+
+    if not _math.isfinite(value):
+        raise ValueError(f"Can't write non-finite number: {value}.")
+
+    # The lexer requires a decimal point and doesn't accept a "+" in the exponent
+    mantissa, exponent_separator, exponent = repr(value).partition("e")
+    if exponent_separator:
+        if "." not in mantissa:
+            mantissa += ".0"
+        return f"{mantissa}e{int(exponent)}"
+
+    return mantissa
+
+
+def iter_expression_parts(expression: _mexpr.Expression) -> _tp.Iterator[str]:
+    # Iterative: deck expressions can nest deeper than the recursion limit. The stack holds
+    # expressions still to be written, together with the precedence they need to have to not be
+    # parenthesized, and strings to be written as is. Views are read through their node types and
+    # children, and only their leaves are materialized.
+    parts: list[str] = []
+    stack: list[tuple[_mexpr.Expression, int] | str] = [(expression, 0)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            yield item
+            continue
+
+        expression, minimum_precedence = item
+        node_type = _mcomp.get_node_type(expression)
+        if _get_precedence(node_type) < minimum_precedence:
+            yield "("
+            stack.append(")")
+
+        _push_parts(expression, node_type, parts, stack)
+        yield from parts
+        parts.clear()
+
+
+def _push_parts(
+    expression: _mexpr.Expression,
+    node_type: type[_mexpr.Expression],
+    parts: list[str],
+    stack: list[tuple[_mexpr.Expression, int] | str],
+) -> None:
+    if node_type is _mexpr.Negation:
+        (x,) = _mtrav.get_children(expression)
+        # "-3*a" and "-2**2" would be lexed as starting with the number -3 or -2
+        parts.append("- " if _starts_with_number(x) else "-")
+        stack.append((x, 0))
+    elif node_type in _BINARY_OPERATORS:
+        x, y = _mtrav.get_children(expression)
+        operator, precedence = _BINARY_OPERATORS[node_type]
+        if node_type is _mexpr.Power:
+            x_precedence = y_precedence = _ATOM_PRECEDENCE
+        else:
+            # Left-associative
+            x_precedence, y_precedence = precedence, precedence + 1
+        stack.extend([(y, y_precedence), f" {operator} ", (x, x_precedence)])
+    elif node_type is _mexpr.FunctionCall:
+        parts.append(f"{_mcomp.get_function(expression)}(")
+        stack.append(")")
+        for i, argument in enumerate(reversed(_mtrav.get_children(expression))):
+            if i:
+                stack.append(", ")
+            stack.append((argument, 0))
+    else:
+        parts.append(_format_leaf(_mcomp.materialize(expression)))
+
+
+def _format_leaf(expression: _mexpr.Expression) -> str:
+    if isinstance(expression, _mexpr.Literal):
+        return format_number(expression.value)
+    if isinstance(expression, _mexpr.Variable):
+        return expression.name
+    if isinstance(expression, _mexpr.UnitOutput):
+        return f"[{expression.unit_number},{expression.output_number}]"
+    raise ValueError(f"Unknown expression type: {type(expression).__name__}.")  # pragma: no cover
+
+
+def _get_precedence(node_type: type[_mexpr.Expression]) -> int:
+    if binary_operator := _BINARY_OPERATORS.get(node_type):
+        return binary_operator[1]
+
+    if node_type is _mexpr.Negation:
+        # A unary minus applies to the whole rest of the expression: "(-a) + b" needs its parentheses
+        return 0
+
+    return _ATOM_PRECEDENCE
+
+
+def _starts_with_number(expression: _mexpr.Expression) -> bool:
+    while (node_type := _mcomp.get_node_type(expression)) in _BINARY_OPERATORS:
+        expression = _mtrav.get_children(expression)[0]
+    return node_type is _mexpr.Literal
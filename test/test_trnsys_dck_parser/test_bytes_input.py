@@ -0,0 +1,72 @@
+import mmap as _mmap
+import pathlib as _pl
+import typing as _tp
+
+import pytest as _pt
+
+import trnsys_dck_parser.build as _build
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.equations as _peqs
+
+_EQUATIONS = """\
+EQUATIONS 3		! 16
+PflowAuxSH_W = ((MfrAuxOut/3600)/RhoWat)*dpAuxSH_bar*100000					! required power, W
+etaPuAuxSh = 0.35															! Assumption
+PelPuAuxBri_kW = GT(MfrEvapIn,0.1)*PelPuAuxBrine_kW*[12,3]**-2				! naming could be better
+"""
+
+_BUFFER_TYPES: _tp.Sequence[_tp.Callable[[bytes], _pcom.Input]] = [bytes, bytearray, memoryview]
+
+
+@_pt.mark.parametrize("buffer_type", _BUFFER_TYPES, ids=lambda t: t.__name__)
+def test_equations_from_buffer(buffer_type: _tp.Callable[[bytes], _pcom.Input]) -> None:
+    expected_result = _pcom.success(_peqs.parse_equations(_EQUATIONS))
+
+    actual_result = _pcom.success(_peqs.parse_equations(buffer_type(_EQUATIONS.encode())))
+
+    assert actual_result == expected_result
+
+
+def test_equations_from_mmap(tmp_path: _pl.Path) -> None:
+    deck_path = tmp_path / "deck.dck"
+    deck_path.write_text(_EQUATIONS)
+    expected_result = _pcom.success(_peqs.parse_equations(_EQUATIONS))
+
+    with open(deck_path, "rb") as file, _mmap.mmap(file.fileno(), 0, access=_mmap.ACCESS_READ) as buffer:
+        actual_result = _pcom.success(_peqs.parse_equations(buffer))
+
+    assert actual_result == expected_result
+
+
+@_pt.mark.parametrize("buffer_type", _BUFFER_TYPES, ids=lambda t: t.__name__)
+def test_expression_error_from_buffer(buffer_type: _tp.Callable[[bytes], _pcom.Input]) -> None:
+    input_string = buffer_type("(1+COS(C_tilt))*0.5*tSky + (1-]COS(C_tilt))".encode())
+
+    parse_error = _pcom.error(_build.parse_expression(input_string))
+
+    assert parse_error.error_start == 30
+    assert parse_error.error_string == "]COS(C_tilt))"
+    assert parse_error.error_message == (
+        "Expected number, variable, function call, opening square bracket or opening parenthesis "
+        'but found closing square bracket ("]")'
+    )
+
+
+def test_error_string_of_non_ascii_buffer() -> None:
+    input_string = "x ! Käse\n§".encode()
+
+    parse_error = _pcom.error(_build.parse_expression(input_string))
+
+    assert parse_error.error_message == "Not a recognized token."
+    assert parse_error.error_start == len("x ! Käse\n".encode())
+    assert parse_error.error_string == "§"
+
+
+@_pt.mark.benchmark(group="bytes-input")
+@_pt.mark.parametrize("input_type", [str, bytes], ids=lambda t: t.__name__)
+def test_bytes_input_benchmark(input_type: type, benchmark) -> None:
+    input_string = _EQUATIONS if input_type is str else _EQUATIONS.encode()
+
+    result = benchmark(_peqs.parse_equations, input_string)
+
+    assert _pcom.is_success(result)
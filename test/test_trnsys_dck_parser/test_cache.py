@@ -0,0 +1,180 @@
+import concurrent.futures as _cf
+import mmap as _mmap
+import os as _os
+import pathlib as _pl
+
+import pytest as _pt
+
+import trnsys_dck_parser.parse.cache as _pcache
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.deck as _pdeck
+import trnsys_dck_parser.parse.equations as _peqs
+
+_EQUATIONS_STRING = """\
+EQUATIONS 2
+qAux = MfrAuxOut/3600*RhoWat*CpWat*(tOut - tIn)
+qAuxKw = qAux/3600
+"""
+
+_DECK_STRING = f"""\
+VERSION 18
+{_EQUATIONS_STRING}\
+UNIT 2 TYPE 1 Solar collector
+PARAMETERS 2
+1 2.5
+END
+"""
+
+
+def _create_equations_string(index: int) -> str:
+    return f"EQUATIONS 1\nq{index} = {' + '.join(f'x{i}*{index}' for i in range(20))}\n"
+
+
+def _create_deck_string(n_blocks: int) -> str:
+    return "".join(_create_equations_string(i) for i in range(n_blocks))
+
+
+def _parse_equations_in_process(directory: _pl.Path, index: int) -> bool:
+    cache = _pcache.ParseCache(directory)
+    result = cache.parse_equations(_create_equations_string(index % 4))
+    return _pcom.is_success(result) and result.value.equations[0].variable_name == f"q{index % 4}"
+
+
+def test_hits_and_misses(tmp_path: _pl.Path) -> None:
+    cache = _pcache.ParseCache(tmp_path)
+
+    cold_result = cache.parse_equations(_EQUATIONS_STRING)
+    warm_result = cache.parse_equations(_EQUATIONS_STRING)
+
+    assert warm_result == cold_result
+    assert cache.statistics == _pcache.CacheStatistics(hits=1, misses=1, evictions=0)
+
+    cache.parse_constants(_EQUATIONS_STRING.replace("EQUATIONS", "CONSTANTS"))
+    cache.parse_equations(_EQUATIONS_STRING.replace("3600", "3600.0"))
+    assert cache.statistics.misses == 3
+
+    assert _pcache.ParseCache(tmp_path).parse_equations(_EQUATIONS_STRING) == cold_result
+
+
+def test_warm_runs_skip_parsing(tmp_path: _pl.Path, monkeypatch: _pt.MonkeyPatch) -> None:
+    cold_results = _pcache.ParseCache(tmp_path).parse_deck(_DECK_STRING)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Parser must not be called.")
+
+    monkeypatch.setattr(_peqs.Parser, "parse", fail)
+    monkeypatch.setattr(_pcom.Lexer, "get_next_token", fail)
+
+    warm_results = _pcache.ParseCache(tmp_path).parse_deck(_DECK_STRING)
+
+    assert [b.keyword for b in warm_results] == ["VERSION", "EQUATIONS", "UNIT", "END"]
+    assert warm_results == cold_results
+
+
+def test_parser_version_is_part_of_key(tmp_path: _pl.Path) -> None:
+    _pcache.ParseCache(tmp_path, parser_version="1").parse_equations(_EQUATIONS_STRING)
+
+    cache = _pcache.ParseCache(tmp_path, parser_version="2")
+    cache.parse_equations(_EQUATIONS_STRING)
+
+    assert cache.statistics.misses == 1
+    assert len(_pcache.get_parser_version()) == 16
+
+
+def test_errors_and_buffers(tmp_path: _pl.Path) -> None:
+    input_string = b"EQUATIONS 1\na = \n"
+    file_path = tmp_path / "equations.dck"
+    file_path.write_bytes(input_string)
+
+    cache = _pcache.ParseCache(tmp_path / "cache")
+    with open(file_path, "rb") as file, _mmap.mmap(file.fileno(), 0, access=_mmap.ACCESS_READ) as mapped_file:
+        cold_result = cache.parse_equations(mapped_file)
+        assert isinstance(cold_result, _pcom.ParseError)
+        cold_error_string = cold_result.error_string
+
+    warm_result = cache.parse_equations(input_string)
+
+    assert isinstance(warm_result, _pcom.ParseError)
+    assert warm_result.error_string == cold_error_string
+    assert cache.statistics.hits == 1
+
+
+def test_corrupt_entries_are_reparsed(tmp_path: _pl.Path) -> None:
+    cache = _pcache.ParseCache(tmp_path)
+    expected_result = cache.parse_equations(_EQUATIONS_STRING)
+
+    (entry_path,) = tmp_path.glob("*/*")
+    entry_path.write_bytes(entry_path.read_bytes()[:10])
+
+    assert cache.parse_equations(_EQUATIONS_STRING) == expected_result
+    assert cache.statistics.misses == 2
+    assert cache.parse_equations(_EQUATIONS_STRING) == expected_result
+    assert cache.statistics.hits == 1
+
+
+def test_long_expressions(tmp_path: _pl.Path) -> None:
+    # Deeper than the recursion limit
+    input_string = "EQUATIONS 2\na = b" + "+1" * 20_000 + "\nc = a*2\n"
+    cache = _pcache.ParseCache(tmp_path)
+
+    cold_result = cache.parse_equations(input_string)
+    warm_result = cache.parse_equations(input_string)
+
+    assert cache.statistics.hits == 1
+    assert warm_result == cold_result
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path: _pl.Path) -> None:
+    cache = _pcache.ParseCache(tmp_path)
+    cache.parse_equations(_create_equations_string(0))
+    (entry_path,) = tmp_path.glob("*/*")
+    entry_size = entry_path.stat().st_size
+
+    cache = _pcache.ParseCache(tmp_path, max_size_in_bytes=int(entry_size * 3.5))
+    for index in range(1, 3):
+        cache.parse_equations(_create_equations_string(index))
+    for index, path in enumerate(sorted(tmp_path.glob("*/*"), key=lambda p: p.stat().st_mtime_ns)):
+        _os.utime(path, (index, index))
+
+    # Hit: becomes the most recently used entry
+    cache.parse_equations(_create_equations_string(0))
+    for index in range(3, 5):
+        cache.parse_equations(_create_equations_string(index))
+
+    assert cache.statistics.evictions == 2
+    assert cache.statistics.hits == 1
+
+    # The recently used entry survived the evictions
+    cache.parse_equations(_create_equations_string(0))
+    assert cache.statistics.hits == 2
+
+    cache.clear()
+    assert not list(tmp_path.glob("*/*"))
+
+
+def test_concurrent_processes(tmp_path: _pl.Path) -> None:
+    with _cf.ProcessPoolExecutor(4) as executor:
+        results = list(executor.map(_parse_equations_in_process, [tmp_path] * 32, range(32)))
+
+    assert all(results)
+    assert len(list(tmp_path.glob("*/*"))) == 4
+
+
+@_pt.mark.benchmark(group="parse-cache")
+def test_parse_benchmark(benchmark) -> None:
+    input_string = _create_deck_string(200)
+    blocks = benchmark(lambda: list(_pdeck.parse_deck(input_string)))
+
+    assert all(_pcom.is_success(b.result) for b in blocks)
+
+
+@_pt.mark.benchmark(group="parse-cache")
+def test_warm_cache_benchmark(benchmark, tmp_path: _pl.Path) -> None:
+    input_string = _create_deck_string(200)
+    cache = _pcache.ParseCache(tmp_path)
+    cache.parse_deck(input_string)
+
+    blocks = benchmark(cache.parse_deck, input_string)
+
+    assert all(_pcom.is_success(b.result) for b in blocks)
+    assert cache.statistics.misses == 1
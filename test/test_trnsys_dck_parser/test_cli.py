@@ -0,0 +1,142 @@
+import json as _json
+import pathlib as _pl
+import weakref as _wr
+
+import pytest as _pt
+
+import trnsys_dck_parser.cli as _cli
+import trnsys_dck_parser.parse.deck as _pdeck
+
+_VALID_DECK = """\
+VERSION 18
+EQUATIONS 2
+a = 1
+b = a*2
+UNIT 2 TYPE 1 Solar collector
+PARAMETERS 1
+1
+END
+"""
+
+_INVALID_DECK = """\
+EQUATIONS 1
+a = (1
+"""
+
+
+def _create_decks(directory: _pl.Path, n_decks: int) -> None:
+    for index in range(n_decks):
+        sub_directory = directory / f"study{index % 3}"
+        sub_directory.mkdir(parents=True, exist_ok=True)
+        (sub_directory / f"run{index}.dck").write_text(_VALID_DECK if index != 5 else _INVALID_DECK)
+    (directory / "notes.txt").write_text("not a deck")
+
+
+def _read_results(path: _pl.Path) -> list[dict]:
+    return [_json.loads(line) for line in path.read_text().splitlines()]
+
+
+@_pt.mark.parametrize("n_workers", [1, 2])
+def test_directory(tmp_path: _pl.Path, n_workers: int) -> None:
+    _create_decks(tmp_path / "decks", 8)
+    output_path = tmp_path / "results.jsonl"
+
+    exit_code = _cli.main([str(tmp_path / "decks"), "-j", str(n_workers), "--chunk-size", "3", "-o", str(output_path)])
+
+    assert exit_code == 1
+
+    results = _read_results(output_path)
+    assert len(results) == 8
+    assert [r["path"] for r in results] == sorted(r["path"] for r in results)
+
+    results_by_name = {_pl.Path(r["path"]).name: r for r in results}
+    valid_result = results_by_name["run0.dck"]
+    assert valid_result["success"]
+    assert valid_result["n_blocks"] == 4
+    assert valid_result["n_blocks_by_keyword"] == {"VERSION": 1, "EQUATIONS": 1, "UNIT": 1, "END": 1}
+    assert not valid_result["errors"]
+    assert valid_result["seconds"] >= 0
+
+    invalid_result = results_by_name["run5.dck"]
+    assert not invalid_result["success"]
+    assert invalid_result["errors"] == [
+        {"offset": 19, "keyword": "EQUATIONS", "message": 'Expected closing parenthesis (")") but found end of input.'}
+    ]
+
+
+def test_glob_and_cache(tmp_path: _pl.Path, capsys: _pt.CaptureFixture[str]) -> None:
+    _create_decks(tmp_path, 4)
+
+    arguments = [str(tmp_path / "study[01]" / "*.dck"), str(tmp_path / "study2" / "run2.dck"), "-j", "1"]
+    for _ in range(2):
+        exit_code = _cli.main([*arguments, "--cache-dir", str(tmp_path / "cache")])
+        assert exit_code == 0
+
+        results = [_json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [_pl.Path(r["path"]).name for r in results] == ["run0.dck", "run3.dck", "run1.dck", "run2.dck"]
+        assert all(r["success"] for r in results)
+
+    assert len(list((tmp_path / "cache").glob("*/*"))) == 1
+
+
+def test_failing_file(tmp_path: _pl.Path, capsys: _pt.CaptureFixture[str], monkeypatch: _pt.MonkeyPatch) -> None:
+    _create_decks(tmp_path, 3)
+    parse_deck_file = _pdeck.parse_deck_file
+
+    def fail_for_run1(path, *args, **kwargs):
+        if _pl.Path(path).name == "run1.dck":
+            raise RecursionError("maximum recursion depth exceeded")
+        return parse_deck_file(path, *args, **kwargs)
+
+    monkeypatch.setattr(_pdeck, "parse_deck_file", fail_for_run1)
+
+    exit_code = _cli.main([str(tmp_path), "-j", "1"])
+
+    assert exit_code == 1
+    results_by_name = {_pl.Path(r["path"]).name: r for r in map(_json.loads, capsys.readouterr().out.splitlines())}
+    assert results_by_name["run0.dck"]["success"] and results_by_name["run2.dck"]["success"]
+    assert not results_by_name["run1.dck"]["success"]
+    assert results_by_name["run1.dck"]["errors"] == [
+        {"offset": None, "keyword": None, "message": "RecursionError: maximum recursion depth exceeded"}
+    ]
+
+
+def test_blocks_are_streamed(tmp_path: _pl.Path, monkeypatch: _pt.MonkeyPatch) -> None:
+    _create_decks(tmp_path, 1)
+    parse_deck_file = _pdeck.parse_deck_file
+    n_alive_blocks = []
+
+    def count_alive_blocks(path, *args, **kwargs):
+        block_references: list[_wr.ref] = []
+        for parsed_block in parse_deck_file(path, *args, **kwargs):
+            n_alive_blocks.append(sum(r() is not None for r in block_references))
+            block_references.append(_wr.ref(parsed_block))
+            yield parsed_block
+
+    monkeypatch.setattr(_pdeck, "parse_deck_file", count_alive_blocks)
+
+    assert _cli.main([str(tmp_path), "-j", "1", "-o", str(tmp_path / "results.jsonl")]) == 0
+
+    # Only the block summarized last is still alive when the next one is parsed
+    assert n_alive_blocks == [0, 1, 1, 1]
+
+
+def test_invalid_arguments(capsys: _pt.CaptureFixture[str]) -> None:
+    with _pt.raises(SystemExit):
+        _cli.main(["decks", "-j", "0"])
+
+    assert "must be positive: 0" in capsys.readouterr().err
+
+
+@_pt.mark.parametrize("n_workers", [1, 2])
+def test_profile(tmp_path: _pl.Path, n_workers: int) -> None:
+    _create_decks(tmp_path, 2)
+    output_path = tmp_path / "results.jsonl"
+
+    _cli.main([str(tmp_path), "-j", str(n_workers), "--profile", "-o", str(output_path)])
+
+    for result in _read_results(output_path):
+        profile = result["profile"]
+        assert profile["tokens"]["EQUATIONS"]["n_tokens"] == 1
+        assert profile["rules"]["trnsys_dck_parser.parse.expression.parse.Parser"]["n_calls"] == 1
+        assert profile["n_equations_by_tier"] == {"trivial": 1, "full": 1}
@@ -0,0 +1,263 @@
+import gc as _gc
+import pickle as _pickle
+import random as _random
+import tracemalloc as _tm
+
+import pytest as _pt
+
+import trnsys_dck_parser.evaluate.compile as _ecomp
+import trnsys_dck_parser.evaluate.interpret as _einterp
+import trnsys_dck_parser.model.compact as _mcomp
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.expression as _mexpr
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.deck as _pdeck
+import trnsys_dck_parser.parse.equations as _peqs
+import trnsys_dck_parser.parse.expression.parse as _pexpr
+import trnsys_dck_parser.transform.optimize as _topt
+import trnsys_dck_parser.write.equations as _weqs
+
+_DECK = """\
+CONSTANTS 2
+START = 0
+STOP = 8760
+EQUATIONS 4
+PflowAuxSH_W = ((MfrAuxOut/3600)/RhoWat)*dpAuxSH_bar*100000
+x = -MAX(1.5, [2,3], -2)**2 + 18446744073709551616
+y = SIN(x) - -.5e-3/STOP
+z = -(-(1))
+UNIT 2 TYPE 65 Online
+PARAMETERS 2
+2 -0.5
+INPUTS 1
+x
+0
+"""
+
+
+def _create_equations_string(n_equations: int) -> str:
+    lines = [f"EQUATIONS {n_equations}"]
+    for i in range(n_equations):
+        lines.append(f"q{i} = (MfrAuxOut/3600)*RhoWat*CpWat*(tOut{i % 10} - tIn) + 1000*[{i % 5 + 1},1]")
+    return "\n".join(lines) + "\n"
+
+
+def _create_random_expression(random: _random.Random, depth: int = 0) -> _mexpr.Expression:
+    if depth > 5 or random.random() < 0.25:
+        return random.choice(
+            [
+                lambda: _mexpr.Literal(random.choice([0, -3, 2**70, 2.5, -0.0, 1e300])),
+                lambda: _mexpr.Variable(random.choice(["a", "Bc", "x-1"])),
+                lambda: _mexpr.UnitOutput(random.randrange(1, 5), 1),
+            ]
+        )()
+
+    x = _create_random_expression(random, depth + 1)
+    y = _create_random_expression(random, depth + 1)
+    return random.choice(
+        [
+            lambda: -x,
+            lambda: x + y,
+            lambda: x - y,
+            lambda: x * y,
+            lambda: _mexpr.Division(x, y),
+            lambda: x**y,
+            lambda: _mexpr.FunctionCall("MAX", [x, y, x]),
+            lambda: _mexpr.FunctionCall("PI", []),
+        ]
+    )()
+
+
+def _get_literal_types(expression: _mexpr.Expression) -> list[type]:
+    stack, literal_types = [expression], []
+    while stack:
+        node = stack.pop()
+        if isinstance(node, _mexpr.Literal):
+            literal_types.append(type(node.value))
+        elif isinstance(node, _mexpr.UnaryExpression):
+            stack.append(node.x)
+        elif isinstance(node, _mexpr.BinaryExpression):
+            stack.extend([node.x, node.y])
+        elif isinstance(node, _mexpr.FunctionCall):
+            stack.extend(node.arguments)
+    return literal_types
+
+
+def test_random_expressions_round_trip() -> None:
+    random = _random.Random(3)
+    arrays = _mcomp.ExpressionArrays()
+    for _ in range(1000):
+        expression = _create_random_expression(random)
+
+        view = arrays.get_view(arrays.add(expression))
+        materialized_expression = view.materialize()
+
+        assert materialized_expression == expression
+        assert _get_literal_types(materialized_expression) == _get_literal_types(expression)
+        assert view == expression and expression == view
+        assert hash(view) == hash(expression)
+
+
+def test_add_keeps_shared_subtrees_shared() -> None:
+    arrays = _mcomp.ExpressionArrays()
+    subtree = _mexpr.Variable("a") / _mexpr.Literal(3600)
+
+    index = arrays.add(_mexpr.FunctionCall("MAX", [subtree, -subtree]))
+
+    assert len(arrays) == 5
+    assert arrays.names == ["a", "MAX"]
+    assert arrays.add(arrays.get_view(index)) == index
+
+
+def test_views_are_lazy() -> None:
+    arrays = _mcomp.ExpressionArrays()
+    view = arrays.get_view(arrays.add(_mexpr.Variable("a") * -_mexpr.UnitOutput(3, 1)))
+
+    assert view.kind is _mcomp.NodeKind.MULTIPLICATION
+    x, y = view.children
+    assert (x.kind, y.kind) == (_mcomp.NodeKind.VARIABLE, _mcomp.NodeKind.NEGATION)
+    assert y.children[0] == _mexpr.UnitOutput(3, 1)
+    assert y.children[0] != x
+    assert x != 1
+
+
+def test_views_compare_and_hash_through_the_arrays() -> None:
+    arrays = _mcomp.ExpressionArrays()
+    expression = _mexpr.FunctionCall("MAX", [_mexpr.Variable("a") * -_mexpr.UnitOutput(3, 1), _mexpr.Literal(2**70)])
+    view = arrays.get_view(arrays.add(expression))
+
+    assert view == arrays.get_view(arrays.add(expression)) == expression
+    assert view != arrays.get_view(arrays.add(_mexpr.FunctionCall("MIN", expression.arguments)))
+    assert view != arrays.get_view(arrays.add(_mexpr.FunctionCall("MAX", expression.arguments[:1])))
+    assert hash(view) == hash(expression)
+    assert arrays.get_view(arrays.add(_mexpr.Literal(1))) == _mexpr.Literal(1.0)
+    assert hash(arrays.get_view(arrays.add(_mexpr.FunctionCall("PI", [])))) == hash(_mexpr.FunctionCall("PI", []))
+    assert view.materialize() is not view.materialize()
+    assert _pickle.loads(_pickle.dumps(view)) == view
+
+
+def test_consumers_read_views() -> None:
+    equations_string = "EQUATIONS 3\nc = b*2 + a\na = 1 + 2\nb = MAX(a, [1,2]) - -a\n"
+    equations = _pcom.success(_peqs.parse_equations(equations_string)).value
+    arrays = _mcomp.ExpressionArrays()
+    compact_equations = _pcom.success(
+        _peqs.Parser(equations_string, node_factory=_mcomp.CompactNodeFactory(arrays)).parse()
+    ).value
+    assert all(isinstance(e.rhs, _mcomp.ExpressionView) for e in compact_equations.equations)
+
+    assert _ecomp.compile_equations(compact_equations)({}, {(1, 2): 5}) == {"c": 19, "a": 3, "b": 8}
+    assert _weqs.format_equations(compact_equations) == _weqs.format_equations(equations)
+    assert _einterp.evaluate_expression(compact_equations.equations[2].rhs, {"A": 3}, {(1, 2): 5}) == 8
+    assert _topt.optimize_equations(compact_equations) == _topt.optimize_equations(equations)
+
+
+@_pt.mark.parametrize("node_factory", [_mexpr.NodeFactory(), _mexpr.InterningNodeFactory()])
+def test_materialize_with_node_factory(node_factory: _mexpr.NodeFactory) -> None:
+    expression = _pcom.success(_pexpr.Parser("MAX(a/2, a/2)", node_factory=_mexpr.NodeFactory()).parse()).value
+    arrays = _mcomp.ExpressionArrays()
+
+    materialized_expression = arrays.materialize(arrays.add(expression), node_factory)
+
+    assert isinstance(materialized_expression, _mexpr.FunctionCall)
+    x, y = materialized_expression.arguments
+    assert x == y and (x is y) == isinstance(node_factory, _mexpr.InterningNodeFactory)
+
+
+def test_parse_deck_into_arrays() -> None:
+    node_factory = _mcomp.CompactNodeFactory()
+
+    blocks = list(_pdeck.parse_deck(_DECK, node_factory))
+
+    expected_blocks = list(_pdeck.parse_deck(_DECK))
+    assert all(_pcom.is_success(b.result) for b in blocks)
+    assert blocks == expected_blocks
+
+    equations = _pcom.success(blocks[1].result).value
+    expected_equations = _pcom.success(expected_blocks[1].result).value
+    assert isinstance(equations, _meqs.Equations) and isinstance(expected_equations, _meqs.Equations)
+    assert all(isinstance(e.rhs, _mcomp.ExpressionView) for e in equations.equations)
+    assert equations.equations[0].start_index == expected_equations.equations[0].start_index
+
+    materialized_equations = _mcomp.materialize_equations(equations)
+    assert not any(isinstance(e.rhs, _mcomp.ExpressionView) for e in materialized_equations.equations)
+    assert materialized_equations == expected_equations
+
+
+def test_compact_equations() -> None:
+    constants = _pcom.success(_peqs.parse_constants("CONSTANTS 2\na = 1\nb = a*2\n")).value
+
+    compacted_constants = _mcomp.compact_equations(constants)
+
+    assert isinstance(compacted_constants, _meqs.Constants)
+    assert all(isinstance(e.rhs, _mcomp.ExpressionView) for e in compacted_constants.equations)
+    assert compacted_constants == constants
+    assert _mcomp.materialize_equations(compacted_constants) == constants
+
+
+def test_deep_expression() -> None:
+    arrays = _mcomp.ExpressionArrays()
+    node_factory = _mcomp.CompactNodeFactory(arrays)
+    input_string = "(" * 20000 + "a" + ")*2" * 20000
+
+    view = _pcom.success(_pexpr.Parser(input_string, node_factory=node_factory).parse()).value
+
+    assert isinstance(view, _mcomp.ExpressionView)
+    materialized_expression = view.materialize()
+    for _ in range(20000):
+        assert isinstance(materialized_expression, _mexpr.Multiplication)
+        materialized_expression = materialized_expression.x
+    assert materialized_expression == _mexpr.Variable("a")
+
+
+def test_memory_per_node() -> None:
+    equations_string = _create_equations_string(2000)
+    arrays = _mcomp.ExpressionArrays()
+
+    _tm.start()
+    try:
+        result = _peqs.Parser(equations_string, node_factory=_mcomp.CompactNodeFactory(arrays)).parse()
+        allocated_bytes, _ = _tm.get_traced_memory()
+    finally:
+        _tm.stop()
+    del result
+
+    assert len(arrays) == 2000 * 15
+    assert arrays.n_bytes / len(arrays) < 24
+    # Including the equations, the views of their right-hand sides and the arrays' spare capacity
+    assert allocated_bytes / len(arrays) < 48
+
+
+def test_memory_per_node_of_consumers() -> None:
+    equations_string = _create_equations_string(2000)
+    arrays = _mcomp.ExpressionArrays()
+
+    _tm.start()
+    try:
+        equations = _pcom.success(
+            _peqs.Parser(equations_string, node_factory=_mcomp.CompactNodeFactory(arrays)).parse()
+        ).value
+        assert _weqs.format_equations(equations).startswith("EQUATIONS 2000\n")
+        assert len(_ecomp.Compiler().compile_equations(equations).equation_variable_names) == 2000
+        # Of the compiler's reference cycles
+        _gc.collect()
+        # The writer and the compiler don't keep materialized expressions alive
+        allocated_bytes, _ = _tm.get_traced_memory()
+    finally:
+        _tm.stop()
+
+    assert len(arrays) == 2000 * 15
+    assert allocated_bytes / len(arrays) < 48
+
+
+@_pt.mark.benchmark(group="compact-ast")
+@_pt.mark.parametrize(
+    "create_node_factory",
+    [_mexpr.NodeFactory, _mexpr.InterningNodeFactory, _mcomp.CompactNodeFactory],
+    ids=["objects", "interned-objects", "arrays"],
+)
+def test_parse_benchmark(benchmark, create_node_factory) -> None:
+    equations_string = _create_equations_string(2000)
+
+    result = benchmark(lambda: _peqs.Parser(equations_string, node_factory=create_node_factory()).parse())
+
+    assert _pcom.is_success(result)
@@ -0,0 +1,157 @@
+import math as _math
+
+import pytest as _pt
+
+import trnsys_dck_parser.build as _build
+import trnsys_dck_parser.evaluate.compile as _ecomp
+import trnsys_dck_parser.evaluate.interpret as _einterp
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.expression as _mexpr
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.equations as _peqs
+
+_VARIABLES = {"TSKY": 12.5, "C_TILT": 30.0, "TAMB": -3.25, "X": 2.0, "Y": -4.0, "Z": 0.5}
+_UNIT_OUTPUTS = {(33, 1): -7.5, (12, 3): 0.25}
+
+
+def _parse_expression(string: str) -> _mexpr.Expression:
+    return _pcom.success(_build.parse_expression(string)).value
+
+
+@_pt.mark.parametrize(
+    "string",
+    [
+        "7",
+        "-8",
+        "ABS([33,1])",
+        "(1+COS(C_tilt))*0.5*tSky + (1-COS(C_tilt))*0.5*tAmb",
+        "((tSky+273.15)**4)*5.67*(10**-8)*3.6",
+        "x/-y*z",
+        "x - (y - z) - (x/(y/z))",
+        "-(x+y)*z",
+        "x*z**y",
+        "MAX(MIN(x,y),GT(x,y)*LT(y,z)) + INT(-2.5) + MOD(-7,3) + NOT(0) + AND(x,0) + OR(x,0) + EQL(x,2) + NE(x,2)",
+        "SIN(30)+ACOS(0.5)+LN(x)+LOG(100)+EXP(z)+AE(x,2.01,0.1)+GE(x,2)+LE(x,1)+ATAN(1)+ASIN(z)+TAN(45)",
+        "[12,3]*tsky - -7",
+    ],
+)
+def test_compiled_expression_matches_interpreter(string: str) -> None:
+    expression = _parse_expression(string)
+    expected_value = _einterp.evaluate_expression(expression, _VARIABLES, _UNIT_OUTPUTS)
+
+    actual_value = _ecomp.compile_expression(expression)(_VARIABLES, _UNIT_OUTPUTS)
+
+    assert actual_value == _pt.approx(expected_value)
+
+
+def test_trigonometric_functions_use_degrees() -> None:
+    compiled_expression = _ecomp.compile_expression(_parse_expression("COS(x)+ACOS(0)"))
+
+    assert compiled_expression({"x": 60}) == _pt.approx(90.5)
+
+
+def test_variables_are_case_insensitive() -> None:
+    compiled_expression = _ecomp.compile_expression(_parse_expression("TSky*tsky+[1,2]"))
+
+    assert compiled_expression.variable_names == ("TSKY",)
+    assert compiled_expression.unit_outputs == ((1, 2),)
+    assert compiled_expression({"tSky": 3}, {(1, 2): 1}) == 10
+
+
+def test_compiled_functions_are_cached_by_structure() -> None:
+    first = _ecomp.compile_expression(_parse_expression("a*b+COS(1.5)"))
+    second = _ecomp.compile_expression(_parse_expression("x*Y+COS(1.5)"))
+    third = _ecomp.compile_expression(_parse_expression("x*Y+SIN(1.5)"))
+
+    assert first.function is second.function
+    assert first.function is not third.function
+
+
+def test_unknown_function() -> None:
+    with _pt.raises(ValueError, match="Unknown function: FOO."):
+        _ecomp.compile_expression(_parse_expression("FOO(1)"))
+
+
+def test_long_and_deep_expressions() -> None:
+    # Deeper than the recursion limit and than Python allows parentheses to nest
+    long_expression = _parse_expression("b" + "+1" * 5000)
+    deep_expression: _mexpr.Expression = _mexpr.Variable("a")
+    for _ in range(5000):
+        deep_expression = _mexpr.Literal(2) * (deep_expression - _mexpr.Literal(1))
+
+    assert _ecomp.compile_expression(long_expression)({"b": 1}) == 5001
+    assert _ecomp.compile_expression(deep_expression)({"a": 2}) == 2
+
+    equations = _meqs.Equations(2, [_meqs.Equation("a", long_expression), _meqs.Equation("c", -long_expression)])
+    assert _ecomp.compile_equations(equations)({"b": 2}) == {"a": 5002, "c": -5002}
+
+
+_EQUATIONS = """\
+EQUATIONS 6
+PflowAuxSH_W = ((MfrAuxOut/3600)/RhoWat)*dpAuxSH_bar*100000
+PelPuAuxSH_kW = (PflowAuxSH_W/1000)/etaPuAuxSH
+dpAuxSH_bar = 0.2
+etaPuAuxSh = 0.35
+PelPuAuxBri_kW = GT(MfrEvapIn,0.1)*PelPuAuxSH_kW
+TOut = [12,3]+PelPuAuxBri_kW
+"""
+
+
+def test_compiled_equations() -> None:
+    equations = _pcom.success(_peqs.parse_equations(_EQUATIONS)).value
+    compiled_equations = _ecomp.compile_equations(equations)
+
+    actual_values = compiled_equations({"MfrAuxOut": 1800, "RhoWat": 1000, "MfrEvapIn": 1}, {(12, 3): 10})
+
+    p_flow = 1800 / 3600 / 1000 * 0.2 * 100000
+    assert actual_values == _pt.approx(
+        {
+            "PflowAuxSH_W": p_flow,
+            "PelPuAuxSH_kW": p_flow / 1000 / 0.35,
+            "dpAuxSH_bar": 0.2,
+            "etaPuAuxSh": 0.35,
+            "PelPuAuxBri_kW": p_flow / 1000 / 0.35,
+            "TOut": 10 + p_flow / 1000 / 0.35,
+        }
+    )
+    assert compiled_equations.variable_names == ("MFRAUXOUT", "RHOWAT", "MFREVAPIN")
+    assert compiled_equations.unit_outputs == ((12, 3),)
+
+
+@_pt.mark.parametrize(
+    "equations,error_message",
+    [
+        (["a = b + 1", "b = a * 2"], "Cyclic dependency"),
+        (["a = 1", "A = 2"], "Variables must be defined only once."),
+    ],
+)
+def test_invalid_equations(equations: list[str], error_message: str) -> None:
+    model = _meqs.Equations(
+        len(equations), [_build.create_equation(*[s.strip() for s in e.split("=")]) for e in equations]
+    )
+
+    with _pt.raises(ValueError, match=error_message):
+        _ecomp.compile_equations(model)
+
+
+_BENCHMARK_EXPRESSION = "(1+COS(C_tilt))*0.5*tSky + (1-COS(C_tilt))*0.5*tAmb + ((tSky+273.15)**4)*5.67*(10**-8)*3.6"
+
+
+@_pt.mark.benchmark(group="evaluate-expression")
+def test_interpreted_expression_benchmark(benchmark) -> None:
+    expression = _parse_expression(_BENCHMARK_EXPRESSION)
+
+    value = benchmark(_einterp.evaluate_expression, expression, _VARIABLES, _UNIT_OUTPUTS)
+
+    assert _math.isfinite(value)
+
+
+@_pt.mark.benchmark(group="evaluate-expression")
+def test_compiled_expression_benchmark(benchmark) -> None:
+    expression = _parse_expression(_BENCHMARK_EXPRESSION)
+    compiled_expression = _ecomp.compile_expression(expression)
+    arguments = [_VARIABLES[n] for n in compiled_expression.variable_names]
+
+    value = benchmark(compiled_expression.function, *arguments)
+
+    assert value == _pt.approx(_einterp.evaluate_expression(expression, _VARIABLES, _UNIT_OUTPUTS))
@@ -0,0 +1,182 @@
+import pickle as _pickle
+import subprocess as _sp
+import sys as _sys
+import tracemalloc as _tm
+
+import pytest as _pt
+
+import trnsys_dck_parser.build as _build
+import trnsys_dck_parser.model.compact as _mcomp
+import trnsys_dck_parser.model.corpus as _mcorp
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.expression as _mexpr
+import trnsys_dck_parser.model.traverse as _mtrav
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.deck as _pdeck
+import trnsys_dck_parser.parse.equations as _peqs
+
+_l = _build.create_literal
+_v = _build.create_variable
+
+
+def _parse_expression(string: str) -> _mexpr.Expression:
+    return _build.create_equation("x", string).rhs
+
+
+def _create_variant(index: int, n_equations: int) -> str:
+    # The equations of all variants are the same but for the one setting the variant's parameter
+    lines = [f"EQUATIONS {n_equations}", f"AcollAp = {2 + index % 40}"]
+    for i in range(1, n_equations):
+        lines.append(f"q{i} = (MfrAuxOut/3600)*RhoWat*CpWat*(tOut{i % 10} - tIn)*AcollAp + 1000*[{i % 5 + 1},1]")
+    return "\n".join(lines) + "\n"
+
+
+def _parse_variant(index: int, n_equations: int) -> _meqs.Equations:
+    return _pcom.success(_peqs.parse_equations(_create_variant(index, n_equations))).value
+
+
+def test_structural_hash() -> None:
+    expression = _parse_expression("MAX(a/3600, -[33,1]**2.0) + 1")
+
+    assert expression.structural_hash == _parse_expression("MAX(a/3600,-[33,1]**2.0)+1").structural_hash
+    assert len(expression.structural_hash) == 16
+
+    different_expressions = ["MAX(a/3600, -[33,1]**2) + 1", "MAX(a/3600, -[33,2]**2.0) + 1", "MAX(a/3600) + 1"]
+    different_expressions += ["MIN(a/3600, -[33,1]**2.0) + 1", "MAX(A/3600, -[33,1]**2.0) + 1", "1 + MAX(a/3600)"]
+    hashes = {_parse_expression(e).structural_hash for e in different_expressions}
+    assert len(hashes) == len(different_expressions) and expression.structural_hash not in hashes
+    assert (_v("a") + _v("b")).structural_hash != (_v("a") * _v("b")).structural_hash
+
+
+def test_structural_hash_is_stable() -> None:
+    # Unlike `hash`, for which string hashes are randomized per process
+    script = (
+        "import trnsys_dck_parser.build as b, sys; "
+        "sys.stdout.write(b.create_equation('x', 'MAX(a/3600, -[33,1]**2.0) + 1').structural_hash.hex())"
+    )
+    process = _sp.run([_sys.executable, "-c", script], capture_output=True, check=True, text=True)
+
+    equation = _build.create_equation("x", "MAX(a/3600, -[33,1]**2.0) + 1")
+    assert process.stdout == equation.structural_hash.hex()
+    assert _l(1).structural_hash.hex() == "40aceb2c43a36212ee647693f29d7112"
+
+
+def test_structural_hash_of_equations() -> None:
+    equation = _build.create_equation("q", "a*2")
+
+    assert equation.structural_hash == _meqs.Equation("q", _parse_expression("a*2"), 12, 19).structural_hash
+    assert equation.structural_hash != _build.create_equation("Q", "a*2").structural_hash
+    assert equation.structural_hash != equation.rhs.structural_hash
+
+
+def test_structural_hash_of_deep_expression_and_views() -> None:
+    expression: _mexpr.Expression = _v("a")
+    for i in range(100_000):
+        expression = -(expression + _l(i))
+
+    assert len(expression.structural_hash) == 16
+
+    arrays = _mcomp.ExpressionArrays()
+    shallow_expression = _parse_expression("a*2 + [1,2]")
+    view = arrays.get_view(arrays.add(shallow_expression))
+    assert view.structural_hash == shallow_expression.structural_hash
+
+
+def test_corpus_deduplicates_across_decks() -> None:
+    corpus = _mcorp.Corpus()
+    variants = [_parse_variant(i, 20) for i in range(50)]
+
+    decks = [corpus.add_equations(f"variant{i}", v.equations) for i, v in enumerate(variants)]
+
+    assert len(corpus) == 50 and "variant3" in corpus
+    # One equation per distinct parameter value and the 19 shared ones
+    assert corpus.n_equations == 40 + 19
+    assert decks[1].equation_hashes[1:] == decks[0].equation_hashes[1:]
+    assert decks[0].structural_hash == decks[40].structural_hash != decks[1].structural_hash
+    assert corpus.get_equations("variant7") == variants[7].equations
+
+    first_rhs, second_rhs = corpus.get_equations("variant0")[1].rhs, corpus.get_equations("variant1")[2].rhs
+    assert _get_leftmost_leaf(first_rhs) is _get_leftmost_leaf(second_rhs)
+    assert corpus.add_expression(_parse_expression("MfrAuxOut/3600")) is _get_leftmost_leaf(first_rhs, 5)
+
+
+def test_corpus_stores_compact_expressions() -> None:
+    corpus = _mcorp.Corpus()
+    stored_expression = corpus.add_expression(_parse_expression("MfrAuxOut/3600 + 1"))
+    arrays = _mcomp.ExpressionArrays()
+    view = arrays.get_view(arrays.add(_parse_expression("MfrAuxOut/3600 - 1")))
+
+    stored_view = corpus.add_expression(view)
+
+    assert not any(isinstance(n, _mcomp.ExpressionView) for n in _mtrav.walk(stored_view))
+    assert stored_view == view
+    assert _mtrav.get_children(stored_view)[0] is _mtrav.get_children(stored_expression)[0]
+    assert corpus.add_expression(view.children[0]) is _mtrav.get_children(stored_expression)[0]
+
+
+def _get_leftmost_leaf(expression: _mexpr.Expression, depth: int = -1) -> _mexpr.Expression:
+    while (children := _mtrav.get_children(expression)) and depth != 0:
+        expression, depth = children[0], depth - 1
+    return expression
+
+
+def test_corpus_decks() -> None:
+    deck = "VERSION 18\nCONSTANTS 1\nA = 2\nUNIT 1 TYPE 2\nPARAMETERS 1\nA\nEQUATIONS 2\nb = A*2\nc = (1\nEND\n"
+    blocks = [b.result.value for b in _pdeck.parse_deck(deck) if _pcom.is_success(b.result)]
+    corpus = _mcorp.Corpus()
+
+    corpus_deck = corpus.add_deck("deck", blocks)
+    corpus.add_equations("deck", [_build.create_equation("b", "A*2")])
+
+    assert corpus.get_equations("deck") == [_build.create_equation("b", "A*2")]
+    assert corpus.get_equation(corpus_deck.equation_hashes[0]) == _build.create_equation("A", "2")
+    assert corpus.get_equation(corpus_deck.equation_hashes[0]).start_index is None
+    with _pt.raises(KeyError):
+        corpus.get_deck("other")
+
+
+def test_corpus_reduces_memory() -> None:
+    # Tracing allocations slows parsing down a lot: the variants are parsed before and unpickled while
+    # tracing, which creates the same objects, shared subtrees included. Only 40 of them are distinct.
+    pickled_variants = [_pickle.dumps(_parse_variant(i, 200).equations) for i in range(40)]
+
+    def get_allocated_bytes(is_deduplicated: bool) -> int:
+        corpus = _mcorp.Corpus()
+        all_equations = []
+        _tm.start()
+        try:
+            for i in range(100):
+                equations = _pickle.loads(pickled_variants[i % 40])
+                if is_deduplicated:
+                    corpus.add_equations(f"variant{i}", equations)
+                else:
+                    all_equations.append(equations)
+                del equations
+            allocated_bytes, _ = _tm.get_traced_memory()
+        finally:
+            _tm.stop()
+        return allocated_bytes
+
+    assert get_allocated_bytes(True) < 0.1 * get_allocated_bytes(False)
+
+
+@_pt.mark.benchmark(group="corpus")
+@_pt.mark.parametrize("is_hashed", [False, True], ids=["compare-trees", "compare-hashes"])
+def test_compare_variants_benchmark(benchmark, is_hashed: bool) -> None:
+    # Which equations of each variant differ from the baseline's
+    baseline, *variants = [_parse_variant(i, 200) for i in range(51)]
+    corpus = _mcorp.Corpus()
+    baseline_deck = corpus.add_equations("baseline", baseline.equations)
+    variant_decks = [corpus.add_equations(f"variant{i}", v.equations) for i, v in enumerate(variants)]
+
+    def compare() -> list[list[int]]:
+        if is_hashed:
+            baseline_hashes = baseline_deck.equation_hashes
+            return [
+                [i for i, (h, b) in enumerate(zip(d.equation_hashes, baseline_hashes)) if h != b] for d in variant_decks
+            ]
+        return [[i for i, (e, b) in enumerate(zip(v.equations, baseline.equations)) if e != b] for v in variants]
+
+    differences = benchmark(compare)
+
+    assert differences == [[] if i % 40 == 39 else [0] for i in range(50)]
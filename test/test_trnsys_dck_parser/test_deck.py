@@ -0,0 +1,278 @@
+import io as _io
+import pathlib as _pl
+import random as _random
+
+import pytest as _pt
+
+import trnsys_dck_parser.build as _build
+import trnsys_dck_parser.model.control as _mctl
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.expression as _mexpr
+import trnsys_dck_parser.model.unit as _munit
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.deck as _pdeck
+import trnsys_dck_parser.parse.equations as _peqs
+
+_l = _build.create_literal
+_v = _build.create_variable
+
+_DECK = """\
+******************************************************************************
+*** TRNSYS input file (deck) generated by TrnsysStudio
+******************************************************************************
+VERSION 17
+*** Control cards
+SIMULATION 	 START	 STOP	 STEP	! Start time	End time	Time step
+TOLERANCES 0.001 0.001			! Integration	 Convergence
+ASSIGN "C:\\Program Files\\weather.tm2" 30
+
+CONSTANTS 3
+START=0
+STOP=8760
+STEP=1/60
+
+EQUATIONS 2		! 16
+qSol_kW = [2,3]/3600								! kW
+END_x = qSol_kW*GT(qSol_kW,0.1)
+*------------------------------------------------------------------------------
+
+* Model "Online" (Type 65)
+*
+UNIT 2 TYPE 65	 Online
+*$UNIT_NAME Online
+*$POSITION 1055 213
+PARAMETERS 3
+2		! 1 Nb. of left-axis variables
+-1		! 2 Nb. of right-axis variables
+0.5		! 3 Left axis minimum
+INPUTS 2
+2,3				! Type15-3:Total horizontal radiation ->Left axis variable-1
+qSol_kW			! ->Left axis variable-2
+*** INITIAL INPUT VALUES
+qSol 0
+LABELS  2
+"Heat transfer rates"
+"Temperatures"
+TRACE 0 10
+*------------------------------------------------------------------------------
+END
+"""
+
+
+def _get_expected_blocks() -> list[_mctl.ControlStatement | _meqs.Equations | _munit.Unit]:
+    start, stop, step, q_sol_kw = _build.create_variables("START STOP STEP qSol_kW")
+    return [
+        _mctl.ControlStatement("VERSION", ["17"]),
+        _mctl.ControlStatement("SIMULATION", ["START", "STOP", "STEP"]),
+        _mctl.ControlStatement("TOLERANCES", ["0.001", "0.001"]),
+        _mctl.ControlStatement("ASSIGN", ['"C:\\Program Files\\weather.tm2"', "30"]),
+        _meqs.Constants(
+            3,
+            [
+                _meqs.Equation(start.name, _l(0)),
+                _meqs.Equation(stop.name, _l(8760)),
+                _meqs.Equation(step.name, _l(1) / _l(60)),
+            ],
+        ),
+        _meqs.Equations(
+            2,
+            [
+                _meqs.Equation("qSol_kW", _mexpr.UnitOutput(2, 3) / _l(3600)),
+                _build.create_equation("END_x", "qSol_kW*GT(qSol_kW,0.1)"),
+            ],
+        ),
+        _munit.Unit(
+            2,
+            65,
+            "Online",
+            parameters=_munit.Parameters(3, [_l(2), _l(-1), _l(0.5)]),
+            inputs=_munit.Inputs(2, [_mexpr.UnitOutput(2, 3), q_sol_kw], [_v("qSol"), _l(0)]),
+            labels=_munit.Labels(2, ["Heat transfer rates", "Temperatures"]),
+            statements=[_mctl.ControlStatement("TRACE", ["0", "10"])],
+        ),
+        _mctl.ControlStatement("END", []),
+    ]
+
+
+@_pt.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_parse_deck_file(chunk_size: int) -> None:
+    parsed_blocks = list(_pdeck.parse_deck_file(_io.StringIO(_DECK), chunk_size))
+
+    actual_blocks = [_pcom.success(b.result).value for b in parsed_blocks]
+    assert actual_blocks == _get_expected_blocks()
+
+    actual_keywords = [b.keyword for b in parsed_blocks]
+    assert actual_keywords == ["VERSION", "SIMULATION", "TOLERANCES", "ASSIGN", "CONSTANTS", "EQUATIONS", "UNIT", "END"]
+
+    for parsed_block in parsed_blocks:
+        assert _DECK.startswith(parsed_block.input_string, parsed_block.start_index)
+
+    assert "".join(b.input_string for b in parsed_blocks) == _DECK[parsed_blocks[0].start_index :]
+
+
+def test_parse_deck_file_from_path(tmp_path: _pl.Path) -> None:
+    deck_path = tmp_path / "deck.dck"
+    deck_path.write_text(_DECK, encoding="utf-8")
+
+    actual_blocks = [_pcom.success(b.result).value for b in _pdeck.parse_deck_file(deck_path)]
+
+    assert actual_blocks == _get_expected_blocks()
+
+
+def test_comment_lines() -> None:
+    # Only in decks: on their own, "*" continues a product
+    (block,) = _pdeck.parse_deck("EQUATIONS 1\nx = a\n*b\n")
+    assert _pcom.success(block.result).value == _meqs.Equations(1, [_build.create_equation("x", "a")])
+    assert _pcom.success(_peqs.parse_equations("EQUATIONS 1\nx = a\n*b\n")).value == _meqs.Equations(
+        1, [_build.create_equation("x", "a*b")]
+    )
+
+    (block,) = _pdeck.parse_deck("EQUATIONS 1\n  * x = 1\nx = (\n")
+    assert _pcom.error(block.result).input_string == "EQUATIONS 1\n  * x = 1\nx = (\n"
+
+
+def test_parse_deck_is_lazy() -> None:
+    blocks = _pdeck.parse_deck("VERSION 17\nEQUATIONS 1\nx = (\nEND\n")
+
+    first_block = next(blocks)
+    assert first_block.keyword == "VERSION"
+    assert _pcom.is_success(first_block.result)
+
+    second_block = next(blocks)
+    assert second_block.keyword == "EQUATIONS"
+    assert _pcom.error(second_block.result) == _pcom.ParseError(
+        error_message="Expected number, variable, function call, opening square bracket or opening parenthesis "
+        "but found end of input",
+        input_string="EQUATIONS 1\nx = (\n",
+        error_start=18,
+    )
+
+    assert next(blocks).keyword == "END"
+
+
+@_pt.mark.parametrize(
+    "input_string,expected_parse_error",
+    [
+        (
+            "! comment\nfoo bar\nVERSION 17\n",
+            _pcom.ParseError("Expected the start of a block.", "! comment\nfoo bar\n", 10),
+        ),
+        (
+            "WIDTH 80\n",
+            None,
+        ),
+        (
+            "UNIT 3 TYPE 1\nPARAMETERS 1\n1 2\n",
+            _pcom.ParseError("Unexpected input after end of block.", "UNIT 3 TYPE 1\nPARAMETERS 1\n1 2\n", 29),
+        ),
+        (
+            "EQUATIONS 1\na = 1\nfoo\n",
+            _pcom.ParseError("Unexpected input after end of block.", "EQUATIONS 1\na = 1\nfoo\n", 18),
+        ),
+        (
+            "EQUATIONS 2\na = 1\nb = (\n",
+            _pcom.ParseError("Unexpected input after end of block.", "EQUATIONS 2\na = 1\nb = (\n", 18),
+        ),
+        (
+            "UNIT 3 TYPE 1\nINPUTS 1\n-3\n0\n",
+            _pcom.ParseError(
+                'Expected unit output ("<unit>,<output>") or variable but found integer.',
+                "UNIT 3 TYPE 1\nINPUTS 1\n-3\n0\n",
+                23,
+            ),
+        ),
+    ],
+)
+def test_parse_deck_errors(input_string: str, expected_parse_error: _pcom.ParseError | None) -> None:
+    first_block = next(_pdeck.parse_deck(input_string))
+
+    if expected_parse_error:
+        assert first_block.result == expected_parse_error
+    else:
+        assert _pcom.is_success(first_block.result)
+
+
+@_pt.mark.parametrize(
+    "line,expected_keyword",
+    [
+        ("EQUATIONS 3\n", "EQUATIONS"),
+        ("  unit 3 type 1 ! comment\n", "UNIT"),
+        ("nan_check 0\n", "NAN_CHECK"),
+        ("END = 3\n", None),
+        ("END_x = 3\n", None),
+        ("* SIMULATION 0 10 1\n", None),
+        ("PARAMETERS 2\n", None),
+    ],
+)
+def test_get_block_keyword(line: str, expected_keyword: str | None) -> None:
+    assert _pdeck.get_block_keyword(line) == expected_keyword
+
+
+@_pt.mark.parametrize(
+    "input_string",
+    [
+        _DECK,
+        "",
+        "! comment\n* only\n",
+        "! comment\nfoo bar\nVERSION 17\nEQUATIONS 1\nx = (\nEND",
+        "  unit 3 type 1 ! c\nEND = 3\nequations 1\r\nEND_x = 1\r\n",
+    ],
+)
+def test_index_deck_matches_parse_deck(input_string: str) -> None:
+    deck_index = _pdeck.index_deck(input_string)
+
+    assert list(deck_index.parse_blocks()) == list(_pdeck.parse_deck(input_string))
+
+
+def test_index_deck() -> None:
+    deck_index = _pdeck.index_deck(_DECK)
+
+    assert [(b.keyword, b.number, b.type_number) for b in deck_index.blocks] == [
+        ("VERSION", 17, None),
+        ("SIMULATION", None, None),
+        ("TOLERANCES", None, None),
+        ("ASSIGN", None, None),
+        ("CONSTANTS", 3, None),
+        ("EQUATIONS", 2, None),
+        ("UNIT", 2, 65),
+        ("END", None, None),
+    ]
+    (equations_block,) = deck_index.get_blocks("equations")
+    assert _DECK[equations_block.start_index : equations_block.end_index].startswith("EQUATIONS 2\t\t! 16\n")
+
+
+def test_index_deck_parses_on_demand() -> None:
+    deck_index = _pdeck.index_deck("EQUATIONS 1\nx = (\nUNIT 3 TYPE 1\nEQUATIONS 1\ny = 2*x\n")
+    first_block, unit_block, second_block = deck_index.blocks
+
+    parsed_block = deck_index.parse_block(second_block)
+
+    assert _pcom.success(parsed_block.result).value == _meqs.Equations(1, [_build.create_equation("y", "2*x")])
+    assert deck_index.parse_block(second_block) is parsed_block
+    assert list(deck_index.parse_blocks("EQUATIONS")) == [deck_index.parse_block(first_block), parsed_block]
+    assert isinstance(deck_index.parse_block(first_block).result, _pcom.ParseError)
+    assert unit_block.start_index not in (b.start_index for b in deck_index.parse_blocks("EQUATIONS"))
+
+
+def _create_large_deck(n_units: int) -> str:
+    random = _random.Random(0)
+    unit_string = _DECK[_DECK.index("* Model") : _DECK.index("END\n")]
+    equations = [f"x{i} = MAX(x{i - 1}*{random.random()}, [{i},1]) ! x{i}" for i in range(100)]
+    equations_string = f"EQUATIONS {len(equations)}\n" + "\n".join(equations) + "\n"
+    return _DECK.replace("END\n", (unit_string + equations_string) * n_units + "END\n")
+
+
+@_pt.mark.benchmark(group="index-deck")
+@_pt.mark.parametrize("is_indexed", [False, True], ids=["parse-deck", "index-deck"])
+def test_find_block_benchmark(benchmark, is_indexed: bool) -> None:
+    deck = _create_large_deck(100)
+
+    def get_last_unit() -> _pdeck.ParsedBlock:
+        if is_indexed:
+            deck_index = _pdeck.index_deck(deck)
+            return deck_index.parse_block(deck_index.get_blocks("UNIT")[-1])
+        return [b for b in _pdeck.parse_deck(deck) if b.keyword == "UNIT"][-1]
+
+    parsed_block = benchmark(get_last_unit)
+
+    assert _pcom.success(parsed_block.result).value == _get_expected_blocks()[-2]
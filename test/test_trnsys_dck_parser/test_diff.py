@@ -0,0 +1,145 @@
+import pytest as _pt
+
+import trnsys_dck_parser.build as _build
+import trnsys_dck_parser.model.compact as _mcomp
+import trnsys_dck_parser.model.diff as _mdiff
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.expression as _mexpr
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.equations as _peqs
+
+_l = _build.create_literal
+_v = _build.create_variable
+
+_BASELINE = """\
+EQUATIONS 5
+AcollAp = 10 ! m2
+qLoss = (tColl - tAmb)*UA*AcollAp
+PelPu_kW = MAX(MfrPu/3600*dpPu, 0)*0.001
+tSet = 60
+x = 1
+"""
+
+
+def _parse_equations(string: str) -> _meqs.Equations:
+    return _pcom.success(_peqs.parse_equations(string)).value
+
+
+def _parse_expression(string: str) -> _mexpr.Expression:
+    return _build.create_equation("x", string).rhs
+
+
+def test_formatting_and_comments_are_ignored() -> None:
+    reformatted = "EQUATIONS 5\n! Collector\nAcollAp=10\nqloss = ( tColl -tAmb )*UA*AcollAp ! W\n"
+    reformatted += "PelPu_kW = MAX(MfrPu/3600*dpPu,0)*0.001\n\ntSet = 60\nX = 1\n"
+
+    diff = _mdiff.diff_equations(_parse_equations(_BASELINE), _parse_equations(reformatted))
+
+    assert diff.is_empty
+    assert _mdiff.diff_equations([], []).is_empty
+
+
+def test_added_removed_and_changed_equations() -> None:
+    baseline = _parse_equations(_BASELINE)
+    variant = _BASELINE.replace("tSet = 60\n", "").replace("AcollAp = 10", "AcollAp = 12")
+    variant = variant.replace("dpPu, 0", "(dpPu*2), 0") + "y = x\n"
+
+    diff = _mdiff.diff_equations(baseline, _parse_equations(variant))
+
+    assert diff.added == (_build.create_equation("y", "x"),)
+    assert diff.removed == (baseline.equations[3],)
+    assert [c.variable_name for c in diff.changed] == ["AcollAp", "PelPu_kW"]
+    assert diff.changed[0].old is baseline.equations[0]
+    assert diff.changed[0].subtree_changes == (_mdiff.SubtreeChange((), _l(10), _l(12)),)
+    assert diff.changed[1].subtree_changes == (
+        _mdiff.SubtreeChange((0, 0, 1), _v("dpPu"), _parse_expression("dpPu*2")),
+    )
+
+
+@_pt.mark.parametrize(
+    "old,new,expected_subtree_changes",
+    [
+        ("a + b*c", "a + b*d", [((1, 1), "c", "d")]),
+        ("a + b*c", "x + b*d", [((0,), "a", "x"), ((1, 1), "c", "d")]),
+        ("a + b*c", "a - b*c", [((), "a + b*c", "a - b*c")]),
+        ("MAX(a, b)", "MIN(a, b)", [((), "MAX(a, b)", "MIN(a, b)")]),
+        ("MAX(a, b)", "MAX(a, b, c)", [((), "MAX(a, b)", "MAX(a, b, c)")]),
+        ("MAX(a, -[1,2])", "MAX(a, -[1,3])", [((1, 0), "[1,2]", "[1,3]")]),
+        ("1", "1.0", [((), "1", "1.0")]),
+    ],
+)
+def test_diff_expressions(old: str, new: str, expected_subtree_changes: list[tuple[tuple[int, ...], str, str]]) -> None:
+    subtree_changes = _mdiff.diff_expressions(_parse_expression(old), _parse_expression(new))
+
+    assert subtree_changes == tuple(
+        _mdiff.SubtreeChange(p, _parse_expression(o), _parse_expression(n)) for p, o, n in expected_subtree_changes
+    )
+
+
+def test_diff_compact_expressions() -> None:
+    arrays = _mcomp.ExpressionArrays()
+    old_view, new_view = (arrays.get_view(arrays.add(_parse_expression(s))) for s in ["a + b*c", "x + b*d"])
+
+    subtree_changes = _mdiff.diff_expressions(old_view, new_view)
+
+    assert subtree_changes == (
+        _mdiff.SubtreeChange((0,), _v("a"), _v("x")),
+        _mdiff.SubtreeChange((1, 1), _v("c"), _v("d")),
+    )
+    assert not any(isinstance(e, _mcomp.ExpressionView) for c in subtree_changes for e in [c.old, c.new])
+    assert not _mdiff.diff_expressions(old_view, _parse_expression("a + b*c"))
+
+
+def test_diff_deep_expressions() -> None:
+    old_expression: _mexpr.Expression = _v("a")
+    new_expression: _mexpr.Expression = _v("b")
+    for i in range(10_000):
+        old_expression, new_expression = -(old_expression + _l(i)), -(new_expression + _l(i))
+
+    subtree_changes = _mdiff.diff_expressions(old_expression, new_expression)
+
+    assert len(subtree_changes) == 1
+    subtree_change = subtree_changes[0]
+    assert subtree_change.path == (0, 0) * 10_000
+    assert (subtree_change.old, subtree_change.new) == (_v("a"), _v("b"))
+
+
+def test_duplicate_definitions_are_matched_in_order() -> None:
+    old = [_build.create_equation("a", "1"), _build.create_equation("b", "2"), _build.create_equation("A", "3")]
+    new = [_build.create_equation("a", "1"), _build.create_equation("a", "4"), _build.create_equation("a", "5")]
+
+    diff = _mdiff.EquationsDiffer(old).diff(new)
+
+    assert diff.added == (new[2],)
+    assert diff.removed == (old[1],)
+    assert [(c.old, c.new) for c in diff.changed] == [(old[2], new[1])]
+
+
+def _create_variant(index: int, n_equations: int) -> str:
+    lines = [f"EQUATIONS {n_equations}"]
+    for i in range(n_equations):
+        parameter = f"{i}*2" if i == index else str(i)
+        lines.append(f"q{i} = (MfrAuxOut/3600)*RhoWat*CpWat*(tOut{i % 10} - tIn)*{parameter} + 1000*[{i % 5 + 1},1]")
+    return "\n".join(lines) + "\n"
+
+
+@_pt.mark.benchmark(group="diff")
+@_pt.mark.parametrize("is_hashed", [False, True], ids=["compare-trees", "compare-hashes"])
+def test_diff_variants_benchmark(benchmark, is_hashed: bool) -> None:
+    # One baseline against many variants, which were hashed before, e.g. when they were deduplicated
+    baseline = _parse_equations(_create_variant(-1, 300))
+    variants = [_parse_equations(_create_variant(i, 300)) for i in range(0, 300, 10)]
+    for variant in variants:
+        _mdiff.diff_equations(baseline, variant)
+
+    def diff() -> list[list[str]]:
+        if is_hashed:
+            differ = _mdiff.EquationsDiffer(baseline)
+            return [[c.variable_name for c in differ.diff(v).changed] for v in variants]
+
+        baseline_equations = {e.variable_name: e for e in baseline.equations}
+        return [[e.variable_name for e in v.equations if e != baseline_equations[e.variable_name]] for v in variants]
+
+    changed_names = benchmark(diff)
+
+    assert changed_names == [[f"q{i}"] for i in range(0, 300, 10)]
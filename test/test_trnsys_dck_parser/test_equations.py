@@ -1,7 +1,12 @@
+import random as _random
+
+import pytest as _pt
+
 import trnsys_dck_parser.build as _build
 import trnsys_dck_parser.model.equations as _meqs
 import trnsys_dck_parser.parse.common as _pcom
 import trnsys_dck_parser.parse.equations as _peqs
+import trnsys_dck_parser.parse.expression.parse as _pexp
 
 
 def test_equations_without_placeholders(benchmark) -> None:
@@ -43,3 +48,223 @@ PelPuAuxBri_kW = GT(MfrEvapIn,0.1)*PelPuAuxBrine_kW							! GT(MfrcondIn,0.1)*Pe
     expected_equations = _meqs.Equations(expected_n_equations, all_expected_equations)
 
     assert actual_equations == expected_equations
+
+
+class _ExceptionDrivenParser(_peqs.Parser):
+    # Detects the end of the block by catching the error of the next equation, as the parser did
+    # before. Kept to check and benchmark the lookahead against.
+    def _try_equation(self) -> _meqs.Equation | None:
+        start_pos = self._remaining_input_string_start_index
+        try:
+            return self._equation()
+        except _pcom.ParseErrorException as exception:
+            assert exception.parse_error.error_message
+            self._rewind(start_pos)
+            return None
+
+
+@_pt.mark.parametrize(
+    "input_string",
+    [
+        "EQUATIONS 1\na = 1\n",
+        "EQUATIONS 2\na = 1\nb = a*2\nUNIT 3 TYPE 4",
+        "EQUATIONS 2\na = 1\nb = a*2\nc",
+        "EQUATIONS 2\na = 1\nb\n= 2",
+        "EQUATIONS 2\na = 1\nb = (1 + \n",
+        "EQUATIONS 2\na = 1\nb = 2 $ c = 3",
+        "EQUATIONS 2\na = 1\n$",
+        "EQUATIONS 2\nb = 2\n\n* Comment\nCONSTANTS 1\nc = 3",
+    ],
+)
+def test_block_end_same_as_exception_driven(input_string: str) -> None:
+    assert _peqs.Parser(input_string).parse() == _ExceptionDrivenParser(input_string).parse()
+
+
+@_pt.mark.parametrize(
+    "input_string, expected_error_message, expected_error_start",
+    [
+        ("EQUATIONS 2\na = 1\nb = (\n", "Expected number, variable, function call, opening square bracket", 24),
+        ("EQUATIONS 3\na = 1\nb = 2\n", "Expected variable but found end of input.", 24),
+    ],
+)
+def test_fewer_equations_than_declared(
+    input_string: str, expected_error_message: str, expected_error_start: int
+) -> None:
+    parse_error = _pcom.error(_peqs.parse_equations(input_string, is_strict=True))
+
+    assert parse_error.error_message.startswith(expected_error_message)
+    assert parse_error.error_start == expected_error_start
+
+    # Unless strict, the block ends with the last equation
+    assert _pcom.is_success(_peqs.parse_equations(input_string))
+
+
+def test_more_equations_than_declared() -> None:
+    parse_success = _pcom.success(_peqs.parse_equations("EQUATIONS 1\na = 1\nfoo"))
+
+    assert parse_success.value == _meqs.Equations(1, [_build.create_equation("a", "1")])
+    assert _pcom.skip_ignored("EQUATIONS 1\na = 1\nfoo", parse_success.remaining_string_input_start_index) == 18
+
+    parse_success = _pcom.success(_peqs.parse_equations("EQUATIONS 1\na = 1\nb = 2\n", is_strict=True))
+    assert parse_success.remaining_string_input_start_index == 17
+    assert len(_pcom.success(_peqs.parse_equations("EQUATIONS 1\na = 1\nb = 2\n")).value.equations) == 2
+
+
+def test_errors_unchanged() -> None:
+    parse_error = _pcom.error(_peqs.parse_equations("EQUATIONS 1\n= 3"))
+
+    assert parse_error.error_message == "Expected variable but found =."
+    assert parse_error.error_start == 12
+
+
+def test_error_message_created_lazily() -> None:
+    created_parse_errors = []
+
+    def create_parse_error() -> _pcom.ParseError:
+        parse_error = _pcom.ParseError("Message.", "", 0)
+        created_parse_errors.append(parse_error)
+        return parse_error
+
+    exception = _pcom.ParseErrorException(create_parse_error)
+    assert not created_parse_errors
+
+    parse_error = exception.parse_error
+    assert exception.parse_error is parse_error
+    assert created_parse_errors == [parse_error]
+
+
+def _create_blocks(n_blocks: int, n_equations_per_block: int) -> list[str]:
+    return [
+        "\n".join(
+            [f"EQUATIONS {n_equations_per_block}"]
+            + [f"x{i}_{j} = x{i}_{j - 1}*2 + 1" for j in range(n_equations_per_block)]
+            + ["UNIT 1 TYPE 2"]
+        )
+        for i in range(n_blocks)
+    ]
+
+
+@_pt.mark.benchmark(group="equations-block-end")
+@_pt.mark.parametrize("parser_class", [_peqs.Parser, _ExceptionDrivenParser])
+@_pt.mark.parametrize("n_blocks,n_equations_per_block", [(2000, 1), (1, 2000)], ids=["small-blocks", "large-block"])
+def test_block_end_benchmark(benchmark, parser_class, n_blocks: int, n_equations_per_block: int) -> None:
+    blocks = _create_blocks(n_blocks, n_equations_per_block)
+
+    def parse() -> list[_pcom.ParseResult[_meqs.Equations]]:
+        return [parser_class(b).parse() for b in blocks]
+
+    results = benchmark(parse)
+
+    assert all(_pcom.is_success(r) for r in results)
+
+
+class _SeparateLexersParser(_peqs.Parser):
+    # Creates a new expression parser and lexer for every equation, as the parser did before it shared
+    # its lexer. Kept to check and benchmark the shared lexer against.
+    @property
+    def _expression_parser(self) -> _pexp.Parser:
+        return _pexp.Parser(self._lexer.input_string, self._remaining_input_string_start_index, self._node_factory)
+
+    @_expression_parser.setter
+    def _expression_parser(self, _: _pexp.Parser) -> None:
+        pass
+
+
+@_pt.mark.parametrize(
+    "input_string",
+    [
+        "EQUATIONS 2\na = b\nEquationsCount = 3",
+        "EQUATIONS 2\na = b EQUATIONS 1 c = 3",
+        "EQUATIONS 3\na = b\nb = -1\nc = [1,2]**2\n",
+        "EQUATIONS 2\na = b\n1 = 3",
+        "EQUATIONS 2\na = b\n-c = 3",
+    ],
+)
+def test_shared_lexer_same_as_separate_lexers(input_string: str) -> None:
+    assert _peqs.Parser(input_string).parse() == _SeparateLexersParser(input_string).parse()
+
+
+@_pt.mark.benchmark(group="equations-shared-lexer")
+@_pt.mark.parametrize("parser_class", [_peqs.Parser, _SeparateLexersParser], ids=["shared", "separate"])
+def test_shared_lexer_benchmark(benchmark, parser_class) -> None:
+    input_string = "\n".join(["EQUATIONS 5000", *(f"etaPuAuxSh{i} = 0.35" for i in range(5000))])
+
+    result = benchmark(lambda: parser_class(input_string).parse())
+
+    assert len(_pcom.success(result).value.equations) == 5000
+
+
+def _parse_both_tiers(
+    input_string: _pcom.Input, parser_class: type[_peqs.Parser] = _peqs.Parser
+) -> tuple[_pcom.ParseResult, _pcom.ParseResult]:
+    fast_result = parser_class(input_string).parse()
+    full_result = parser_class(input_string, use_fast_path=False).parse()
+    return fast_result, full_result
+
+
+@_pt.mark.parametrize(
+    "input_string",
+    [
+        "EQUATIONS 4\na = 1\nb = -2\nc = .5\nd = -1.5E-3 ! comment",
+        "EQUATIONS 2\na = b\nb=c",
+        "EQUATIONS 2\na =\n* Comment\n  1\nb = a",
+        "EQUATIONS 1\na = 1\n+ 2",
+        "EQUATIONS 1\na = 1\n* 2",
+        "EQUATIONS 2\na = 1 -2\nb = 3",
+        "EQUATIONS 1\na = b**2",
+        "EQUATIONS 1\na = b (1)",
+        "EQUATIONS 1\na = 1 (2)",
+        "EQUATIONS 1\na = 1.",
+        "EQUATIONS 1\na = 1.5e",
+        "EQUATIONS 1\na = 1 %",
+        "EQUATIONS 2\na = 1 b = 2",
+        "EQUATIONS 2\na-1 = b-1\nc = 1",
+        "EQUATIONS 2\na = 1\nEquationsCount = 2",
+        "EQUATIONS 2\na = 1\nConstantsCount = 2",
+        "CONSTANTS 2\na = 1\nConstantsCount = 2",
+        "EQUATIONS 2\na = 1\nUNIT 1 TYPE 2",
+        "EQUATIONS 2\na = 1\n= 2",
+        "EQUATIONS 1\n1 = 1",
+    ],
+)
+def test_fast_path_same_as_full_parser(input_string: str) -> None:
+    parser_class = _peqs.ConstantsParser if input_string.startswith("CONSTANTS") else _peqs.Parser
+
+    fast_result, full_result = _parse_both_tiers(input_string, parser_class)
+    fast_bytes_result, full_bytes_result = _parse_both_tiers(input_string.encode(), parser_class)
+
+    assert fast_result == full_result
+    assert fast_bytes_result == full_bytes_result
+
+
+def test_fast_path_same_as_full_parser_for_generated_blocks() -> None:
+    names = ["a", "B_2", "c-1", "equationsX", "UNIT"]
+    rhss = ["1", "-2", "0.5", "-.5e-3", "b", "b(1)", "[1,2]", "-b", "(1)", "1."]
+    separators = [" ", "", "\n", " ! c\n", "\n* c\n"]
+    continuations = ["", "+1", "*2", "**2", "-3", " -3", "/b", "(2)", ")", ",1", " %", "e1"]
+
+    random = _random.Random(42)
+    for _ in range(500):
+        lines = [f"EQUATIONS {random.randint(1, 5)}"]
+        for _ in range(random.randint(1, 5)):
+            name, rhs, continuation = random.choice(names), random.choice(rhss), random.choice(continuations)
+            lines.append(f"{name}{random.choice(separators)}={random.choice(separators)}{rhs}{continuation}")
+        input_string = random.choice(separators).join(lines) + random.choice(["", "\n", "\nEND"])
+
+        fast_result, full_result = _parse_both_tiers(input_string)
+
+        assert fast_result == full_result, input_string
+
+
+@_pt.mark.benchmark(group="equations-tiers")
+@_pt.mark.parametrize("use_fast_path", [False, True], ids=["full-parser", "fast-path"])
+def test_fast_path_benchmark(benchmark, use_fast_path: bool) -> None:
+    # Mostly trivial equations, as in the decks of typical systems
+    lines = [f"EQUATIONS {4 * 1250}"]
+    for i in range(1250):
+        lines += [f"etaPu{i} = 0.35", f"PelPu{i} = -1", f"dpPu{i} = dpRef", f"PflowPu{i} = MfrPu{i}/3600*dpPu{i}"]
+    input_string = "\n".join(lines) + "\n"
+
+    result = benchmark(lambda: _peqs.Parser(input_string, use_fast_path=use_fast_path).parse())
+
+    assert result == _peqs.Parser(input_string, use_fast_path=False).parse()
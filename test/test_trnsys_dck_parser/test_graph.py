@@ -0,0 +1,153 @@
+import pytest as _pt
+
+import trnsys_dck_parser.evaluate.compile as _ecomp
+import trnsys_dck_parser.evaluate.graph as _egraph
+import trnsys_dck_parser.evaluate.incremental as _einc
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.equations as _peqs
+
+_EQUATIONS_STRING = """\
+EQUATIONS 6
+qLoss = uA*(tStore - tAmb)
+tStore = [12,1]
+uA = area*uValue
+qNet = qSol - qLoss
+qSol = area*[33,2]*eta
+report = MAX(qNet, 0) + 0*tAmb
+"""
+
+
+def _parse_equations(string: str) -> _meqs.Equations:
+    return _pcom.success(_peqs.parse_equations(string)).value
+
+
+def _create_chain_equations(n_equations: int) -> _meqs.Equations:
+    lines = [f"EQUATIONS {n_equations}", "e0 = x0 + 1"]
+    for i in range(1, n_equations):
+        if i % 100 == 0:
+            lines.append(f"e{i} = e{i - 1} + x{i // 100}")
+        else:
+            lines.append(f"e{i} = e{i - 1}*0.5 + e{max(i - 7, 0)}*0.25 + 1")
+    return _parse_equations("\n".join(lines) + "\n")
+
+
+def test_dependency_graph() -> None:
+    graph = _egraph.create_dependency_graph(_parse_equations(_EQUATIONS_STRING))
+
+    assert graph.dependencies[0] == ("UA", "TSTORE", "TAMB")
+    assert graph.dependencies[1] == ((12, 1),)
+    assert graph.dependents["TAMB"] == (0, 5)
+    assert set(graph.inputs) == {"TAMB", (12, 1), "AREA", "UVALUE", (33, 2), "ETA"}
+
+    positions = {i: p for p, i in enumerate(graph.evaluation_order)}
+    for index, nodes in enumerate(graph.dependencies):
+        for node in nodes:
+            if isinstance(node, str) and node in graph.equation_indices:
+                assert positions[graph.equation_indices[node]] < positions[index]
+
+
+def test_downstream_equations() -> None:
+    graph = _egraph.create_dependency_graph(_parse_equations(_EQUATIONS_STRING))
+
+    def get_downstream_variable_names(*nodes: _egraph.Node) -> list[str]:
+        indices = graph.get_downstream_equation_indices(nodes)
+        return [graph.equations[i].variable_name for i in indices]
+
+    assert get_downstream_variable_names("ETA") == ["qSol", "qNet", "report"]
+    assert get_downstream_variable_names((12, 1)) == ["tStore", "qLoss", "qNet", "report"]
+    assert get_downstream_variable_names("TAMB") == ["qLoss", "qNet", "report"]
+    assert get_downstream_variable_names("REPORT", "UNKNOWN") == []
+
+
+@_pt.mark.parametrize(
+    "lines,cycle",
+    [
+        (["a = a + 1"], ("a",)),
+        (["a = b + 1", "b = c*2", "c = SIN(a)", "d = a"], ("a", "b", "c")),
+        (["x = 1", "a = B + x", "b = -A"], ("a", "b")),
+    ],
+)
+def test_cycle_detection(lines: list[str], cycle: tuple[str, ...]) -> None:
+    equations = _parse_equations(f"EQUATIONS {len(lines)}\n" + "\n".join(lines) + "\n")
+
+    with _pt.raises(_egraph.CyclicDependencyError, match="Cyclic dependency involving") as exception_info:
+        _egraph.create_dependency_graph(equations)
+
+    assert exception_info.value.cycle == cycle
+
+
+def test_long_chain_does_not_exceed_recursion_limit() -> None:
+    graph = _egraph.create_dependency_graph(_create_chain_equations(5000))
+
+    assert graph.evaluation_order == tuple(range(5000))
+
+
+def test_incremental_evaluation_matches_full_evaluation() -> None:
+    equations = _parse_equations(_EQUATIONS_STRING)
+    variables = {"tAmb": 5.0, "area": 10.0, "uValue": 0.5, "eta": 0.6}
+    unit_outputs = {(12, 1): 50.0, (33, 2): 3.0}
+
+    evaluator = _einc.IncrementalEvaluator(equations, variables, unit_outputs)
+    assert evaluator.values == _ecomp.compile_equations(equations)(variables, unit_outputs)
+
+    changed_values = evaluator.update({"ETA": 0.7})
+    assert changed_values == {"qSol": 21.0, "qNet": -204.0}
+
+    changed_values = evaluator.update(unit_outputs={(12, 1): 25.0})
+    assert changed_values == {"tStore": 25.0, "qLoss": 100.0, "qNet": -79.0}
+
+    changed_values = evaluator.update(unit_outputs={(33, 2): 20.0})
+    assert changed_values == {"qSol": 140.0, "qNet": 40.0, "report": 40.0}
+
+    assert not evaluator.update({"tamb": 5.0})
+
+    variables.update({"eta": 0.7})
+    unit_outputs.update({(12, 1): 25.0, (33, 2): 20.0})
+    assert evaluator.values == _ecomp.compile_equations(equations)(variables, unit_outputs)
+    assert evaluator["QNET"] == 40.0
+
+
+def test_incremental_evaluation_errors() -> None:
+    equations = _parse_equations(_EQUATIONS_STRING)
+
+    with _pt.raises(ValueError, match="Missing values for: UVALUE, ETA."):
+        _einc.IncrementalEvaluator(equations, {"tAmb": 5.0, "area": 10.0}, {(12, 1): 50.0, (33, 2): 3.0})
+
+    evaluator = _einc.IncrementalEvaluator(
+        equations, {"tAmb": 5.0, "area": 10.0, "uValue": 0.5, "eta": 0.6}, {(12, 1): 50.0, (33, 2): 3.0}
+    )
+    with _pt.raises(ValueError, match="QSOL is defined by an equation and can't be set."):
+        evaluator.update({"qSol": 1.0})
+    with _pt.raises(KeyError):
+        evaluator["tAmb"]  # pylint: disable=pointless-statement
+
+
+@_pt.mark.benchmark(group="re-evaluate-equations")
+def test_full_re_evaluation_benchmark(benchmark) -> None:
+    equations = _create_chain_equations(3000)
+    compiled_equations = _ecomp.compile_equations(equations)
+    variables = {f"x{i}": 1.0 for i in range(30)}
+
+    def move_slider():
+        variables["x29"] += 1.0
+        return compiled_equations(variables)
+
+    values = benchmark(move_slider)
+
+    assert len(values) == 3000
+
+
+@_pt.mark.benchmark(group="re-evaluate-equations")
+def test_incremental_re_evaluation_benchmark(benchmark) -> None:
+    equations = _create_chain_equations(3000)
+    variables = {f"x{i}": 1.0 for i in range(30)}
+    evaluator = _einc.IncrementalEvaluator(equations, variables)
+
+    def move_slider():
+        variables["x29"] += 1.0
+        return evaluator.update({"x29": variables["x29"]})
+
+    changed_values = benchmark(move_slider)
+
+    assert len(changed_values) == 100
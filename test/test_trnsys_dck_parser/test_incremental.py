@@ -0,0 +1,173 @@
+import random as _random
+
+import pytest as _pt
+
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.deck as _pdeck
+
+_DECK = """\
+* Header comment
+VERSION 18
+CONSTANTS 3
+rhoWat = 1000
+cpWat = 4.19
+area = 10 ! m2
+
+EQUATIONS 4
+qAux = MfrAuxOut/3600*rhoWat*cpWat*(tOut - tIn)
+qAuxKw = qAux/3600
+* Inline comment
+tAvg = (tOut + tIn)/2
+hot = GT(tAvg, 60)
+
+UNIT 2 TYPE 1 Solar collector
+PARAMETERS 2
+1 area
+INPUTS 1
+[1,2]
+*** initial values
+20
+EQUATIONS 2
+a = [2,1]*2
+b = a + 1
+END
+"""
+
+_SNIPPETS = [
+    "",
+    "x",
+    "1",
+    " ",
+    "\n",
+    "+",
+    "*2",
+    "(",
+    ")",
+    "=",
+    "-",
+    "!",
+    "*",
+    "\nEQUATIONS 1\nz = 3\n",
+    "\nUNIT 5 TYPE 3\n",
+    "END\n",
+    "c = d\n",
+    "SIN(a)",
+]
+
+
+def _create_big_deck(n_equations: int) -> str:
+    lines = ["VERSION 18", f"EQUATIONS {n_equations}"]
+    lines.extend(
+        f"q{i} = MfrAuxOut{i % 7}/3600*rhoWat*cpWat*(tOut{i} - tIn) + q{max(i - 1, 0)}" for i in range(n_equations)
+    )
+    lines.append("END")
+    return "\n".join(lines) + "\n"
+
+
+def _get_equations(block: _pdeck.ParsedBlock) -> list[_meqs.Equation]:
+    if not _pcom.is_success(block.result) or not isinstance(block.result.value, _meqs.Equations):
+        return []
+    return block.result.value.equations
+
+
+def _get_equation_spans(block: _pdeck.ParsedBlock) -> list[tuple[int | None, int | None]]:
+    return [(e.start_index, e.end_index) for e in _get_equations(block)]
+
+
+def _assert_same_as_full_parse(deck: _pdeck.ParsedDeck) -> None:
+    expected_deck = _pdeck.create_parsed_deck(deck.input_string)
+
+    assert deck.blocks == expected_deck.blocks
+    assert [_get_equation_spans(b) for b in deck.blocks] == [_get_equation_spans(b) for b in expected_deck.blocks]
+
+
+def test_text_edit() -> None:
+    edit = _pcom.TextEdit(2, 3, "xy")
+
+    assert edit.apply("0123456") == "01xy56"
+    assert edit.end_index == 5
+    assert edit.length_change == -1
+    assert edit.shift(-2) == _pcom.TextEdit(0, 3, "xy")
+
+    with _pt.raises(ValueError, match="Edit is out of range."):
+        edit.apply("0123")
+
+
+def test_equation_edit_reuses_unchanged_equations() -> None:
+    deck = _pdeck.create_parsed_deck(_DECK)
+    edit_index = _DECK.index("(tOut + tIn)/2") + len("(tOut + tIn)/")
+
+    edited_deck = _pdeck.reparse_deck(deck, _pcom.TextEdit(edit_index, 1, "3.5"))
+
+    _assert_same_as_full_parse(edited_deck)
+
+    assert all(e is b for e, b in zip(edited_deck.blocks[:2], deck.blocks[:2]))
+    assert all(e.result is b.result for e, b in zip(edited_deck.blocks[3:], deck.blocks[3:]))
+    assert [e.start_index for e in edited_deck.blocks[3:]] == [b.start_index + 2 for b in deck.blocks[3:]]
+
+    previous_equations = _get_equations(deck.blocks[2])
+    equations = _get_equations(edited_deck.blocks[2])
+    assert equations[0] is previous_equations[0]
+    assert equations[2] != previous_equations[2]
+    assert equations[3] is not previous_equations[3]
+    assert equations[3].rhs is previous_equations[3].rhs
+    assert equations[3].start_index == previous_equations[3].start_index + 2  # type: ignore[operator]
+
+
+@_pt.mark.parametrize(
+    "old,new",
+    [
+        ("tAvg = (tOut + tIn)/2\n", "tAvg = (tOut + tIn)/2\nUNIT 9 TYPE 9\n"),
+        ("b = a + 1\nEND\n", "b = a + 1\nEN\n"),
+        ("VERSION 18\n", ""),
+        ("* Header comment\n", "oops\n"),
+        ("hot = GT(tAvg, 60)\n", "hot = GT(tAvg, 60\n"),
+        ("a = [2,1]*2", "a = [2,1]*2 +"),
+    ],
+)
+def test_edits_changing_blocks(old: str, new: str) -> None:
+    deck = _pdeck.create_parsed_deck(_DECK)
+    start_index = _DECK.index(old)
+
+    edited_deck = _pdeck.reparse_deck(deck, _pcom.TextEdit(start_index, len(old), new))
+
+    assert edited_deck.input_string == _DECK.replace(old, new)
+    _assert_same_as_full_parse(edited_deck)
+
+
+def test_random_edits() -> None:
+    random = _random.Random(42)
+
+    deck = _pdeck.create_parsed_deck(_DECK)
+    for _ in range(1000):
+        start_index = random.randint(0, len(deck.input_string))
+        removed_length = min(random.choice([0, 0, 1, 2, 5, 20]), len(deck.input_string) - start_index)
+        edit = _pcom.TextEdit(start_index, removed_length, random.choice(_SNIPPETS))
+
+        deck = _pdeck.reparse_deck(deck, edit)
+
+        _assert_same_as_full_parse(deck)
+        if len(deck.input_string) > 2 * len(_DECK) or not deck.blocks:
+            deck = _pdeck.create_parsed_deck(_DECK)
+
+
+@_pt.mark.benchmark(group="reparse-deck")
+def test_full_parse_benchmark(benchmark) -> None:
+    input_string = _create_big_deck(5000)
+    edit_index = input_string.index("tOut2500")
+
+    deck = benchmark(_pdeck.create_parsed_deck, _pcom.TextEdit(edit_index, 4, "tIn").apply(input_string))
+
+    assert all(_pcom.is_success(b.result) for b in deck.blocks)
+
+
+@_pt.mark.benchmark(group="reparse-deck")
+def test_reparse_benchmark(benchmark) -> None:
+    input_string = _create_big_deck(5000)
+    edit_index = input_string.index("tOut2500")
+    deck = _pdeck.create_parsed_deck(input_string)
+
+    edited_deck = benchmark(_pdeck.reparse_deck, deck, _pcom.TextEdit(edit_index, 4, "tIn"))
+
+    assert all(_pcom.is_success(b.result) for b in edited_deck.blocks)
@@ -0,0 +1,153 @@
+import typing as _tp
+
+import pytest as _pt
+
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.equations as _peqs
+import trnsys_dck_parser.parse.expression.tokenize as _petok
+import trnsys_dck_parser.parse.tokens as _ptok
+
+_EXPRESSION_TOKEN_DEFINITIONS = [
+    _petok.Tokens.POSITIVE_INTEGER,
+    _petok.Tokens.NEGATIVE_INTEGER,
+    _petok.Tokens.FLOAT,
+    _petok.Tokens.LEFT_SQUARE_BRACKET,
+    _petok.Tokens.RIGHT_SQUARE_BRACKET,
+    _petok.Tokens.COMMA,
+    _ptok.Tokens.IDENTIFIER,
+    _petok.Tokens.PLUS,
+    _petok.Tokens.MINUS,
+    _petok.Tokens.TIMES,
+    _petok.Tokens.DIVIDE,
+    _petok.Tokens.POWER,
+    _petok.Tokens.LEFT_PAREN,
+    _petok.Tokens.RIGHT_PAREN,
+]
+
+_EQUATIONS_TOKEN_DEFINITIONS = [
+    _peqs.Tokens.EQUATIONS,
+    _peqs.Tokens.POSITIVE_INTEGER,
+    _peqs.Tokens.EQUALS,
+    _ptok.Tokens.IDENTIFIER,
+]
+
+_ALL_TOKEN_DEFINITIONS = [_peqs.Tokens.EQUATIONS, _peqs.Tokens.EQUALS, *_EXPRESSION_TOKEN_DEFINITIONS]
+
+_DECK = """\
+EQUATIONS 9		! 16
+dpAuxSH_bar = 0.2															! according to MacSheep report 7.2
+PflowAuxSH_W = ((MfrAuxOut/3600)/RhoWat)*dpAuxSH_bar*100000					! required power to drive the flow, W
+etaPuAuxSh = 0.35															! Assumption
+PelPuAuxSH_kW = (PflowAuxSH_W/1000)/etaPuAuxSH								! required pump electric power, kW
+dpAuxBrine_bar = 0.3														! assumption
+PflowAuxBrine_W = ((MfrAuxEvapOut/3600)/RhoBri)*dpAuxBrine_bar*100000		! required power to drive the flow, W
+etaPuAuxBrine = 0.35														! Assumption
+PelPuAuxBrine_kW = (PflowAuxBrine_W/1000)/etaPuAuxBrine						! required pump electric power, kW
+PelPuAuxBri_kW = GT(MfrEvapIn,0.1)*PelPuAuxBrine_kW							! GT(MfrcondIn,0.1)*PelPuAuxBrine_kW
+tSkyRad = ((tSky+273.15)**4)*5.67*(10**-8)*3.6 + [33,1] - -7 / -.5e-3
+"""
+
+
+def _lex_all(lexer: _pcom.Lexer) -> _tp.Sequence[_pcom.LexerResult]:
+    results = []
+    while True:
+        result = lexer.get_next_token()
+        results.append(result)
+        if isinstance(result, _pcom.ParseError) or result.definition == _pcom.Tokens.END:
+            return results
+
+
+@_pt.mark.parametrize(
+    "input_string",
+    [
+        _DECK,
+        "",
+        "   \n\t ! only a comment",
+        "x**y*z",
+        "EQUATIONS equations Equationsx",
+        "1.5e3 -12 - 12 -.25 12.",
+        "a = b ; c",
+        "! comment\n  §",
+        "* comment line\nx\n  ** comment line\n*y",
+        "x ! comment\n \n\t *** comment line\n*",
+    ],
+)
+@_pt.mark.parametrize(
+    "token_definitions",
+    [_EXPRESSION_TOKEN_DEFINITIONS, _EQUATIONS_TOKEN_DEFINITIONS, _ALL_TOKEN_DEFINITIONS],
+    ids=["expression", "equations", "all"],
+)
+def test_lexer_matches_sequential_lexer(input_string: str, token_definitions: _tp.Sequence[_pcom.TokenDefinition]):
+    expected_results = _lex_all(_pcom.SequentialLexer(input_string, token_definitions, 0))
+    actual_results = _lex_all(_pcom.Lexer(input_string, token_definitions, 0))
+
+    assert actual_results == expected_results
+
+
+def test_lexer_priorities() -> None:
+    lexer = _pcom.Lexer("**-8-.5*", _EXPRESSION_TOKEN_DEFINITIONS, 0)
+
+    actual_definitions = [_tp.cast(_pcom.Token, lexer.get_next_token()).definition for _ in range(4)]
+
+    assert actual_definitions == [
+        _petok.Tokens.POWER,
+        _petok.Tokens.NEGATIVE_INTEGER,
+        _petok.Tokens.FLOAT,
+        _petok.Tokens.TIMES,
+    ]
+
+
+def test_unrecognized_token_error_skips_whitespace_and_comments() -> None:
+    input_string = "x ! comment\n  §"
+    lexer = _pcom.Lexer(input_string, _EXPRESSION_TOKEN_DEFINITIONS, 1)
+
+    actual_result = lexer.get_next_token()
+
+    assert actual_result == _pcom.ParseError("Not a recognized token.", input_string, 14)
+
+
+@_pt.mark.parametrize(
+    "input_string,is_kept",
+    [("etaPuAuxSh = 0.35", True), ("EquationsCount = 3", False), ("3 = 4", False), ("", True)],
+)
+def test_switch_mode_keeps_lookahead_only_if_lexed_the_same(input_string: str, is_kept: bool) -> None:
+    lexer = _pcom.Lexer(input_string, _EXPRESSION_TOKEN_DEFINITIONS, 0)
+    lookahead = lexer.lookahead = _tp.cast(_pcom.Token, lexer.get_next_token())
+
+    lexer.switch_mode(lexer.create_mode(_EQUATIONS_TOKEN_DEFINITIONS))
+
+    assert (lexer.lookahead is lookahead) == is_kept
+    actual_token = lexer.lookahead or lexer.get_next_token()
+    assert actual_token == _pcom.Lexer(input_string, _EQUATIONS_TOKEN_DEFINITIONS, 0).get_next_token()
+
+
+def test_switch_mode_same_as_lexing_in_new_mode() -> None:
+    expression_mode = _pcom.Lexer(_DECK, _EXPRESSION_TOKEN_DEFINITIONS, 0).mode
+    equations_mode = _pcom.Lexer(_DECK, _EQUATIONS_TOKEN_DEFINITIONS, 0).mode
+
+    for start_pos in range(len(_DECK)):
+        for mode, other_mode in [(expression_mode, equations_mode), (equations_mode, expression_mode)]:
+            lexer = _pcom.Lexer(_DECK, [], start_pos)
+            lexer.switch_mode(mode)
+            if isinstance(lookahead := lexer.get_next_token(), _pcom.ParseError):
+                continue
+            lexer.lookahead = lookahead
+
+            lexer.switch_mode(other_mode)
+
+            expected_lexer = _pcom.Lexer(_DECK, [], start_pos)
+            expected_lexer.switch_mode(other_mode)
+            assert (lexer.lookahead or lexer.get_next_token()) == expected_lexer.get_next_token()
+
+
+@_pt.mark.benchmark(group="lexer")
+@_pt.mark.parametrize("lexer_class", [_pcom.Lexer, _pcom.SequentialLexer], ids=["combined", "sequential"])
+def test_lexer_benchmark(lexer_class: type[_pcom.Lexer], benchmark) -> None:
+    input_string = _DECK * 50
+
+    def lex_all() -> _tp.Sequence[_pcom.LexerResult]:
+        return _lex_all(lexer_class(input_string, _ALL_TOKEN_DEFINITIONS, 0))
+
+    results = benchmark(lex_all)
+
+    assert results[-1] == _pcom.Token(_pcom.Tokens.END, "", input_string, len(input_string), len(input_string))
@@ -0,0 +1,160 @@
+import dataclasses as _dc
+import pickle as _pickle
+import subprocess as _sp
+import sys as _sys
+import tracemalloc as _tm
+
+import pytest as _pt
+
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.expression as _mexpr
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.deck as _pdeck
+import trnsys_dck_parser.parse.equations as _peqs
+
+
+def _create_expression() -> _mexpr.Expression:
+    return _mexpr.FunctionCall(
+        "MAX", [_mexpr.Variable("MfrAuxOut") / _mexpr.Literal(3600), -_mexpr.UnitOutput(33, 1) ** _mexpr.Literal(2.0)]
+    )
+
+
+def _create_equations_string(n_equations: int) -> str:
+    lines = [f"EQUATIONS {n_equations}"]
+    for i in range(n_equations):
+        lines.append(f"q{i} = (MfrAuxOut/3600)*RhoWat*CpWat*(tOut{i % 10} - tIn) + 1000*[{i % 5 + 1},1]")
+    return "\n".join(lines) + "\n"
+
+
+def test_nodes_are_immutable_and_have_no_instance_dictionary() -> None:
+    expression = _create_expression()
+
+    assert not hasattr(expression, "__dict__")
+    with _pt.raises(_dc.FrozenInstanceError):
+        expression.function = "MIN"  # type: ignore[attr-defined]
+
+    assert isinstance(expression, _mexpr.FunctionCall)
+    assert isinstance(expression.arguments, tuple)
+
+
+def test_equality_and_hashing() -> None:
+    expression = _create_expression()
+    equal_expression = _create_expression()
+
+    assert expression is not equal_expression
+    assert expression == equal_expression
+    assert hash(expression) == hash(equal_expression)
+    assert len({expression, equal_expression}) == 1
+
+    assert _mexpr.Addition(_mexpr.Literal(1), _mexpr.Literal(2)) != _mexpr.Subtraction(
+        _mexpr.Literal(1), _mexpr.Literal(2)
+    )
+    assert _mexpr.Literal(1) != _mexpr.Variable("x")
+    assert _mexpr.Literal(1) != 1
+    assert _mexpr.Literal(1) == _mexpr.Literal(1.0)
+    assert _mexpr.Literal(1).structural_hash != _mexpr.Literal(1.0).structural_hash
+
+
+def test_equality_of_long_expressions() -> None:
+    # Deeper than the recursion limit
+    string = "EQUATIONS 1\na = b" + "+1" * 30_000
+    expression = _pcom.success(_peqs.parse_equations(string)).value.equations[0].rhs
+    equal_expression = _pcom.success(_peqs.parse_equations(string)).value.equations[0].rhs
+    different_expression = _pcom.success(_peqs.parse_equations(string + "*2")).value.equations[0].rhs
+
+    assert expression is not equal_expression
+    assert expression == equal_expression
+    assert expression != different_expression
+
+
+def test_pickled_nodes_are_rehashed() -> None:
+    expression = _create_expression()
+
+    assert _pickle.loads(_pickle.dumps(expression)) == expression
+
+    # String hashes are randomized per process
+    script = "import pickle, sys; sys.stdout.buffer.write(pickle.dumps(pickle.loads(sys.stdin.buffer.read())))"
+    process = _sp.run([_sys.executable, "-c", script], input=_pickle.dumps(expression), capture_output=True, check=True)
+    unpickled_expression = _pickle.loads(process.stdout)
+
+    assert unpickled_expression == expression
+    assert hash(unpickled_expression) == hash(expression)
+
+
+def test_interning_node_factory() -> None:
+    node_factory = _mexpr.InterningNodeFactory()
+
+    def create_subtree() -> _mexpr.Expression:
+        variable = node_factory.variable("MfrAuxOut")
+        return node_factory.binary_expression(_mexpr.Division, variable, node_factory.literal(3600))
+
+    assert create_subtree() is create_subtree()
+    assert node_factory.literal(1) is not node_factory.literal(1.0)
+    assert node_factory.function_call("ABS", [create_subtree()]) is node_factory.function_call(
+        "ABS", (create_subtree(),)
+    )
+    assert node_factory.negation(create_subtree()) is node_factory.negation(create_subtree())
+    assert len(node_factory) == 7
+
+
+def test_equations_share_subtrees() -> None:
+    equations = _pcom.success(_peqs.parse_equations(_create_equations_string(3))).value
+
+    def get_subtree(equation: _meqs.Equation) -> _mexpr.Expression:
+        expression = equation.rhs
+        while isinstance(expression, _mexpr.BinaryExpression):
+            expression = expression.x
+        return expression
+
+    rhs_0, rhs_1, _ = [e.rhs for e in equations.equations]
+    assert isinstance(rhs_0, _mexpr.Addition) and isinstance(rhs_1, _mexpr.Addition)
+    assert rhs_0.y is not rhs_1.y
+    assert get_subtree(equations.equations[0]) is get_subtree(equations.equations[2])
+
+
+def test_blocks_share_nodes_if_asked_to() -> None:
+    deck = "EQUATIONS 1\na = MfrAuxOut/3600\nEQUATIONS 1\nb = MfrAuxOut/3600\n"
+
+    def get_rhss(node_factory: _mexpr.NodeFactory | None) -> list[_mexpr.Expression]:
+        blocks = [_pcom.success(b.result).value for b in _pdeck.parse_deck(deck, node_factory)]
+        return [e.rhs for b in blocks if isinstance(b, _meqs.Equations) for e in b.equations]
+
+    first_rhs, second_rhs = get_rhss(None)
+    assert first_rhs == second_rhs and first_rhs is not second_rhs
+
+    first_rhs, second_rhs = get_rhss(_mexpr.InterningNodeFactory())
+    assert first_rhs is second_rhs
+
+
+def _get_allocated_bytes(equations_string: str, node_factory: _mexpr.NodeFactory) -> int:
+    _tm.start()
+    try:
+        equations = _peqs.Parser(equations_string, node_factory=node_factory).parse()
+        allocated_bytes, _ = _tm.get_traced_memory()
+    finally:
+        _tm.stop()
+    assert _pcom.is_success(equations)
+    return allocated_bytes
+
+
+def test_interning_reduces_memory() -> None:
+    equations_string = _create_equations_string(1000)
+
+    allocated_bytes = _get_allocated_bytes(equations_string, _mexpr.NodeFactory())
+    allocated_bytes_when_interning = _get_allocated_bytes(equations_string, _mexpr.InterningNodeFactory())
+
+    assert allocated_bytes_when_interning < 0.5 * allocated_bytes
+
+
+@_pt.mark.benchmark(group="interning")
+@_pt.mark.parametrize(
+    "create_node_factory", [_mexpr.NodeFactory, _mexpr.InterningNodeFactory], ids=["objects", "interned-objects"]
+)
+def test_interning_benchmark(benchmark, create_node_factory) -> None:
+    # Of the time to parse and, as extra info, of the memory taken by the parsed equations
+    equations_string = _create_equations_string(1000)
+    benchmark.extra_info["allocated_bytes"] = _get_allocated_bytes(equations_string, create_node_factory())
+
+    result = benchmark(lambda: _peqs.Parser(equations_string, node_factory=create_node_factory()).parse())
+
+    assert _pcom.is_success(result)
@@ -0,0 +1,165 @@
+import math as _math
+import random as _random
+
+import pytest as _pt
+
+import trnsys_dck_parser.build as _build
+import trnsys_dck_parser.evaluate.compile as _ecomp
+import trnsys_dck_parser.evaluate.graph as _egraph
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.equations as _peqs
+import trnsys_dck_parser.transform.optimize as _topt
+import trnsys_dck_parser.write.equations as _weqs
+
+
+def _parse_equations(string: str) -> _meqs.Equations:
+    return _pcom.success(_peqs.parse_equations(string)).value
+
+
+def _optimize(string: str, options: _topt.Options | None = None) -> str:
+    return _weqs.format_equations(_topt.optimize_equations(_parse_equations(string), options))
+
+
+@_pt.mark.parametrize(
+    "rhs,expected_rhs",
+    [
+        ("100000/3600", "27.77777777777778"),
+        ("a*(100000/3600)", "a * 27.77777777777778"),
+        ("SIN(90) + MAX(1, 2, 3)*2**3", "25.0"),
+        ("(-(2*3)) + a", "-6 + a"),
+        ("1/0 + LN(-1) + UNKNOWN(1) + SIN(1, 2)", "1 / 0 + LN(-1) + UNKNOWN(1) + SIN(1, 2)"),
+        ("EXP(1000)", "EXP(1000)"),
+        ("a*3600/3600", "a * 3600 / 3600"),
+        ("(a + 0)*1 - 0", "a"),
+        ("0 + a/1 + b**1", "a + b"),
+        ("0 - a", "-a"),
+        ("-1*a*-1", "a"),
+        ("--a", "a"),
+        ("a*0 + a**0", "a * 0 + a ** 0"),
+    ],
+)
+def test_fold_and_simplify(rhs: str, expected_rhs: str) -> None:
+    expression = _build.create_equation("x", rhs).rhs
+
+    optimized_expression = _topt.optimize_expression(expression)
+
+    assert optimized_expression == _build.create_equation("x", expected_rhs).rhs
+
+
+def test_inline_literals_keeps_equations() -> None:
+    string = "EQUATIONS 4\nd = b*c\nb = 2*a\na = 3\nc = a + 0.5\n"
+
+    assert _optimize(string) == "EQUATIONS 4\nd = 21.0\nb = 6\na = 3\nc = 3.5\n"
+
+
+def test_eliminate_common_subexpressions() -> None:
+    string = """\
+EQUATIONS 5
+cse1 = 1
+PflowAuxSH_W = ((MfrAuxOut/3600)/RhoWat)*dpAuxSH_bar*100000
+PflowAux2_W = ((MfrAuxOut/3600)/RhoWat)*dpAux2_bar*100000
+x = SIN(a*b) + COS(a*b)
+y = SIN(a*b) + COS(a*b)
+"""
+
+    assert _optimize(string, _topt.Options(reserved_names=frozenset(["CSE3"]))) == ("""\
+EQUATIONS 7
+cse2 = MfrAuxOut / 3600 / RhoWat
+cse4 = a * b
+cse1 = 1
+PflowAuxSH_W = cse2 * dpAuxSH_bar * 100000
+PflowAux2_W = cse2 * dpAux2_bar * 100000
+x = SIN(cse4) + COS(cse4)
+y = x
+""")
+
+
+def test_options() -> None:
+    string = "EQUATIONS 3\na = 2 * 3\nb = a * (c + 0)\nd = a * (c + 0)\n"
+
+    options = _topt.Options(
+        fold_constants=False, simplify=False, inline_literals=False, eliminate_common_subexpressions=False
+    )
+
+    assert _optimize(string, options) == string
+    assert _optimize(string, _topt.Options(inline_literals=False)) == "EQUATIONS 3\na = 6\nb = a * c\nd = b\n"
+
+
+def test_constants_stay_constants() -> None:
+    constants = _pcom.success(_peqs.parse_constants("CONSTANTS 2\na = 1 + 1\nb = a*2\n")).value
+
+    optimized_constants = _topt.optimize_equations(constants)
+
+    assert optimized_constants == _meqs.Constants(
+        2, [_build.create_equation(n, r) for n, r in [("a", "2"), ("b", "4")]]
+    )
+
+
+def test_cyclic_equations() -> None:
+    with _pt.raises(_egraph.CyclicDependencyError):
+        _topt.optimize_equations(_parse_equations("EQUATIONS 2\na = b + 1\nb = a*2\n"))
+
+
+def _create_block(random: _random.Random, n_equations: int) -> str:
+    patterns = [
+        "((Mfr{i}/3600)/Rho)*dp*100000",
+        "((Mfr{j}/3600)/Rho)*dp*100000 + 0",
+        "(Mfr{j}/3600)/Rho*[{k},1]",
+        "SIN(v{j}*2) + COS(v{j}*2)*(1 - 0.5)",
+        "v{j}*1 - -Mfr{k}",
+        "{k}.5",
+        "MAX(v{j}, 3600/1000, Mfr{k})",
+    ]
+    lines = [f"EQUATIONS {n_equations}", "Rho = 998.2", "dp = 0.2", "v0 = 1.5"]
+    for i in range(1, n_equations - 2):
+        pattern = random.choice(patterns)
+        rhs = pattern.format(i=i, j=random.randrange(i), k=random.randrange(1, 5))
+        lines.append(f"v{i} = {rhs}")
+    return "\n".join(lines) + "\n"
+
+
+def _get_inputs(equations: _meqs.Equations) -> tuple[dict[str, float], dict[tuple[int, int], float]]:
+    inputs = _egraph.create_dependency_graph(equations).inputs
+    variables = {n: 1.5 + i for i, n in enumerate(inputs) if isinstance(n, str)}
+    unit_outputs = {n: 0.5 - i for i, n in enumerate(inputs) if isinstance(n, tuple)}
+    return variables, unit_outputs
+
+
+def test_optimized_equations_have_same_values() -> None:
+    random = _random.Random(7)
+    for _ in range(50):
+        equations = _parse_equations(_create_block(random, 60))
+        variables, unit_outputs = _get_inputs(equations)
+
+        optimized_equations = _topt.optimize_equations(equations)
+        reparsed_equations = _parse_equations(_weqs.format_equations(optimized_equations))
+
+        expected_values = _ecomp.compile_equations(equations)(variables, unit_outputs)
+        actual_values = _ecomp.compile_equations(reparsed_equations)(variables, unit_outputs)
+        assert reparsed_equations == optimized_equations
+        for name, value in expected_values.items():
+            assert actual_values[name] == value or (_math.isnan(value) and _math.isnan(actual_values[name]))
+
+
+@_pt.mark.benchmark(group="optimize-equations")
+@_pt.mark.parametrize("is_optimized", [False, True], ids=["original", "optimized"])
+def test_evaluation_benchmark(benchmark, is_optimized: bool) -> None:
+    equations = _parse_equations(_create_block(_random.Random(1), 1000))
+    if is_optimized:
+        equations = _topt.optimize_equations(equations)
+    variables, unit_outputs = _get_inputs(equations)
+    compiled_equations = _ecomp.compile_equations(equations)
+
+    values = benchmark(compiled_equations, variables, unit_outputs)
+
+    assert len(values) == len(equations.equations)
+
+
+@_pt.mark.benchmark(group="optimize-equations")
+def test_optimize_benchmark(benchmark) -> None:
+    equations = _parse_equations(_create_block(_random.Random(1), 1000))
+
+    optimized_equations = benchmark(_topt.optimize_equations, equations)
+
+    assert len(optimized_equations.equations) > len(equations.equations)
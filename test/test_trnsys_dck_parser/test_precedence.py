@@ -0,0 +1,130 @@
+import random as _random
+import sys as _sys
+
+import pytest as _pt
+
+import trnsys_dck_parser.model.expression as _mexpr
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.expression.parse as _pexpr
+
+_TOKENS = ["a", "Bc", "7", "-3", "2.5", "-.5e-3", "[3,1]", "+", "-", "*", "/", "**", "(", ")", ",", "SIN(", "MAX(", " "]
+
+
+def _parse(parser_type: type[_pexpr.Parser], string: str) -> _pexpr.ParseResult:
+    return parser_type(string).parse()
+
+
+def _create_random_string(random: _random.Random) -> str:
+    return "".join(random.choice(_TOKENS) for _ in range(random.randint(1, 12)))
+
+
+def _create_random_expression_string(random: _random.Random, depth: int = 0) -> str:
+    if depth > 4 or random.random() < 0.3:
+        return random.choice(["a", "7", "2.5", "[3,1]", "Bc"])
+
+    operand = _create_random_expression_string(random, depth + 1)
+    other_operand = _create_random_expression_string(random, depth + 1)
+    return random.choice(
+        [
+            f"{operand} + {other_operand}",
+            f"{operand} - {other_operand}",
+            f"{operand}*{other_operand}",
+            f"{operand}/{other_operand}",
+            f"{operand}**{other_operand}",
+            f"-{operand}",
+            f"({operand})",
+            f"MAX({operand}, {other_operand})",
+            f"{operand}*-{other_operand}",
+        ]
+    )
+
+
+@_pt.mark.parametrize(
+    "string",
+    [
+        "a + b*c - d/e",
+        "a*b + c*d*e - f",
+        "-a*b + c",
+        "2*-a + b",
+        "-a**b**c",
+        "a**b**c",
+        "a**-b*c",
+        "(a**b)**c",
+        "a**(b)**c",
+        "x**-8-.5*y",
+        "MAX(a, b*c, -d) + MIN((a), SIN(b))",
+        "((((a))))",
+        "[1,2]**2/[3,4]",
+        "a +",
+        "(a",
+        "MAX(a,)",
+        "MAX()",
+        "(a**b**c)",
+        "a $ b",
+        "",
+    ],
+)
+def test_same_result_as_recursive_parser(string: str) -> None:
+    assert _parse(_pexpr.Parser, string) == _parse(_pexpr.RecursiveParser, string)
+
+
+def test_same_results_as_recursive_parser_for_random_input() -> None:
+    random = _random.Random(11)
+
+    for _ in range(3000):
+        string = _create_random_string(random)
+        assert _parse(_pexpr.Parser, string) == _parse(_pexpr.RecursiveParser, string), string
+
+    n_successes = 0
+    for _ in range(1000):
+        string = _create_random_expression_string(random)
+        result = _parse(_pexpr.Parser, string)
+        n_successes += _pcom.is_success(result)
+        assert result == _parse(_pexpr.RecursiveParser, string), string
+
+    assert n_successes > 500
+
+
+def test_deep_nesting_does_not_exceed_recursion_limit() -> None:
+    depth = 2 * _sys.getrecursionlimit()
+    string = "(" * depth + "-a" + ")" * depth + "*b"
+
+    with _pt.raises(RecursionError):
+        _parse(_pexpr.RecursiveParser, string)
+
+    expression = _pcom.success(_parse(_pexpr.Parser, string)).value
+
+    assert expression == -_mexpr.Variable("a") * _mexpr.Variable("b")
+
+
+def test_long_sum() -> None:
+    n_operands = 100_000
+    string = " + ".join(f"x{i % 100}*2" for i in range(n_operands))
+
+    expression = _pcom.success(_parse(_pexpr.Parser, string)).value
+
+    n_additions = 0
+    while isinstance(expression, _mexpr.Addition):
+        assert expression.y == _mexpr.Variable(f"x{(n_operands - n_additions - 1) % 100}") * _mexpr.Literal(2)
+        expression = expression.x
+        n_additions += 1
+
+    assert n_additions == n_operands - 1
+
+
+def _create_benchmark_string() -> str:
+    return " + ".join(f"(x{i % 10}*y - {i}.5/z)**2*MAX(a, -b)" for i in range(2000))
+
+
+@_pt.mark.benchmark(group="expression-parser")
+def test_recursive_parser_benchmark(benchmark) -> None:
+    string = _create_benchmark_string()
+    result = benchmark(_parse, _pexpr.RecursiveParser, string)
+    assert _pcom.is_success(result)
+
+
+@_pt.mark.benchmark(group="expression-parser")
+def test_iterative_parser_benchmark(benchmark) -> None:
+    string = _create_benchmark_string()
+    result = benchmark(_parse, _pexpr.Parser, string)
+    assert _pcom.is_success(result)
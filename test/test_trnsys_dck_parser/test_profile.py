@@ -0,0 +1,119 @@
+import pytest as _pt
+
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.deck as _pdeck
+import trnsys_dck_parser.parse.equations as _peqs
+import trnsys_dck_parser.parse.profile as _pprof
+
+_EQUATIONS = """\
+EQUATIONS 3
+a = 1   ! comment
+! Comment line
+b = MAX(a, 2)*[1,2]
+c = b - 3
+"""
+
+_EXPRESSION_RULE = "trnsys_dck_parser.parse.expression.parse.Parser"
+_EQUATIONS_RULE = "trnsys_dck_parser.parse.equations.Parser"
+
+
+def test_profile_equations() -> None:
+    with _pprof.profile() as profile:
+        result = _peqs.parse_equations(_EQUATIONS)
+
+    assert _pcom.is_success(result)
+
+    n_tokens = {d: s.n_tokens for d, s in profile.tokens.items() if s.n_tokens}
+    assert n_tokens == {
+        "EQUATIONS": 1,
+        "positive integer": 5,
+        "variable": 5,
+        "=": 2,
+        'opening parenthesis ("(")': 1,
+        'closing parenthesis (")")': 1,
+        'comma (",")': 2,
+        'opening square bracket ("[")': 1,
+        'closing square bracket ("]")': 1,
+        'times ("*")': 1,
+        'minus ("-")': 1,
+        "end of input": 1,
+    }
+    assert all(s.n_regex_attempts == s.n_tokens + s.n_regex_misses for s in profile.tokens.values())
+    assert profile.tokens["end of input"].n_regex_misses == 0
+
+    assert profile.n_parsers_created == 2
+    assert profile.n_exceptions_raised == profile.n_exceptions_caught == 0
+    assert profile.n_skip_ignored_calls == 1
+
+    assert profile.rules.keys() == {_EQUATIONS_RULE, _EXPRESSION_RULE}
+    assert profile.rules[_EQUATIONS_RULE].n_calls == 1
+    assert profile.rules[_EXPRESSION_RULE].n_calls == 2
+    # "a = 1" doesn't need the parsers
+    assert profile.n_equations_by_tier == {"trivial": 1, "full": 2}
+    for statistics in profile.rules.values():
+        assert 0 < statistics.self_time <= statistics.total_time
+    assert profile.rules[_EQUATIONS_RULE].total_time >= profile.rules[_EXPRESSION_RULE].total_time
+
+
+def test_profile_exceptions() -> None:
+    with _pprof.profile() as profile:
+        result = _peqs.parse_equations("EQUATIONS 2\na = (1\n")
+
+    assert _pcom.is_error(result)
+    assert profile.n_exceptions_raised == profile.n_exceptions_caught == 1
+
+    with _pprof.profile() as profile:
+        _peqs.parse_equations("EQUATIONS 1\na = 1 %")
+
+    assert profile.tokens['plus ("+")'].n_regex_misses == 1
+    assert profile.n_skip_ignored_calls == 2
+
+
+def test_profile_to_dict() -> None:
+    with _pprof.profile() as profile:
+        _peqs.parse_equations("EQUATIONS 1\na = 2*b\n")
+
+    profile_dict = profile.to_dict()
+
+    assert profile_dict["tokens"]["="] == {"n_tokens": 1, "n_regex_attempts": 2, "n_regex_misses": 1}
+    assert profile_dict["rules"][_EXPRESSION_RULE]["n_calls"] == 1
+    assert profile_dict["n_equations_by_tier"] == {"full": 1}
+    assert "_nested_times" not in profile_dict
+
+
+def test_not_profiled() -> None:
+    parser = _peqs.Parser(_EQUATIONS)
+    with _pprof.profile() as profile:
+        result = parser.parse()
+
+    assert _pprof.get_current_profile() is None
+    assert not profile.tokens and not profile.rules
+    assert "get_next_token" not in vars(_pcom.Lexer(_EQUATIONS, [], 0))
+    assert result == _peqs.parse_equations(_EQUATIONS)
+
+
+def test_profiled_deck_same_as_not_profiled() -> None:
+    deck = _EQUATIONS + "UNIT 1 TYPE 2\nPARAMETERS 1\n3\nVERSION 18\nEND\n"
+
+    with _pprof.profile() as profile:
+        profiled_blocks = list(_pdeck.parse_deck(deck))
+
+    assert profiled_blocks == list(_pdeck.parse_deck(deck))
+    assert len(profile.rules) == 4
+
+
+@_pt.mark.benchmark(group="parse-profile")
+@_pt.mark.parametrize("is_profiled", [False, True], ids=["disabled", "enabled"])
+def test_profile_benchmark(benchmark, is_profiled: bool) -> None:
+    input_string = "\n".join(["EQUATIONS 2000", *(f"x{i} = (x{i - 1} + 2)*MAX([1,2], 3.5)" for i in range(2000))])
+
+    def parse() -> _pcom.ParseResult:
+        if not is_profiled:
+            return _peqs.parse_equations(input_string)
+
+        with _pprof.profile():
+            return _peqs.parse_equations(input_string)
+
+    result = benchmark(parse)
+
+    assert _pcom.is_success(result)
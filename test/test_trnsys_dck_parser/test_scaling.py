@@ -0,0 +1,217 @@
+import dataclasses as _dc
+import functools as _ft
+import os as _os
+import random as _random
+import typing as _tp
+
+import pytest as _pt
+
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.deck as _pdeck
+import trnsys_dck_parser.parse.equations as _peqs
+import trnsys_dck_parser.parse.expression.parse as _pexpr
+import trnsys_dck_parser.parse.expression.tokenize as _petok
+
+# Decks with more equations take minutes to generate and parse: opt in by setting this
+# environment variable, e.g. to 1000000
+_MAX_N_EQUATIONS = int(_os.environ.get("TRNSYS_DCK_PARSER_BENCHMARK_MAX_EQUATIONS", "10000"))
+
+_N_EQUATIONS = [10, 1_000, 10_000, 100_000, 1_000_000]
+
+_LEXER_TOKEN_DEFINITIONS = [_peqs.Tokens.EQUATIONS, _peqs.Tokens.EQUALS, *_petok.TOKEN_DEFINITIONS]
+
+
+@_dc.dataclass(frozen=True)
+class _DeckShape:
+    n_equations: int
+    # Levels of nested subexpressions below the right-hand side
+    expression_depth: int = 2
+    # Operands of an operator chain or arguments of a function call
+    expression_width: int = 3
+    # Probability of an equation having a comment line in front of it and, independently, a
+    # comment at the end of its line
+    comment_density: float = 0.2
+    n_blocks: int = 1
+    seed: int = 0
+
+
+def _get_n_equations_params() -> list[_tp.Any]:
+    return [
+        _pt.param(
+            n,
+            id=str(n),
+            marks=_pt.mark.skipif(n > _MAX_N_EQUATIONS, reason="Set TRNSYS_DCK_PARSER_BENCHMARK_MAX_EQUATIONS to run."),
+        )
+        for n in _N_EQUATIONS
+    ]
+
+
+@_ft.cache
+def _create_rhss(shape: _DeckShape) -> list[str]:
+    random = _random.Random(shape.seed)
+    return [_create_expression(random, shape, i, shape.expression_depth) for i in range(shape.n_equations)]
+
+
+def _create_expression(random: _random.Random, shape: _DeckShape, equation_index: int, depth: int) -> str:
+    if depth == 0:
+        return _create_atom(random, equation_index)
+
+    operands = [_create_expression(random, shape, equation_index, depth - 1) for _ in range(shape.expression_width)]
+
+    if random.random() < 0.2:
+        function = random.choice(["MAX", "MIN", "GT", "LT"])
+        return f"{function}({', '.join(operands)})"
+
+    # Identifiers can contain "-": separate the operators
+    expression = operands[0]
+    for operand in operands[1:]:
+        expression += random.choice([" + ", " - ", "*", "/"]) + operand
+    return f"({expression})" if depth < shape.expression_depth else expression
+
+
+def _create_atom(random: _random.Random, equation_index: int) -> str:
+    kind = random.randrange(5)
+    if kind == 0:
+        return str(random.randrange(1, 100000))
+    if kind == 1:
+        return f"{random.uniform(0, 10):.{random.randrange(1, 6)}f}"
+    if kind == 2:
+        return f"[{random.randrange(1, 100)},{random.randrange(1, 10)}]"
+    if kind == 3 and equation_index:
+        return f"v{random.randrange(equation_index)}"
+    return f"MfrAux{random.randrange(100)}"
+
+
+@_ft.cache
+def _create_blocks(shape: _DeckShape) -> list[str]:
+    random = _random.Random(shape.seed)
+    rhss = _create_rhss(shape)
+
+    blocks = []
+    block_boundaries = [len(rhss) * i // shape.n_blocks for i in range(shape.n_blocks + 1)]
+    for start_index, end_index in zip(block_boundaries, block_boundaries[1:]):
+        lines = [f"EQUATIONS {end_index - start_index}"]
+        for i in range(start_index, end_index):
+            if random.random() < shape.comment_density:
+                lines.append(f"! Equation {i}")
+            line = f"v{i} = {rhss[i]}"
+            if random.random() < shape.comment_density:
+                line += f"\t\t! v{i} in kW"
+            lines.append(line)
+        blocks.append("\n".join(lines) + "\n")
+
+    return blocks
+
+
+def _create_deck(shape: _DeckShape) -> str:
+    return "".join(_create_blocks(shape))
+
+
+def _parse_blocks(blocks: _tp.Iterable[str]) -> list[_meqs.Equations]:
+    return [_pcom.success(_peqs.parse_equations(b)).value for b in blocks]
+
+
+def _lex_all(input_string: str) -> int:
+    lexer = _pcom.Lexer(input_string, _LEXER_TOKEN_DEFINITIONS, 0)
+    n_tokens = 0
+    while True:
+        token = lexer.get_next_token()
+        assert isinstance(token, _pcom.Token)
+        if token.definition == _pcom.Tokens.END:
+            return n_tokens
+        n_tokens += 1
+
+
+def test_synthetic_deck_is_deterministic() -> None:
+    shape = _DeckShape(100, expression_depth=3, n_blocks=3, seed=5)
+
+    # Bypass the caches
+    deck = "".join(_create_blocks.__wrapped__(shape))  # type: ignore[attr-defined]
+
+    assert deck == _create_deck(shape)
+    assert deck != _create_deck(_dc.replace(shape, seed=6))
+
+
+@_pt.mark.parametrize(
+    "shape",
+    [
+        _DeckShape(1),
+        _DeckShape(50, expression_depth=0, comment_density=0),
+        _DeckShape(50, expression_depth=4, expression_width=2, comment_density=1),
+        _DeckShape(50, expression_width=1, n_blocks=50),
+    ],
+)
+def test_synthetic_deck_parses(shape: _DeckShape) -> None:
+    blocks = list(_pdeck.parse_deck(_create_deck(shape)))
+
+    assert all(_pcom.is_success(b.result) for b in blocks)
+    assert [b.keyword for b in blocks] == ["EQUATIONS"] * shape.n_blocks
+    equations = [e for b in blocks for e in _tp.cast(_meqs.Equations, _pcom.success(b.result).value).equations]
+    assert [e.variable_name for e in equations] == [f"v{i}" for i in range(shape.n_equations)]
+
+
+@_pt.mark.benchmark(group="scaling-lexer")
+@_pt.mark.parametrize("n_equations", _get_n_equations_params())
+def test_lexer_benchmark(benchmark, n_equations: int) -> None:
+    deck = _create_deck(_DeckShape(n_equations))
+
+    n_tokens = benchmark(_lex_all, deck)
+
+    assert n_tokens > 3 * n_equations
+
+
+@_pt.mark.benchmark(group="scaling-expression-parser")
+@_pt.mark.parametrize("n_equations", _get_n_equations_params())
+def test_expression_parser_benchmark(benchmark, n_equations: int) -> None:
+    rhss = _create_rhss(_DeckShape(n_equations))
+
+    def parse() -> list[_pcom.ParseResult]:
+        return [_pexpr.Parser(r).parse() for r in rhss]
+
+    results = benchmark(parse)
+
+    assert all(_pcom.is_success(r) for r in results)
+
+
+@_pt.mark.benchmark(group="scaling-equations-parser")
+@_pt.mark.parametrize("n_equations", _get_n_equations_params())
+def test_equations_parser_benchmark(benchmark, n_equations: int) -> None:
+    blocks = _create_blocks(_DeckShape(n_equations, n_blocks=max(1, n_equations // 100)))
+
+    equations = benchmark(_parse_blocks, blocks)
+
+    assert sum(len(e.equations) for e in equations) == n_equations
+
+
+@_pt.mark.benchmark(group="scaling-model-equality")
+@_pt.mark.parametrize("n_equations", _get_n_equations_params())
+def test_model_equality_benchmark(benchmark, n_equations: int) -> None:
+    blocks = _create_blocks(_DeckShape(n_equations, n_blocks=max(1, n_equations // 100)))
+    # Parsed separately, the models don't share any nodes
+    equations, other_equations = _parse_blocks(blocks), _parse_blocks(blocks)
+
+    are_equal = benchmark(equations.__eq__, other_equations)
+
+    assert are_equal is True
+
+
+@_pt.mark.benchmark(group="scaling-deck-shape")
+@_pt.mark.parametrize(
+    "shape",
+    [
+        _DeckShape(1000),
+        _DeckShape(1000, expression_depth=0),
+        _DeckShape(1000, expression_depth=6, expression_width=2),
+        _DeckShape(1000, expression_depth=1, expression_width=30),
+        _DeckShape(1000, comment_density=1),
+        _DeckShape(1000, n_blocks=1000),
+    ],
+    ids=["default", "flat", "deep", "wide", "commented", "many-blocks"],
+)
+def test_deck_shape_benchmark(benchmark, shape: _DeckShape) -> None:
+    deck = _create_deck(shape)
+
+    blocks = benchmark(lambda: list(_pdeck.parse_deck(deck)))
+
+    assert len(blocks) == shape.n_blocks
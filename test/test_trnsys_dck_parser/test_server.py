@@ -0,0 +1,326 @@
+import asyncio as _aio
+import itertools as _it
+import json as _json
+import pathlib as _pl
+import socket as _socket
+import subprocess as _sp
+import sys as _sys
+import typing as _tp
+
+import pytest as _pt
+
+import trnsys_dck_parser.parse.deck as _pdeck
+import trnsys_dck_parser.server as _server
+
+_DECK = """\
+VERSION 18
+EQUATIONS 2
+a = 1
+b = a*2
+UNIT 2 TYPE 1 Solar collector
+PARAMETERS 1
+1
+CONSTANTS 1
+B = 3
+END
+"""
+
+_INVALID_DECK = """\
+EQUATIONS 1
+a = (1
+"""
+
+
+def _serve(messages: _tp.Sequence[_tp.Any], server: _server.Server | None = None) -> list[dict[str, _tp.Any]]:
+    lines = iter([m if isinstance(m, bytes) else _json.dumps(m).encode() for m in messages])
+    responses = []
+
+    async def read_line() -> bytes:
+        return next(lines, b"")
+
+    async def write_line(line: bytes) -> None:
+        responses.append(_json.loads(line))
+
+    _aio.run((server or _server.Server()).serve(read_line, write_line))
+
+    return sorted(responses, key=lambda r: str(r["id"]))
+
+
+def _request(request_id: int, method: str, **params: _tp.Any) -> dict[str, _tp.Any]:
+    return {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+
+
+def _get_error_code(response: dict[str, _tp.Any]) -> int:
+    return response["error"]["code"]
+
+
+def test_parse_validate_and_query() -> None:
+    responses = _serve(
+        [
+            _request(1, "parse", uri="a.dck", version=1, text=_DECK),
+            _request(2, "validate", uri="a.dck", version=1),
+            _request(3, "query", uri="a.dck", version=1, keyword="unit"),
+            _request(4, "query", uri="a.dck", version=1, variable="b"),
+            _request(5, "validate", uri="b.dck", version=7, text=_INVALID_DECK),
+        ]
+    )
+
+    assert [r["id"] for r in responses] == [1, 2, 3, 4, 5]
+    assert responses[0]["result"] == {
+        "success": True,
+        "n_blocks": 5,
+        "n_blocks_by_keyword": {"VERSION": 1, "EQUATIONS": 1, "UNIT": 1, "CONSTANTS": 1, "END": 1},
+        "errors": [],
+    }
+    assert responses[1]["result"] == {"success": True, "errors": []}
+    assert responses[2]["result"] == {
+        "blocks": [{"keyword": "UNIT", "start_index": 37, "end_index": 82, "number": 2, "type_number": 1}]
+    }
+    assert [(b["keyword"], b["number"]) for b in responses[3]["result"]["blocks"]] == [
+        ("VERSION", 18),
+        ("EQUATIONS", 2),
+        ("UNIT", 2),
+        ("CONSTANTS", 1),
+        ("END", None),
+    ]
+    assert responses[3]["result"]["definitions"] == [
+        {"keyword": "EQUATIONS", "start_index": 29},
+        {"keyword": "CONSTANTS", "start_index": 94},
+    ]
+    assert responses[4]["result"] == {
+        "success": False,
+        "errors": [
+            {
+                "offset": 19,
+                "keyword": "EQUATIONS",
+                "message": 'Expected closing parenthesis (")") but found end of input.',
+            }
+        ],
+    }
+
+
+def test_results_are_cached_per_version() -> None:
+    server = _server.Server()
+
+    (first_response,) = _serve([_request(1, "parse", uri="a.dck", version=1, text=_INVALID_DECK)], server)
+    (second_response,) = _serve([_request(2, "parse", uri="a.dck", version=1, text=_DECK)], server)
+    (third_response,) = _serve([_request(3, "parse", uri="a.dck", version=2, text=_DECK)], server)
+    (fourth_response,) = _serve([_request(4, "parse", uri="a.dck", version=1)], server)
+
+    assert not first_response["result"]["success"]
+    assert second_response["result"] == first_response["result"]
+    assert third_response["result"]["success"]
+    assert _get_error_code(fourth_response) == -32800
+
+
+def test_superseded_requests_are_cancelled() -> None:
+    # Both requests are read before the first one starts
+    responses = _serve(
+        [
+            _request(1, "parse", uri="a.dck", version=1, text=_INVALID_DECK),
+            _request(2, "query", uri="b.dck", version=1, text=_DECK),
+            _request(3, "validate", uri="a.dck", version=2, text=_DECK),
+        ]
+    )
+
+    assert _get_error_code(responses[0]) == -32800
+    assert "result" in responses[1]
+    assert responses[2]["result"] == {"success": True, "errors": []}
+
+
+def test_cancel_request() -> None:
+    responses = _serve(
+        [
+            _request(1, "parse", uri="a.dck", version=1, text=_DECK),
+            {"jsonrpc": "2.0", "method": "$/cancelRequest", "params": {"id": 1}},
+            {"jsonrpc": "2.0", "method": "$/cancelRequest", "params": {"id": 5}},
+            _request(2, "parse", uri="a.dck", version=1),
+        ]
+    )
+
+    assert _get_error_code(responses[0]) == -32800
+    assert responses[1]["result"]["success"]
+
+
+def test_cancelled_parsing_stops_between_blocks(monkeypatch: _pt.MonkeyPatch) -> None:
+    document = _server._Document(1, _DECK)  # pylint: disable=protected-access
+    parsed_blocks = []
+    parse_block = _pdeck.DeckIndex.parse_block
+
+    def parse_and_record_block(deck_index: _pdeck.DeckIndex, block: _pdeck.IndexedBlock) -> _pdeck.ParsedBlock:
+        parsed_blocks.append(block)
+        return parse_block(deck_index, block)
+
+    monkeypatch.setattr(_pdeck.DeckIndex, "parse_block", parse_and_record_block)
+
+    with _pt.raises(_server.RequestError, match="Request cancelled."):
+        document.get_summary(lambda: len(parsed_blocks) == 2)
+
+    assert len(parsed_blocks) == 2
+    assert document.get_summary(lambda: False)["success"]
+
+
+def test_documents_are_evicted_and_closed() -> None:
+    server = _server.Server(max_n_documents=2)
+
+    responses = _serve(
+        [
+            _request(1, "parse", uri="a.dck", version=1, text=_DECK),
+            _request(2, "parse", uri="b.dck", version=1, text=_DECK),
+            _request(3, "parse", uri="a.dck", version=1),
+            _request(4, "parse", uri="c.dck", version=1, text=_DECK),
+            _request(5, "parse", uri="a.dck", version=1),
+            _request(6, "parse", uri="b.dck", version=1),
+            {"jsonrpc": "2.0", "method": "close", "params": {"uri": "c.dck"}},
+            _request(7, "parse", uri="c.dck", version=1),
+        ],
+        server,
+    )
+
+    assert all("result" in r for r in responses[:5])
+    assert _get_error_code(responses[5]) == -32602
+    assert _get_error_code(responses[6]) == -32602
+
+
+@_pt.mark.parametrize("request_id", [[1], {"id": 1}, 1.5, True])
+def test_invalid_request_ids(request_id: _tp.Any) -> None:
+    responses = _serve(
+        [
+            {"jsonrpc": "2.0", "id": request_id, "method": "parse", "params": {"uri": "a.dck", "version": 1}},
+            {"jsonrpc": "2.0", "method": "$/cancelRequest", "params": {"id": request_id}},
+            _request(1, "parse", uri="a.dck", version=1, text=_DECK),
+        ]
+    )
+
+    assert responses[0]["result"]["success"]
+    assert responses[1] == {
+        "jsonrpc": "2.0",
+        "id": None,
+        "error": {"code": -32600, "message": "Expected a string or integer id."},
+    }
+
+
+@_pt.mark.parametrize(
+    "message,expected_error_code",
+    [
+        (b"{", -32700),
+        ([1, 2], -32600),
+        ({"jsonrpc": "2.0", "id": 1, "params": {}}, -32600),
+        (_request(1, "format", uri="a.dck", version=1, text=_DECK), -32601),
+        ({"jsonrpc": "2.0", "id": 1, "method": "parse", "params": ["a.dck", 1, _DECK]}, -32602),
+        (_request(1, "parse", uri="a.dck", version="1", text=_DECK), -32602),
+        (_request(1, "parse", uri="a.dck", version=1), -32602),
+        (_request(1, "query", uri="a.dck", version=1, text=_DECK, keyword=1), -32602),
+    ],
+)
+def test_invalid_requests(message: _tp.Any, expected_error_code: int) -> None:
+    (response,) = _serve([message])
+
+    assert _get_error_code(response) == expected_error_code
+
+
+def test_shutdown() -> None:
+    server = _server.Server()
+
+    responses = _serve(
+        [_request(1, "shutdown"), _request(2, "parse", uri="a.dck", version=1, text=_DECK)],
+        server,
+    )
+
+    assert responses == [{"jsonrpc": "2.0", "id": 1, "result": None}]
+    assert server.is_shut_down
+
+
+class _ServerProcess:
+    def __init__(self, process: "_sp.Popen[bytes]") -> None:
+        self._process = process
+        self._request_ids = _it.count()
+
+    def request(self, method: str, **params: _tp.Any) -> dict[str, _tp.Any]:
+        assert self._process.stdin and self._process.stdout
+        message = _request(next(self._request_ids), method, **params)
+        self._process.stdin.write(_json.dumps(message).encode() + b"\n")
+        self._process.stdin.flush()
+        return _json.loads(self._process.stdout.readline())
+
+    def close(self) -> int:
+        assert self.request("shutdown") == {"jsonrpc": "2.0", "id": next(self._request_ids) - 1, "result": None}
+        return self._process.wait(timeout=10)
+
+
+@_pt.fixture(name="server_process")
+def _get_server_process() -> _tp.Iterator[_ServerProcess]:
+    with _sp.Popen([_sys.executable, "-m", "trnsys_dck_parser.server"], stdin=_sp.PIPE, stdout=_sp.PIPE) as process:
+        server_process = _ServerProcess(process)
+        yield server_process
+        assert server_process.close() == 0
+
+
+def test_stdio(server_process: _ServerProcess) -> None:
+    response = server_process.request("validate", uri="a.dck", version=1, text=_INVALID_DECK)
+
+    assert not response["result"]["success"]
+
+
+@_pt.mark.skipif(not hasattr(_socket, "AF_UNIX"), reason="Unix sockets aren't supported.")
+def test_unix_socket(tmp_path: _pl.Path) -> None:
+    socket_path = tmp_path / "server.sock"
+
+    async def request(*messages: dict[str, _tp.Any]) -> list[dict[str, _tp.Any]]:
+        reader, writer = await _aio.open_unix_connection(socket_path)
+        writer.writelines(_json.dumps(m).encode() + b"\n" for m in messages)
+        responses = [_json.loads(await reader.readline()) for _ in messages]
+        writer.close()
+        return sorted(responses, key=lambda r: r["id"])
+
+    async def run() -> tuple[list[dict[str, _tp.Any]], ...]:
+        server_task = _aio.create_task(_server._serve_unix_socket(socket_path))  # pylint: disable=protected-access
+        while not socket_path.exists():
+            await _aio.sleep(0.01)
+
+        # Connections share documents
+        first_responses = await request(_request(1, "parse", uri="a.dck", version=1, text=_DECK))
+        second_responses = await request(_request(2, "parse", uri="a.dck", version=1), _request(3, "shutdown"))
+        await _aio.wait_for(server_task, 10)
+        return first_responses, second_responses
+
+    first_responses, second_responses = _aio.run(run())
+
+    assert second_responses[0]["result"] == first_responses[0]["result"]
+    assert second_responses[1]["result"] is None
+
+
+def _create_large_deck() -> str:
+    equations = [f"x{i} = MAX(x{i - 1}*2, [{i},1]) ! x{i}" for i in range(2000)]
+    return _DECK.replace("END\n", f"EQUATIONS {len(equations)}\n" + "\n".join(equations) + "\nEND\n")
+
+
+@_pt.mark.benchmark(group="server-latency")
+def test_cold_cli_benchmark(benchmark, tmp_path: _pl.Path) -> None:
+    deck_path = tmp_path / "deck.dck"
+    deck_path.write_text(_create_large_deck())
+
+    def run_cli() -> dict[str, _tp.Any]:
+        output = _sp.run(
+            [_sys.executable, "-m", "trnsys_dck_parser.cli", str(deck_path)], capture_output=True, check=False
+        ).stdout
+        return _json.loads(output)
+
+    result = benchmark(run_cli)
+
+    assert result["success"]
+
+
+@_pt.mark.benchmark(group="server-latency")
+@_pt.mark.parametrize("is_cached", [False, True], ids=["new-version", "same-version"])
+def test_server_benchmark(benchmark, server_process: _ServerProcess, is_cached: bool) -> None:
+    deck = _create_large_deck()
+    versions = _it.count()
+
+    def request() -> dict[str, _tp.Any]:
+        version = 0 if is_cached else next(versions)
+        return server_process.request("parse", uri="deck.dck", version=version, text=deck)
+
+    response = benchmark(request)
+
+    assert response["result"]["success"]
@@ -0,0 +1,102 @@
+import pytest as _pt
+
+import trnsys_dck_parser.evaluate.graph as _egraph
+import trnsys_dck_parser.evaluate.symbols as _esym
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.unit as _munit
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.deck as _pdeck
+import trnsys_dck_parser.parse.equations as _peqs
+
+_DECK = """\
+VERSION 18
+EQUATIONS 3
+PelPuAuxBrine_kW = [12,3]*0.001 ! kW
+PelAux_kW = pelpuauxbrine_kW + [12,3]*0 + PelPuAuxBrine_kW
+qBrine = [12,2]
+UNIT 12 TYPE 3 Brine pump
+PARAMETERS 1
+PelPuAuxBrine_kW
+INPUTS 2
+qBrine 12,3
+0 0
+EQUATIONS 1
+PelPuAuxBrine_kW = 1
+EQUATIONS 1
+broken = (
+END
+"""
+
+
+def _get_offsets(sites: tuple[_esym.Site, ...]) -> list[tuple[int | None, int | None]]:
+    return [(s.start_index, s.end_index) for s in sites]
+
+
+def test_deck_symbol_table() -> None:
+    symbol_table = _esym.create_deck_symbol_table(_pdeck.parse_deck(_DECK))
+
+    definition = symbol_table.get_definition("pelpuauxbrine_kw")
+    assert definition and isinstance(definition.owner, _meqs.Equation)
+    assert definition.owner.variable_name == "PelPuAuxBrine_kW"
+    assert definition.start_index is not None and definition.end_index is not None
+    assert _DECK[definition.start_index : definition.end_index] == "PelPuAuxBrine_kW = [12,3]*0.001"
+    assert len(symbol_table.definitions["PELPUAUXBRINE_KW"]) == 2
+    assert symbol_table.get_definition("broken") is None
+    assert symbol_table.get_definition("unknown") is None
+
+    uses = symbol_table.get_uses("PelPuAuxBrine_kW")
+    assert [type(s.owner) for s in uses] == [_meqs.Equation, _munit.Unit]
+    assert _DECK[uses[0].start_index : uses[0].end_index].startswith("PelAux_kW = ")
+    assert _DECK[uses[1].start_index : uses[1].end_index].startswith("UNIT 12 TYPE 3")
+
+    readers = symbol_table.get_readers(12, 3)
+    assert [s.owner for s in readers] == [definition.owner, uses[0].owner, uses[1].owner]
+    assert symbol_table.get_uses((12, 2)) == symbol_table.definitions["QBRINE"]
+    assert symbol_table.get_readers(12, 1) == ()
+    assert symbol_table.get_uses("qBrine") == (uses[1],)
+
+
+def test_equations_symbol_table() -> None:
+    equations = _pcom.success(_peqs.parse_equations("EQUATIONS 2\na = [1,2]\nb = a*A")).value
+
+    symbol_table = _esym.create_symbol_table(equations.equations)
+
+    assert _get_offsets(symbol_table.definitions["A"]) == [(12, 21)]
+    assert _get_offsets(symbol_table.get_uses("a")) == [(22, 29)]
+    assert symbol_table.get_uses("b") == ()
+    assert _esym.create_symbol_table(equations) == symbol_table
+    assert _esym.create_symbol_table([_meqs.Equation("x", equations.equations[0].rhs)]).get_readers(1, 2) == (
+        _esym.Site(_meqs.Equation("x", equations.equations[0].rhs), None, None),
+    )
+
+
+def _create_equations(n_equations: int) -> _meqs.Equations:
+    lines = [f"EQUATIONS {n_equations}", "e0 = [1,1]"]
+    lines.extend(f"e{i} = e{i - 1}*0.5 + e{i // 2}*[{i % 50 + 1},1] + x{i % 10}" for i in range(1, n_equations))
+    return _pcom.success(_peqs.parse_equations("\n".join(lines) + "\n")).value
+
+
+def _get_users_by_walking(equations: _meqs.Equations, symbol: _esym.Symbol) -> list[_meqs.Equation]:
+    return [e for e in equations.equations if symbol in _egraph.iter_dependencies(e.rhs)]
+
+
+@_pt.mark.benchmark(group="symbol-table")
+@_pt.mark.parametrize("is_indexed", [False, True], ids=["walk-expressions", "symbol-table"])
+def test_find_uses_benchmark(benchmark, is_indexed: bool) -> None:
+    equations = _create_equations(2000)
+    symbols: list[_esym.Symbol] = [f"E{i}" for i in range(0, 2000, 20)] + [(i, 1) for i in range(1, 51)]
+
+    def find_uses() -> list[list[_meqs.Equation]]:
+        if is_indexed:
+            symbol_table = _esym.create_symbol_table(equations)
+            return [[_get_equation(s.owner) for s in symbol_table.get_uses(y)] for y in symbols]
+        return [_get_users_by_walking(equations, y) for y in symbols]
+
+    uses = benchmark(find_uses)
+
+    assert uses == [_get_users_by_walking(equations, y) for y in symbols]
+
+
+def _get_equation(owner: _meqs.Equation | _munit.Unit) -> _meqs.Equation:
+    assert isinstance(owner, _meqs.Equation)
+    return owner
@@ -0,0 +1,241 @@
+import itertools as _it
+import typing as _tp
+
+import pytest as _pt
+
+import trnsys_dck_parser.build as _build
+import trnsys_dck_parser.model.compact as _mcomp
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.expression as _mexpr
+import trnsys_dck_parser.model.traverse as _mtrav
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.equations as _peqs
+
+_l = _build.create_literal
+_v = _build.create_variable
+
+
+def _parse_expression(string: str) -> _mexpr.Expression:
+    return _build.create_equation("x", string).rhs
+
+
+def _create_deep_expression(depth: int) -> _mexpr.Negation:
+    expression: _mexpr.Expression = _v("a")
+    for i in range(depth):
+        expression = -(expression + _l(i))
+    return _tp.cast(_mexpr.Negation, expression)
+
+
+class _Renamer(_mtrav.Transformer):
+    def __init__(self, names: dict[str, str]) -> None:
+        super().__init__()
+        self.names = names
+        self.n_calls = 0
+
+    def variable(self, node: _mexpr.Variable) -> _mexpr.Expression:
+        self.n_calls += 1
+        return _v(self.names[node.name]) if node.name in self.names else node
+
+
+class _Folder(_mtrav.Transformer):
+    def binary_expression(self, node: _mexpr.BinaryExpression) -> _mexpr.Expression:
+        if isinstance(node, _mexpr.Multiplication) and node.x == _l(1):
+            return node.y
+        return node
+
+    def negation(self, node: _mexpr.Negation) -> _mexpr.Expression:
+        return node.x.x if isinstance(node.x, _mexpr.Negation) else node
+
+
+def test_children() -> None:
+    a, product, unit_output = _v("a"), (-_v("b")) * _l(2), _mexpr.UnitOutput(1, 2)
+    expression = _mexpr.FunctionCall("MAX", [a, product, unit_output])
+
+    assert _mtrav.get_children(expression) == (a, product, unit_output)
+    assert _mtrav.get_children(product) == (-_v("b"), _l(2))
+    assert _mtrav.get_children(unit_output) == ()
+
+    assert _mtrav.with_children(expression, [a, product, unit_output]) is expression
+    assert _mtrav.with_children(expression, [a, unit_output]) == _parse_expression("MAX(a, [1,2])")
+    assert _mtrav.with_children(product, [_l(3), _l(2)]) == _l(3) * _l(2)
+    assert _mtrav.with_children(a, []) is a
+
+
+def test_walk() -> None:
+    expression = _parse_expression("a*(b + 1) - MAX(c, -d)")
+
+    def get_strings(nodes: _tp.Iterable[_mexpr.Expression]) -> list[str]:
+        return [type(n).__name__ if _mtrav.get_children(n) else str(getattr(n, "name", "1")) for n in nodes]
+
+    assert get_strings(_mtrav.walk(expression)) == [
+        "Subtraction",
+        "Multiplication",
+        "a",
+        "Addition",
+        "b",
+        "1",
+        "FunctionCall",
+        "c",
+        "Negation",
+        "d",
+    ]
+    assert get_strings(_mtrav.walk_post_order(expression)) == [
+        "a",
+        "b",
+        "1",
+        "Addition",
+        "Multiplication",
+        "c",
+        "d",
+        "Negation",
+        "FunctionCall",
+        "Subtraction",
+    ]
+    assert get_strings(_mtrav.walk(expression, lambda n: not isinstance(n, _mexpr.FunctionCall))) == [
+        "Subtraction",
+        "Multiplication",
+        "a",
+        "Addition",
+        "b",
+        "1",
+        "FunctionCall",
+    ]
+
+
+def test_walk_is_lazy_and_iterative() -> None:
+    expression = _create_deep_expression(100_000)
+
+    addition = expression.x
+    assert list(_it.islice(_mtrav.walk(expression), 3)) == [expression, addition, _mtrav.get_children(addition)[0]]
+    assert sum(1 for _ in _mtrav.walk(expression)) == 300_001
+    assert next(n for n in _mtrav.walk_post_order(expression) if isinstance(n, _mexpr.Negation)) == -(_v("a") + _l(0))
+
+
+def test_transform_reuses_unchanged_subtrees() -> None:
+    expression = _parse_expression("(a + b*c)*(a + b*c) - (d + a)")
+    renamer = _Renamer({"d": "e"})
+
+    transformed_expression = renamer.transform(expression)
+
+    assert transformed_expression == _parse_expression("(a + b*c)*(a + b*c) - (e + a)")
+    assert _mtrav.get_children(transformed_expression)[0] is _mtrav.get_children(expression)[0]
+    # Each distinct variable once
+    assert renamer.n_calls == 4
+    assert _Renamer({}).transform(expression) is expression
+
+
+def test_transform_keeps_integer_and_float_literals() -> None:
+    transformed_expression = _Renamer({"a": "b"}).transform(_v("a") + (_l(1) + _l(1.0)))
+
+    literal_values = [n.value for n in _mtrav.walk(transformed_expression) if isinstance(n, _mexpr.Literal)]
+    assert [type(v) for v in literal_values] == [int, float]
+    assert transformed_expression == _v("b") + (_l(1) + _l(1.0))
+
+
+def test_transform_deep_expression() -> None:
+    expression = _create_deep_expression(100_000)
+
+    transformed_expression = _Folder().transform(_l(1) * -(-expression))
+
+    # Comparing deep expressions for equality would exceed the recursion limit
+    assert isinstance(transformed_expression, _mexpr.Negation)
+    assert _tp.cast(_mexpr.Negation, transformed_expression).x is expression.x
+
+
+def test_transform_equations() -> None:
+    string = "CONSTANTS 3\na = 1*b + --c\nb = 2\nc = b*b\n"
+    constants = _pcom.success(_peqs.parse_constants(string)).value
+    renamer = _Renamer({"b": "B2", "c": "C2"})
+
+    transformed_constants = _Folder().transform_equations(renamer.transform_equations(constants))
+
+    assert transformed_constants == _meqs.Constants(
+        3, [_build.create_equation(n, r) for n, r in [("a", "B2 + C2"), ("b", "2"), ("c", "B2*B2")]]
+    )
+    assert renamer.n_calls == 2
+    assert transformed_constants.equations[1] is constants.equations[1]
+    assert transformed_constants.equations[0].start_index is None
+    assert _Folder().transform_equations(transformed_constants) is transformed_constants
+
+
+class _Opaque(_mexpr.Expression):
+    @property
+    def structural_hash(self) -> bytes:
+        return b""
+
+
+def test_other_expression_types() -> None:
+    opaque = _Opaque()
+
+    class Counter(_mtrav.Transformer):
+        n_other_nodes = 0
+
+        def other(self, node: _mexpr.Expression) -> _mexpr.Expression:
+            self.n_other_nodes += 1
+            return _v("o") if isinstance(node, _Opaque) else node
+
+    counter = Counter()
+
+    assert _mtrav.get_children(opaque) == ()
+    assert counter.transform(_mexpr.Negation(opaque)) == -_v("o")
+    assert counter.n_other_nodes == 1
+
+
+def _parse_compact_equations(string: str) -> _meqs.Equations:
+    node_factory = _mcomp.CompactNodeFactory()
+    return _tp.cast(_meqs.Equations, _pcom.success(_peqs.Parser(string, node_factory=node_factory).parse()).value)
+
+
+def test_walk_compact_expressions() -> None:
+    (equation,) = _parse_compact_equations("EQUATIONS 1\nx = MAX(a*2, [1,2]) - -b\n").equations
+    assert isinstance(equation.rhs, _mcomp.ExpressionView)
+
+    nodes = list(_mtrav.walk(equation.rhs))
+
+    assert all(isinstance(n, _mcomp.ExpressionView) for n in nodes)
+    assert nodes == list(_mtrav.walk(equation.rhs.materialize()))
+    assert [_mcomp.materialize(n) for n in _mtrav.walk_post_order(equation.rhs)] == list(
+        _mtrav.walk_post_order(_parse_expression("MAX(a*2, [1,2]) - -b"))
+    )
+    assert _mtrav.with_children(equation.rhs, [_v("c"), _v("d")]) == _parse_expression("c - d")
+
+
+def test_transform_compact_equations() -> None:
+    equations = _parse_compact_equations("EQUATIONS 3\na = 1*b + --c\nb = 2\nc = b*b\n")
+
+    transformed_equations = _Folder().transform_equations(
+        _Renamer({"b": "B2", "c": "C2"}).transform_equations(equations)
+    )
+
+    assert transformed_equations == _meqs.Equations(
+        3, [_build.create_equation(n, r) for n, r in [("a", "B2 + C2"), ("b", "2"), ("c", "B2*B2")]]
+    )
+    assert transformed_equations.equations[1] is equations.equations[1]
+    assert _Folder().transform_equations(transformed_equations) is transformed_equations
+    assert _Renamer({}).transform_equations(equations) is equations
+
+
+def _create_equations(n_equations: int) -> _meqs.Equations:
+    lines = [f"EQUATIONS {n_equations}"]
+    lines.extend(f"e{i} = 1*(MfrAux/3600)*(e{i // 2} + --[{i % 50 + 1},1])*dp + x{i % 10}" for i in range(n_equations))
+    return _pcom.success(_peqs.parse_equations("\n".join(lines) + "\n")).value
+
+
+@_pt.mark.benchmark(group="traverse")
+@_pt.mark.parametrize("is_batched", [False, True], ids=["per-equation", "batched"])
+def test_transform_equations_benchmark(benchmark, is_batched: bool) -> None:
+    equations = _create_equations(5000)
+
+    def transform() -> _meqs.Equations:
+        folder = _Folder()
+        if is_batched:
+            return folder.transform_equations(equations)
+        return _meqs.Equations(
+            equations.n_equations,
+            [_meqs.Equation(e.variable_name, folder.transform(e.rhs)) for e in equations.equations],
+        )
+
+    transformed_equations = benchmark(transform)
+
+    assert transformed_equations == _Folder().transform_equations(equations)
+    assert transformed_equations.equations[0].rhs == _parse_expression("(MfrAux/3600)*(e0 + [1,1])*dp + x0")
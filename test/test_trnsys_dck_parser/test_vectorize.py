@@ -0,0 +1,107 @@
+import pytest as _pt
+
+import trnsys_dck_parser.evaluate.compile as _ecomp
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.equations as _peqs
+
+_np = _pt.importorskip("numpy")
+
+import trnsys_dck_parser.evaluate.vectorize as _evec  # pylint: disable=wrong-import-position
+
+_EQUATIONS_STRING = """\
+EQUATIONS 8
+tSky = tAmb - 10 + 2*SIN(hour*15)
+qRad = ((tSky+273.15)**4)*5.67*(10**-8)*3.6
+isCold = LT(tAmb, 0)
+control = OR(isCold, GT([33,1], 50))*MIN(MAX(tAmb, -5), 5)
+rounded = INT(tAmb) + MOD(hour, 24) + ABS([33,1]) + AE(tAmb, 0, 1)
+angle = ATAN(1) + ACOS(0.5) + LOG(100) + LN(EXP(1)) + NOT(isCold) + AND(isCold, 1)
+zeta = 10**-8*EQL(hour, 2) + NE(hour, 2) + GE(hour, 2) + LE(hour, 2)
+constant = 42
+"""
+
+
+def _parse_equations_string():
+    return _pcom.success(_peqs.parse_equations(_EQUATIONS_STRING)).value
+
+
+def _create_inputs(n_time_steps: int):
+    hours = _np.arange(n_time_steps, dtype=float)
+    ambient_temperatures = 10 * _np.sin(hours / 24) - 2.5
+    collector_temperatures = 40 + 20 * _np.cos(hours / 12)
+    return {"hour": hours, "TAMB": ambient_temperatures}, {(33, 1): collector_temperatures}
+
+
+def test_vectorized_evaluation_matches_scalar_evaluation() -> None:
+    equations = _parse_equations_string()
+    variables, unit_outputs = _create_inputs(100)
+
+    results = _evec.evaluate_equations(equations, variables, unit_outputs)
+
+    compiled_equations = _ecomp.compile_equations(equations)
+    for time_step in range(100):
+        expected_values = compiled_equations(
+            {n: float(v[time_step]) for n, v in variables.items()},
+            {u: float(v[time_step]) for u, v in unit_outputs.items()},
+        )
+        for variable_name, expected_value in expected_values.items():
+            assert results[variable_name].shape == (100,)
+            assert results[variable_name][time_step] == _pt.approx(expected_value, rel=1e-12, abs=1e-12)
+
+
+def test_constant_equations_are_broadcast_to_time_series_shape() -> None:
+    equations = _pcom.success(_peqs.parse_equations("EQUATIONS 2\na = 1\nb = a + x\n")).value
+
+    results = _evec.evaluate_equations(equations, {"x": [1.0, 2.0, 3.0]})
+
+    assert results["a"].tolist() == [1.0, 1.0, 1.0]
+    assert results["b"].tolist() == [2.0, 3.0, 4.0]
+
+    results["a"][0] = 5.0
+    assert results["a"].tolist() == [5.0, 1.0, 1.0]
+
+
+def test_scalar_inputs_give_scalar_results() -> None:
+    equations = _pcom.success(_peqs.parse_equations("EQUATIONS 1\na = 2**-1 * x\n")).value
+
+    results = _evec.evaluate_equations(equations, {"X": 3})
+
+    assert results["a"].shape == ()
+    assert float(results["a"]) == 1.5
+
+
+def test_structured_array() -> None:
+    equations = _pcom.success(_peqs.parse_equations("EQUATIONS 2\na = x*2\nb = a+[1,2]\n")).value
+
+    structured_array = _evec.evaluate_equations_to_structured_array(equations, {"x": [1, 2]}, {(1, 2): [10, 20]})
+
+    assert structured_array.dtype.names == ("a", "b")
+    assert structured_array["a"].tolist() == [2.0, 4.0]
+    assert structured_array["b"].tolist() == [12.0, 24.0]
+
+
+@_pt.mark.benchmark(group="evaluate-equations-time-series")
+def test_benchmark_vectorized_evaluation(benchmark) -> None:
+    equations = _parse_equations_string()
+    variables, unit_outputs = _create_inputs(8760 * 60)
+
+    results = benchmark(_evec.evaluate_equations, equations, variables, unit_outputs)
+
+    assert results["qRad"].shape == (8760 * 60,)
+
+
+@_pt.mark.benchmark(group="evaluate-equations-time-series")
+def test_benchmark_per_time_step_evaluation(benchmark) -> None:
+    # Deliberately only a year in hourly steps: this is 60 times fewer time steps than above
+    equations = _parse_equations_string()
+    variables, unit_outputs = _create_inputs(8760)
+    variables_by_time_step = [{n: float(v[i]) for n, v in variables.items()} for i in range(8760)]
+    unit_outputs_by_time_step = [{u: float(v[i]) for u, v in unit_outputs.items()} for i in range(8760)]
+
+    def evaluate():
+        compiled_equations = _ecomp.compile_equations(equations)
+        return [compiled_equations(v, u) for v, u in zip(variables_by_time_step, unit_outputs_by_time_step)]
+
+    results = benchmark(evaluate)
+
+    assert len(results) == 8760
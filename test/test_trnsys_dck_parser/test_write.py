@@ -0,0 +1,244 @@
+import dataclasses as _dc
+import io as _io
+import random as _random
+import re as _re
+
+import pytest as _pt
+
+import trnsys_dck_parser.model.equations as _meqs
+import trnsys_dck_parser.model.expression as _mexpr
+import trnsys_dck_parser.parse.common as _pcom
+import trnsys_dck_parser.parse.deck as _pdeck
+import trnsys_dck_parser.parse.equations as _peqs
+import trnsys_dck_parser.parse.expression.parse as _pexpr
+import trnsys_dck_parser.transform.optimize as _topt
+import trnsys_dck_parser.write.equations as _weqs
+import trnsys_dck_parser.write.expression as _wexpr
+
+_LITERAL_VALUES = [0, 7, -3, 2.5, -0.5, 1e20, -1.5e-7, 5e-324, -0.0, 100000.0]
+
+
+def _parse_expression(string: str) -> _mexpr.Expression:
+    return _pcom.success(_pexpr.Parser(string).parse()).value
+
+
+def _create_random_expression(random: _random.Random, depth: int = 0) -> _mexpr.Expression:
+    if depth > 5 or random.random() < 0.25:
+        return random.choice(
+            [
+                lambda: _mexpr.Literal(random.choice(_LITERAL_VALUES)),
+                lambda: _mexpr.Variable(random.choice(["a", "Bc", "x-1"])),
+                lambda: _mexpr.UnitOutput(3, 1),
+            ]
+        )()
+
+    x = _create_random_expression(random, depth + 1)
+    y = _create_random_expression(random, depth + 1)
+    return random.choice(
+        [
+            lambda: -x,
+            lambda: x + y,
+            lambda: x - y,
+            lambda: x * y,
+            lambda: _mexpr.Division(x, y),
+            lambda: x**y,
+            lambda: _mexpr.FunctionCall("MAX", [x, y]),
+            lambda: _mexpr.FunctionCall("SIN", [x]),
+        ]
+    )()
+
+
+@_pt.mark.parametrize(
+    "string,expected_string",
+    [
+        ("a + b*c - d/e", "a + b * c - d / e"),
+        ("a - (b - c)", "a - (b - c)"),
+        ("(a - b) - c", "a - b - c"),
+        ("a/(b*c)", "a / (b * c)"),
+        ("-a*b + c", "-a * b + c"),
+        ("(-a)*b + c", "(-a) * b + c"),
+        ("a + (-b)", "a + (-b)"),
+        ("-(3*a)", "- 3 * a"),
+        ("-(2)**2", "- 2 ** 2"),
+        ("-2**2", "-2 ** 2"),
+        ("-a**b**c", "(-a ** b) ** c"),
+        ("a**-2", "a ** -2"),
+        ("(a**b)**c", "(a ** b) ** c"),
+        ("a**(b*c)", "a ** (b * c)"),
+        ("MAX(-a, b*c, [1,2])", "MAX(-a, b * c, [1,2])"),
+        ("x-1 - -.5e-3", "x-1 - -0.0005"),
+        ("1.5e20*a", "1.5e20 * a"),
+    ],
+)
+def test_format_expression(string: str, expected_string: str) -> None:
+    expression = _parse_expression(string)
+
+    actual_string = _wexpr.format_expression(expression)
+
+    assert actual_string == expected_string
+    assert _parse_expression(actual_string) == expression
+
+
+def test_format_random_expressions_round_trip() -> None:
+    random = _random.Random(42)
+    for _ in range(2000):
+        expression = _create_random_expression(random)
+
+        string = _wexpr.format_expression(expression)
+
+        reparsed_expression = _parse_expression(string)
+        assert reparsed_expression == expression, string
+        assert _wexpr.format_expression(reparsed_expression) == string
+
+
+@_pt.mark.parametrize("value", [5e-324, 1e16, -1.5e-7, 0.1, 1 / 3, -0.0])
+def test_format_number_round_trip(value: float) -> None:
+    string = _wexpr.format_number(value)
+
+    reparsed_value = _pcom.success(_pexpr.Parser(string).parse()).value
+
+    assert isinstance(reparsed_value, _mexpr.Literal)
+    assert repr(reparsed_value.value) == repr(value)
+
+
+def test_format_non_finite_number() -> None:
+    with _pt.raises(ValueError, match="Can't write non-finite number: inf."):
+        _wexpr.format_number(float("inf"))
+
+
+def test_format_equations() -> None:
+    constants = _meqs.Constants(
+        3, [_meqs.Equation("a", _mexpr.Literal(1)), _meqs.Equation("b", _parse_expression("2*a + [1,2]"))]
+    )
+
+    string = _weqs.format_equations(constants)
+
+    assert string == "CONSTANTS 2\na = 1\nb = 2 * a + [1,2]\n"
+    assert _pcom.success(_peqs.parse_constants(string)).value == _meqs.Constants(2, constants.equations)
+
+
+_BLOCK = """\
+EQUATIONS 5		! 16
+* Pumps
+dpAuxSH_bar = 0.2															! according to MacSheep report 7.2
+PflowAuxSH_W = ((MfrAuxOut/3600)/RhoWat)*dpAuxSH_bar*100000					! required power to drive the flow, W
+etaPuAuxSh = 0.35   ! Assumption
+  x=1 y = 2
+*------------------------------------------------------------------------------
+"""
+
+
+class _RecordingFile(_io.StringIO):
+    def __init__(self) -> None:
+        super().__init__()
+        self.n_writes = 0
+
+    def write(self, string: str) -> int:
+        self.n_writes += 1
+        return super().write(string)
+
+
+def _parse_block(input_string: str) -> tuple[_pdeck.ParsedBlock, _meqs.Equations]:
+    (block,) = _pdeck.parse_deck(input_string)
+    equations = _pcom.success(block.result).value
+    assert isinstance(equations, _meqs.Equations)
+    return block, equations
+
+
+@_pt.mark.parametrize("input_string", [_BLOCK, _BLOCK.rstrip(), "equations 1\na=b", "CONSTANTS 1 a = 1 ! c\n"])
+def test_unchanged_equations_keep_layout(input_string: str) -> None:
+    block, equations = _parse_block(input_string)
+
+    assert _weqs.format_equations(equations, block) == input_string
+
+
+def test_changed_equations_keep_comments() -> None:
+    block, equations = _parse_block(_BLOCK)
+
+    optimized_equations = _topt.optimize_equations(equations)
+
+    string = _weqs.format_equations(optimized_equations, block)
+    expected_line = "PflowAuxSH_W = MfrAuxOut / 3600 / RhoWat * 0.2 * 100000					! required power to drive the flow, W"
+    assert string == _BLOCK.replace(_BLOCK.splitlines()[3], expected_line)
+    assert _parse_block(string)[1] == optimized_equations
+
+
+def test_reordered_removed_and_added_equations() -> None:
+    block, equations = _parse_block(_BLOCK)
+    dp, _, eta, x, y = equations.equations
+
+    # Renamed equations are new ones
+    edited_equations = _dc.replace(
+        equations, equations=[y, dp, _meqs.Equation("z", _mexpr.Literal(3)), x, _dc.replace(eta, variable_name="ETA")]
+    )
+
+    assert _weqs.format_equations(edited_equations, block) == """\
+EQUATIONS 5		! 16
+y = 2
+* Pumps
+dpAuxSH_bar = 0.2															! according to MacSheep report 7.2
+z = 3
+  x=1 
+ETA = 0.35
+*------------------------------------------------------------------------------
+"""
+
+
+@_pt.mark.parametrize(
+    "input_string,error_message",
+    [
+        ("UNIT 1 TYPE 2\n", "The original block must be a successfully parsed equations block."),
+        ("EQUATIONS 1\na = (\n", "The original block must be a successfully parsed equations block."),
+    ],
+)
+def test_invalid_original_block(input_string: str, error_message: str) -> None:
+    (block,) = _pdeck.parse_deck(input_string)
+
+    with _pt.raises(ValueError, match=_re.escape(error_message)):
+        _weqs.format_equations(_meqs.Equations(1, [_meqs.Equation("a", _mexpr.Literal(1))]), block)
+
+
+def test_write_equations_streams_in_chunks() -> None:
+    equations = _meqs.Equations(
+        None, [_meqs.Equation(f"x{i}", _parse_expression(f"(x{i - 1} + 2)*MAX([1,2], -3.5)")) for i in range(5000)]
+    )
+    file = _RecordingFile()
+
+    _weqs.write_equations(equations, file)
+
+    assert file.getvalue() == "".join(
+        ["EQUATIONS 5000\n", *(f"{_weqs.format_equation(e)}\n" for e in equations.equations)]
+    )
+    assert 1 < file.n_writes < 50
+
+
+def test_write_deep_expression() -> None:
+    expression: _mexpr.Expression = _mexpr.Variable("a")
+    for _ in range(50000):
+        expression = _mexpr.Multiplication(_mexpr.Literal(2), _mexpr.Subtraction(expression, _mexpr.Literal(1)))
+    file = _io.StringIO()
+
+    _wexpr.write_expression(expression, file)
+
+    assert file.getvalue() == "2 * (" * 50000 + "a" + " - 1)" * 50000
+
+
+@_pt.mark.benchmark(group="write-equations")
+@_pt.mark.parametrize("is_keeping_layout", [False, True], ids=["formatted", "keeping-layout"])
+def test_write_equations_benchmark(benchmark, is_keeping_layout: bool) -> None:
+    lines = ["EQUATIONS 5000", *(f"x{i} = (x{i - 1} + 2)*MAX([1,2], -3.5)   ! comment" for i in range(5000))]
+    block, original_equations = _parse_block("\n".join(lines) + "\n")
+    # Every other equation changed
+    equations = _dc.replace(
+        original_equations,
+        equations=[_dc.replace(e, rhs=-e.rhs) if i % 2 else e for i, e in enumerate(original_equations.equations)],
+    )
+
+    def write() -> str:
+        file = _io.StringIO()
+        _weqs.write_equations(equations, file, block if is_keeping_layout else None)
+        return file.getvalue()
+
+    string = benchmark(write)
+
+    assert _pcom.success(_peqs.parse_equations(string)).value == equations